@@ -0,0 +1,138 @@
+"""Benchmark of the JPEG decode backends at full and reduced size.
+
+Decodes the frames of a recorded MJPEG capture (or synthetic 1080p frames)
+with every installed backend of ``handful.sources.decoders``, at each DCT
+scale, in color and grayscale, with and without a destination buffer. It then
+compares the two ways of getting a frame at the tracker's input size: a
+full-size decode followed by ``cv2.resize``, and a FrameDecoder that decodes at
+a reduced scale before the same resize. Results are printed and saved as JSON.
+
+    python -m benchmarks.bench_decoders --output decoders.json
+    python -m benchmarks.bench_decoders --capture capture.mjpeg --resize_width 640 --resize_height 360
+"""
+
+import argparse
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_mjpeg_parser import synthesize_capture
+from handful.sources.decoders import (
+    DECODERS, SCALES, FrameDecoder, JPEGDecoder, create_decoder, jpeg_size, scaled_shape
+)
+from handful.sources.mjpeg_parser import MJPEGParser
+
+
+def load_payloads(capture: Optional[str], num_frames: int, width: int, height: int) -> List[bytes]:
+    """JPEG payloads of a capture file, or of a synthetic one."""
+    data = Path(capture).read_bytes() if capture else synthesize_capture(num_frames, width, height)
+    parser = MJPEGParser()
+    size = len(data)
+    parser.writable(size)[:size] = data
+    parser.commit(size)
+    payloads = []
+    while (frame_data := parser.next_frame()) is not None and len(payloads) < num_frames:
+        payloads.append(bytes(frame_data))
+    return payloads
+
+
+def time_ms(fn: Callable[[bytes], object], payloads: List[bytes], rounds: int) -> float:
+    """Median milliseconds per payload over several rounds."""
+    times = []
+    for _ in range(rounds):
+        for payload in payloads:
+            start = time.perf_counter()
+            fn(payload)
+            times.append(time.perf_counter() - start)
+    return round(float(np.median(times)) * 1000, 3)
+
+
+def bench_backend(decoder: JPEGDecoder, payloads: List[bytes], rounds: int) -> Dict[str, float]:
+    size = jpeg_size(payloads[0])
+    results = {}
+    for grayscale in (False, True):
+        for scale in SCALES:
+            name = f"{'gray' if grayscale else 'color'}_1/{scale}"
+            results[name] = time_ms(lambda data: decoder.decode(data, scale, grayscale), payloads, rounds)
+            if decoder.writes_dst:
+                dst = np.empty(scaled_shape(size, scale, grayscale), np.uint8)
+                results[name + "_dst"] = time_ms(
+                    lambda data: decoder.decode(data, scale, grayscale, dst), payloads, rounds
+                )
+    return results
+
+
+def bench_resize(backend: str, payloads: List[bytes], target: tuple, rounds: int) -> Dict[str, float]:
+    """Full decode + resize against reduced decode + resize, down to the target size."""
+    full = FrameDecoder(backend)
+    reduced = FrameDecoder(backend, target_size=target)
+    resize = lambda frame: cv2.resize(frame, target, interpolation=cv2.INTER_AREA)
+    results = {
+        'full_decode_resize_ms': time_ms(lambda data: resize(full.decode(data)), payloads, rounds),
+        'reduced_decode_resize_ms': time_ms(lambda data: resize(reduced.decode(data)), payloads, rounds),
+    }
+    results['scale'] = reduced.scale
+    results['speedup'] = round(results['full_decode_resize_ms'] / results['reduced_decode_resize_ms'], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JPEG decode backends.")
+    parser.add_argument("--capture", type=str, help="Recorded MJPEG capture to decode")
+    parser.add_argument("--frames", type=int, default=30, help="Frames to decode per measurement")
+    parser.add_argument("--width", type=int, default=1920, help="Width of synthetic frames")
+    parser.add_argument("--height", type=int, default=1080, help="Height of synthetic frames")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the frames per measurement")
+    parser.add_argument("--resize_width", type=int, default=640, help="Tracker input width")
+    parser.add_argument("--resize_height", type=int, default=360, help="Tracker input height")
+    parser.add_argument("--output", type=Path, default=Path("bench_decoders.json"), help="JSON results file")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.capture, args.frames, args.width, args.height)
+    if not payloads:
+        parser.error("No frames could be read from the capture")
+    target = (args.resize_width, args.resize_height)
+
+    backends, unavailable = {}, {}
+    for name in DECODERS:
+        try:
+            backends[name] = create_decoder(name)
+        except ImportError as e:
+            unavailable[name] = str(e)
+
+    report = {
+        'input': args.capture or f"synthetic {args.width}x{args.height}",
+        'frame_size': list(jpeg_size(payloads[0])),
+        'frames': len(payloads),
+        'target_size': list(target),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'unavailable': unavailable,
+        'decode_ms': {name: bench_backend(decoder, payloads, args.rounds) for name, decoder in backends.items()},
+        'to_target': {name: bench_resize(name, payloads, target, args.rounds) for name in backends},
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+
+    for name, results in report['decode_ms'].items():
+        print(f"{name}:")
+        for mode, ms in results.items():
+            print(f"  {mode:>16}: {ms:7.2f} ms")
+    for name, results in report['to_target'].items():
+        print(
+            f"{name} to {target[0]}x{target[1]}: full decode + resize {results['full_decode_resize_ms']:.2f} ms, "
+            f"1/{results['scale']} decode + resize {results['reduced_decode_resize_ms']:.2f} ms "
+            f"({results['speedup']}x)"
+        )
+    for name, reason in unavailable.items():
+        print(f"{name}: {reason}")
+    print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
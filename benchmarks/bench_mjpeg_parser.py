@@ -0,0 +1,179 @@
+"""Micro-benchmark for MJPEG stream parsing.
+
+Replays a recorded multipart capture through the legacy ``buffer += chunk`` loop
+and through :class:`handful.sources.mjpeg_parser.MJPEGParser`, reporting parse
+throughput and per-frame memory traffic for each.
+
+Record a capture from a live camera:
+    python -m benchmarks.bench_mjpeg_parser --record http://192.168.0.117:8080/stream --seconds 10 --capture capture.mjpeg
+
+Benchmark it (a synthetic capture is generated when --capture is omitted):
+    python -m benchmarks.bench_mjpeg_parser --capture capture.mjpeg
+"""
+
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+import cv2
+import numpy as np
+import requests
+
+from handful.sources.mjpeg_parser import MJPEGParser
+
+BOUNDARY = b"mjpegstream"
+
+
+def record_capture(url: str, path: Path, seconds: float) -> None:
+    """Save the raw bytes of a live MJPEG stream to a file."""
+    deadline = time.perf_counter() + seconds
+    with requests.get(url, stream=True) as response, open(path, "wb") as f:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=65536):
+            f.write(chunk)
+            if time.perf_counter() >= deadline:
+                break
+
+
+def synthesize_capture(
+    num_frames: int = 120,
+    width: int = 1920,
+    height: int = 1080,
+    content_length: bool = True
+) -> bytes:
+    """Build a multipart MJPEG capture from synthetic 1080p frames."""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    base = cv2.resize(base, (width, height), interpolation=cv2.INTER_LINEAR)
+    parts = []
+    for i in range(num_frames):
+        frame = np.roll(base, i * 8, axis=1)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        assert ok
+        headers = b"Content-Type: image/jpeg\r\n"
+        if content_length:
+            headers += b"Content-Length: %d\r\n" % len(jpeg)
+        parts.append(b"--" + BOUNDARY + b"\r\n" + headers + b"\r\n" + jpeg.tobytes() + b"\r\n")
+    return b"".join(parts)
+
+
+def chunks(data: bytes, chunk_size: int) -> Iterator[bytes]:
+    """Split the capture the way ``iter_content`` would deliver it."""
+    for i in range(0, len(data), chunk_size):
+        yield data[i:i + chunk_size]
+
+
+def legacy_parse(data: bytes, chunk_size: int, on_frame: Callable) -> int:
+    """The original ``MJPEGStreamClient._consume_stream`` loop, minus decoding."""
+    boundary = BOUNDARY
+    frames = 0
+    buffer = b""
+    for chunk in chunks(data, chunk_size):
+        buffer += chunk
+        while True:
+            start = buffer.find(b"--" + boundary)
+            if start == -1:
+                break
+            end = buffer.find(b"--" + boundary, start + len(boundary) + 2)
+            if end == -1:
+                break
+            frame_block = buffer[start + len(boundary) + 2: end]
+            buffer = buffer[end:]
+            header_end = frame_block.find(b"\n\r\n")
+            if header_end != -1:
+                frame_data = bytearray(frame_block[header_end + 4:-2])
+                on_frame(np.frombuffer(frame_data, np.uint8))
+                frames += 1
+    return frames
+
+
+def parser_parse(data: bytes, chunk_size: int, on_frame: Callable) -> int:
+    """Parse with :class:`MJPEGParser`, reading into its buffer like the client does."""
+    parser = MJPEGParser(BOUNDARY)
+    source = memoryview(data)
+    position = 0
+    frames = 0
+    while position < len(source):
+        size = min(parser.read_size_hint(chunk_size), len(source) - position)
+        parser.writable(size)[:size] = source[position:position + size]
+        parser.commit(size)
+        position += size
+        while (frame := parser.next_frame()) is not None:
+            on_frame(np.frombuffer(frame, np.uint8))
+            frames += 1
+    return frames
+
+
+def run(name: str, parse: Callable, data: bytes, chunk_size: int, repeats: int) -> Dict:
+    """Time a parse function and measure the peak transient memory per frame."""
+    noop = lambda frame: None
+
+    best = float("inf")
+    frames = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        frames = parse(data, chunk_size, noop)
+        best = min(best, time.perf_counter() - start)
+
+    peaks: List[int] = []
+
+    def track_peak(frame):
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - current)
+        tracemalloc.reset_peak()
+
+    tracemalloc.start()
+    blocks_before = tracemalloc.get_traced_memory()[0]
+    parse(data, chunk_size, track_peak)
+    retained = tracemalloc.get_traced_memory()[0] - blocks_before
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "frames": frames,
+        "mb_per_s": len(data) / best / 1e6,
+        "frames_per_s": frames / best,
+        "peak_transient_kib_per_frame": float(np.mean(peaks)) / 1024 if peaks else 0.0,
+        "retained_kib": retained / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MJPEG stream parsing.")
+    parser.add_argument("--capture", type=Path, help="Recorded multipart capture to replay")
+    parser.add_argument("--record", type=str, help="Record a capture from this stream URL first")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Recording duration")
+    parser.add_argument("--chunk_size", type=int, default=4096, help="Read size in bytes")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions (best is kept)")
+    parser.add_argument(
+        "--no_content_length",
+        action="store_true",
+        help="Omit Content-Length headers from the synthetic capture"
+    )
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.capture:
+            parser.error("--record requires --capture to name the output file")
+        record_capture(args.record, args.capture, args.seconds)
+
+    if args.capture:
+        data = args.capture.read_bytes()
+    else:
+        data = synthesize_capture(content_length=not args.no_content_length)
+
+    print(f"capture: {len(data) / 1e6:.1f} MB, chunk size {args.chunk_size} B")
+    for name, parse in (("legacy", legacy_parse), ("parser", parser_parse)):
+        result = run(name, parse, data, args.chunk_size, args.repeats)
+        print(
+            f"{result['name']:>8}: {result['frames']} frames, "
+            f"{result['mb_per_s']:8.1f} MB/s, {result['frames_per_s']:8.1f} frames/s, "
+            f"{result['peak_transient_kib_per_frame']:8.1f} KiB peak transient/frame, "
+            f"{result['retained_kib']:8.1f} KiB retained"
+        )
+
+
+if __name__ == "__main__":
+    main()
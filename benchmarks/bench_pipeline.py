@@ -0,0 +1,145 @@
+"""Benchmark sequential against pipelined StreamProcessor runs.
+
+A synthetic camera publishes 1080p frames at a fixed rate. Each run resizes,
+tracks, draws the debug overlay and JPEG-encodes every frame it gets to, and
+reports output frame rate, dropped source frames and capture-to-output latency.
+
+    python -m benchmarks.bench_pipeline --fps 30 --seconds 10
+    python -m benchmarks.bench_pipeline --tracker stub --track_ms 25
+
+Pipelining only helps when the stages other than tracking take a noticeable
+share of the frame time; with a tracker-bound workload both modes are limited
+by the tracker.
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from handful.core.pipeline import QueuePolicy
+from handful.core.processor import StreamProcessor
+from handful.sources.base import BaseFrameSource
+
+
+class SyntheticCamera(BaseFrameSource):
+    """Publishes copies of one frame at a fixed rate, recording publish times."""
+
+    def __init__(self, frame: np.ndarray, fps: float):
+        super().__init__()
+        self.frame = frame
+        self.interval = 1.0 / fps
+        self.publish_times: Dict[int, float] = {}
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_time = time.perf_counter()
+        while self._running:
+            sequence = self._publish_frame(self.frame.copy())
+            self.publish_times[sequence] = time.perf_counter()
+            next_time += self.interval
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+
+    def stop(self):
+        self._running = False
+
+
+class StubTracker:
+    """Sleeps for a fixed time instead of running the hand model."""
+
+    def __init__(self, track_ms: float):
+        self.delay = track_ms / 1000
+
+    def process_frame(self, frame):
+        time.sleep(self.delay)
+        return frame, None
+
+    def create_debug_visualization(self, frame, hand_data):
+        return frame.copy()
+
+
+def make_frame(width: int, height: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    return cv2.resize(frame, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+def run(args, pipelined: bool) -> Dict[str, float]:
+    camera = SyntheticCamera(make_frame(args.width, args.height), args.fps)
+    if args.tracker == "stub":
+        tracker = StubTracker(args.track_ms)
+    else:
+        from handful.core.tracker import HandTracker
+        tracker = HandTracker()
+
+    def encode(frame):
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        return jpeg.tobytes() if ok else None
+
+    processor = StreamProcessor(
+        camera,
+        tracker,
+        preprocessing_fn=lambda frame: cv2.resize(frame, (args.resize_width, args.resize_height)),
+        postprocessing_fn=lambda result: tracker.create_debug_visualization(result.frame, result.hand_data),
+        encode_fn=encode,
+        pipelined=pipelined,
+        queue_size=args.queue_size,
+        queue_policy=QueuePolicy(args.queue_policy) if args.queue_policy else None
+    )
+
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    for result in processor.process_frames():
+        now = time.perf_counter()
+        latencies.append(now - camera.publish_times[result.sequence])
+        if now >= deadline:
+            break
+    elapsed = time.perf_counter() - start
+    stats = processor.stats()
+    # Skip warm-up frames when summarising latency
+    latencies = np.array(latencies[len(latencies) // 10:]) * 1000
+
+    return {
+        "fps": stats['frames_processed'] / elapsed,
+        "dropped": stats['frames_dropped'],
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs pipelined processing.")
+    parser.add_argument("--tracker", choices=["mediapipe", "stub"], default="mediapipe")
+    parser.add_argument("--track_ms", type=float, default=20.0, help="Stub tracker time per frame")
+    parser.add_argument("--fps", type=float, default=30.0, help="Synthetic camera frame rate")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each run")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--resize_width", type=int, default=1280)
+    parser.add_argument("--resize_height", type=int, default=720)
+    parser.add_argument("--queue_size", type=int, default=2)
+    parser.add_argument("--queue_policy", choices=[policy.value for policy in QueuePolicy], default=None)
+    args = parser.parse_args()
+
+    for name, pipelined in (("sequential", False), ("pipelined", True)):
+        result = run(args, pipelined)
+        print(
+            f"{name:>10}: {result['fps']:6.1f} fps, {result['dropped']:5d} dropped, "
+            f"latency p50 {result['latency_p50_ms']:6.1f} ms, p95 {result['latency_p95_ms']:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark ROI-cropped tracking against full-frame tracking.
+
+Runs HandTracker on a 1280x720 frame with and without ``roi_tracking`` and
+reports the time per frame, how many frames used the crop, and the largest
+landmark difference between the two modes.
+
+    python -m benchmarks.bench_roi --image media/tracked.png
+
+The image should contain at least one hand; without one, ROI tracking never
+engages and only the raw model cost on full frames and crops is reported.
+"""
+
+import argparse
+import time
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+from handful.core.tracker import HandTracker
+
+
+def time_per_call(fn: Callable[[], object], frames: int) -> float:
+    """Median time of ``fn`` in milliseconds."""
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def load_frame(image: Optional[str], width: int, height: int) -> np.ndarray:
+    frame = cv2.imread(image) if image else None
+    if frame is None:
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    return cv2.resize(frame, (width, height))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ROI-cropped hand tracking.")
+    parser.add_argument("--image", type=str, help="Image containing a hand")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--crop", type=int, default=320, help="Crop side for the raw model timing")
+    args = parser.parse_args()
+
+    frame = load_frame(args.image, args.width, args.height)
+
+    # Raw model cost: video-mode model on the full frame, static model on a crop
+    tracker = HandTracker(roi_tracking=True)
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    crop = np.ascontiguousarray(rgb[:args.crop, :args.crop])
+    full_ms = time_per_call(lambda: tracker.hands.process(rgb), args.frames)
+    crop_ms = time_per_call(lambda: tracker.roi_hands.process(crop), args.frames)
+    print(f"model, full {args.width}x{args.height} frame: {full_ms:6.2f} ms")
+    print(f"model, {args.crop}x{args.crop} crop (static): {crop_ms:6.2f} ms")
+
+    full = HandTracker()
+    roi = HandTracker(roi_tracking=True)
+    results = {}
+    for name, hand_tracker in (("full-frame", full), ("roi", roi)):
+        output = []
+        ms = time_per_call(
+            lambda: output.append(hand_tracker.process_frame(frame, draw_landmarks=False)[1]),
+            args.frames
+        )
+        results[name] = output[-1]
+        print(f"tracker, {name:>10}: {ms:6.2f} ms/frame")
+    print(f"roi tracker: {roi.roi_detections} crop frames, {roi.full_frame_detections} full-frame frames")
+
+    if results["full-frame"] and results["roi"]:
+        error = max(
+            min(np.abs(hand.pixels[:, :2] - other.pixels[:, :2]).max() for other in results["full-frame"])
+            for hand in results["roi"]
+        )
+        print(f"largest landmark difference between modes: {error:.1f} px")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark of frame and landmark delivery to another process through shared memory.
+
+A SharedMemoryPublisher publishes synthetic tracked frames at a fixed rate
+while a SharedMemoryReader in a separate process waits for each one. The
+reader reports the time from publication to having the frame and its hands
+in hand, reading in place or copying. For comparison, the JPEG encode and
+decode that a consumer of the MJPEG stream needs for the same frame are timed
+too (without any HTTP overhead). Results are printed and saved as JSON.
+
+    python -m benchmarks.bench_shm --output shm.json
+    python -m benchmarks.bench_shm --width 1920 --height 1080 --copy
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_stages import summarize
+from handful.core.types import HandLandmarks, ProcessedFrame
+from handful.sinks.shm import SharedMemoryPublisher
+
+READER_SCRIPT = """
+import json, sys, time
+from handful.sinks.shm import SharedMemoryReader
+
+reader = SharedMemoryReader({name!r})
+print("ready", flush=True)
+latencies, last_sequence = [], 0
+while len(latencies) < {frames}:
+    slot = reader.wait_for_frame(last_sequence, timeout=5.0, poll_interval={poll_interval}, copy={copy})
+    if slot is None:
+        break
+    hands = slot.hand_data()
+    latencies.append(time.monotonic() - slot.timestamp)
+    last_sequence = slot.sequence
+del slot, hands
+reader.close()
+print(json.dumps(latencies), flush=True)
+"""
+
+
+def make_result(sequence: int, frame: np.ndarray, hands) -> ProcessedFrame:
+    return ProcessedFrame(frame, hands, timestamp=0.0, sequence=sequence, capture_time=time.monotonic())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared memory publication to another process.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=300, help="Frames published")
+    parser.add_argument("--fps", type=float, default=60.0, help="Publication rate")
+    parser.add_argument("--poll_interval", type=float, default=0.0001, help="Reader poll interval in seconds")
+    parser.add_argument("--copy", action="store_true", help="Reader copies each frame out of shared memory")
+    parser.add_argument("--warmup", type=int, default=10, help="Initial frames left out of the statistics")
+    parser.add_argument("--output", type=Path, default=Path("bench_shm.json"), help="JSON results file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = cv2.resize(rng.integers(0, 255, (args.height // 8, args.width // 8, 3), np.uint8), (args.width, args.height))
+    hands = [HandLandmarks(rng.random((3, 21, 3)).astype(np.float32), np.zeros(5, bool), "Left", 0.9)]
+
+    name = f"handful_bench_{os.getpid()}"
+    publisher = SharedMemoryPublisher(name, frame_shape=frame.shape)
+    publisher.start()
+    script = READER_SCRIPT.format(name=name, frames=args.frames, poll_interval=args.poll_interval, copy=args.copy)
+    reader = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True)
+    submit_times = []
+    try:
+        if reader.stdout.readline().strip() != "ready":
+            parser.error("Reader process failed to attach")
+        interval = 1.0 / args.fps
+        next_time = time.perf_counter()
+        for sequence in range(1, args.frames + 1):
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_time += interval
+            result = make_result(sequence, frame, hands)
+            start = time.perf_counter()
+            publisher.submit(result)
+            submit_times.append(time.perf_counter() - start)
+        latencies = json.loads(reader.stdout.readline() or "[]")
+    finally:
+        reader.wait(timeout=10)
+        publisher.stop()
+
+    encode_times, decode_times = [], []
+    for _ in range(min(args.frames, 50)):
+        start = time.perf_counter()
+        jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])[1]
+        encode_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+        decode_times.append(time.perf_counter() - start)
+
+    report = {
+        'frame_shape': list(frame.shape),
+        'fps': args.fps,
+        'copy': args.copy,
+        'poll_interval': args.poll_interval,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'frames_received': len(latencies),
+        'publish': summarize(submit_times, args.warmup),
+        'publish_to_read': summarize(latencies, args.warmup),
+        'jpeg_encode': summarize(encode_times),
+        'jpeg_decode': summarize(decode_times),
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+
+    print(f"{len(latencies)}/{args.frames} frames of {args.width}x{args.height} received")
+    for name in ('publish', 'publish_to_read', 'jpeg_encode', 'jpeg_decode'):
+        summary = report[name]
+        if summary['count']:
+            print(
+                f"{name:>16}: p50 {summary['p50_ms'] * 1000:8.1f} us, "
+                f"p95 {summary['p95_ms'] * 1000:8.1f} us, p99 {summary['p99_ms'] * 1000:8.1f} us"
+            )
+    print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
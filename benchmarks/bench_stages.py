@@ -0,0 +1,248 @@
+"""Per-stage benchmark of the handful pipeline on a recorded stream.
+
+Replays an MJPEG capture or a video file and times every stage a frame goes
+through: MJPEG parsing, ``imdecode``, ``HandTracker.process_frame`` (and the
+``_process_landmarks`` call inside it), the debug annotation and ``imencode``.
+It then replays the file once more through a StreamProcessor fed by a lossless
+FileFrameSource for the end-to-end rate. Each stage reports throughput and
+p50/p95/p99 latency; results are printed and saved as JSON.
+
+    python -m benchmarks.bench_stages --capture capture.mjpeg --output stages.json
+    python -m benchmarks.bench_stages --capture clip.mp4 --resize_width 1280 --resize_height 720
+
+Record a capture with ``benchmarks.bench_mjpeg_parser --record``. Without
+--capture a synthetic 1080p capture is used; it contains no hands, so
+``_process_landmarks`` is then timed on synthetic two-hand model results.
+"""
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_mjpeg_parser import synthesize_capture
+from handful.core.processor import StreamProcessor
+from handful.core.tracker import HandTracker
+from handful.sources.file import FileFrameSource, is_mjpeg_capture, iter_mjpeg_file
+from handful.utils.bufferpool import BufferPool
+
+
+def summarize(seconds: List[float], warmup: int = 0) -> Dict[str, float]:
+    """Throughput and latency percentiles of per-item timings."""
+    seconds = seconds[warmup:] if len(seconds) > warmup else seconds
+    if not seconds:
+        return {'count': 0}
+    ms = np.array(seconds) * 1000
+    return {
+        'count': len(ms),
+        'throughput_per_s': float(len(ms) / (ms.sum() / 1000)) if ms.sum() else float('inf'),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+    }
+
+
+def timed(fn: Callable, times: List[float]) -> Callable:
+    """Wrap a function so that the duration of every call is appended to ``times``."""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            times.append(time.perf_counter() - start)
+    return wrapper
+
+
+def synthetic_results(num_hands: int = 2):
+    """MediaPipe-like results with hands at random positions."""
+    from mediapipe.framework.formats import classification_pb2, landmark_pb2
+
+    rng = np.random.default_rng(0)
+    hand_landmarks, world_landmarks, handedness = [], [], []
+    for i in range(num_hands):
+        landmarks = landmark_pb2.NormalizedLandmarkList()
+        world = landmark_pb2.LandmarkList()
+        for x, y, z in rng.random((21, 3)):
+            landmarks.landmark.add(x=x, y=y, z=z)
+            world.landmark.add(x=x / 10, y=y / 10, z=z / 10)
+        classification = classification_pb2.ClassificationList()
+        classification.classification.add(score=0.9, label=("Left", "Right")[i % 2])
+        hand_landmarks.append(landmarks)
+        world_landmarks.append(world)
+        handedness.append(classification)
+    return SimpleNamespace(
+        multi_hand_landmarks=hand_landmarks,
+        multi_hand_world_landmarks=world_landmarks,
+        multi_handedness=handedness
+    )
+
+
+def bench_decoding(path: str, times: Dict[str, List[float]], limit: Optional[int]) -> List[np.ndarray]:
+    """Time parsing and decoding of every frame, returning the frames."""
+    frames = []
+    if is_mjpeg_capture(path):
+        payloads = iter_mjpeg_file(path)
+        while limit is None or len(frames) < limit:
+            start = time.perf_counter()
+            frame_data = next(payloads, None)
+            times['parse'].append(time.perf_counter() - start)
+            if frame_data is None:
+                times['parse'].pop()
+                break
+            start = time.perf_counter()
+            frame = cv2.imdecode(np.frombuffer(frame_data, np.uint8), cv2.IMREAD_COLOR)
+            times['imdecode'].append(time.perf_counter() - start)
+            if frame is not None:
+                frames.append(frame)
+    else:
+        # Container formats are demuxed and decoded in one call
+        capture = cv2.VideoCapture(path)
+        while capture.isOpened() and (limit is None or len(frames) < limit):
+            start = time.perf_counter()
+            ok, frame = capture.read()
+            if not ok:
+                break
+            times['video_read'].append(time.perf_counter() - start)
+            frames.append(frame)
+        capture.release()
+    return frames
+
+
+def bench_stages(frames: List[np.ndarray], times: Dict[str, List[float]], args) -> bool:
+    """Time tracking, annotation and encoding of every frame.
+    :return Whether the tracker found hands in any frame
+    """
+    buffer_pool = BufferPool() if args.buffer_pool else None
+    tracker = HandTracker(roi_tracking=args.roi_tracking, buffer_pool=buffer_pool)
+    tracker._process_landmarks = timed(tracker._process_landmarks, times['_process_landmarks'])
+    resize = (args.resize_width, args.resize_height) if args.resize_width and args.resize_height else None
+
+    for frame in frames:
+        if resize:
+            dst = buffer_pool.lease((resize[1], resize[0], 3)) if buffer_pool is not None else None
+            frame = cv2.resize(frame, resize, dst=dst)
+        start = time.perf_counter()
+        output_frame, hand_data = tracker.process_frame(frame)
+        times['process_frame'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        output_frame = tracker.create_debug_visualization(output_frame, hand_data)
+        times['annotate'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        cv2.imencode(".jpg", output_frame, [cv2.IMWRITE_JPEG_QUALITY, args.jpeg_quality])
+        times['imencode'].append(time.perf_counter() - start)
+
+    if times['_process_landmarks']:
+        return True
+    # No hands in the recording: time landmark processing on synthetic model output
+    results = synthetic_results()
+    shape = frames[0].shape if not resize else (resize[1], resize[0], 3)
+    process_landmarks = timed(HandTracker._process_landmarks, times['_process_landmarks'])
+    for _ in frames:
+        process_landmarks(tracker, results, shape)
+    return False
+
+
+def bench_end_to_end(path: str, num_frames: int, args) -> Dict[str, float]:
+    """Replay the file through a StreamProcessor and time the interval between results."""
+    source = FileFrameSource(path, speed="max", lossless=True)
+    tracker = HandTracker(roi_tracking=args.roi_tracking)
+    preprocessing_fn = None
+    if args.resize_width and args.resize_height:
+        preprocessing_fn = lambda frame: cv2.resize(frame, (args.resize_width, args.resize_height))
+    processor = StreamProcessor(
+        source,
+        tracker,
+        preprocessing_fn=preprocessing_fn,
+        postprocessing_fn=lambda result: tracker.create_debug_visualization(result.frame, result.hand_data),
+        frame_timeout=0.1
+    )
+
+    intervals = []
+    results = processor.process_frames()
+    last = time.perf_counter()
+    try:
+        # The source is lossless, so every frame of the file comes out once
+        while len(intervals) < num_frames:
+            if next(results, None) is None:
+                break
+            now = time.perf_counter()
+            intervals.append(now - last)
+            last = now
+    finally:
+        results.close()
+    summary = summarize(intervals, args.warmup)
+    summary['frames_dropped'] = processor.stats()['frames_dropped']
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the handful pipeline.")
+    parser.add_argument("--capture", type=str, help="Recorded MJPEG capture or video file to replay")
+    parser.add_argument("--frames", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--synthetic_frames", type=int, default=60, help="Length of the synthetic capture")
+    parser.add_argument("--warmup", type=int, default=5, help="Initial frames left out of the statistics")
+    parser.add_argument("--resize_width", type=int, default=None)
+    parser.add_argument("--resize_height", type=int, default=None)
+    parser.add_argument("--roi_tracking", action="store_true")
+    parser.add_argument("--jpeg_quality", type=int, default=80)
+    parser.add_argument("--buffer_pool", action="store_true", help="Give the tracker a frame buffer pool")
+    parser.add_argument("--no_end_to_end", action="store_true", help="Skip the StreamProcessor replay")
+    parser.add_argument("--output", type=Path, default=Path("bench_stages.json"), help="JSON results file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.capture
+        if path is None:
+            path = str(Path(tmp) / "synthetic.mjpeg")
+            Path(path).write_bytes(synthesize_capture(args.synthetic_frames))
+
+        times: Dict[str, List[float]] = {
+            name: [] for name in (
+                'parse', 'imdecode', 'video_read', 'process_frame', '_process_landmarks', 'annotate', 'imencode'
+            )
+        }
+        frames = bench_decoding(path, times, args.frames)
+        if not frames:
+            parser.error(f"No frames could be read from {path}")
+        hands_found = bench_stages(frames, times, args)
+        stages = {name: summarize(values, args.warmup) for name, values in times.items() if values}
+        if not args.no_end_to_end:
+            stages['end_to_end'] = bench_end_to_end(path, len(frames), args)
+
+    report = {
+        'input': args.capture or f"synthetic ({args.synthetic_frames} frames)",
+        'frame_shape': list(frames[0].shape),
+        'resize': [args.resize_width, args.resize_height] if args.resize_width and args.resize_height else None,
+        'roi_tracking': args.roi_tracking,
+        'buffer_pool': args.buffer_pool,
+        'hands_found': hands_found,
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'stages': stages,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+
+    for name, summary in stages.items():
+        print(
+            f"{name:>18}: {summary['count']:5d} x, {summary['throughput_per_s']:9.1f}/s, "
+            f"p50 {summary['p50_ms']:7.2f} ms, p95 {summary['p95_ms']:7.2f} ms, p99 {summary['p99_ms']:7.2f} ms"
+        )
+    if not hands_found:
+        print("no hands in the input: _process_landmarks was timed on synthetic two-hand results")
+    print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
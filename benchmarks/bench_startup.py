@@ -0,0 +1,160 @@
+"""Benchmark of start-up costs: imports, --help latency and the first frames.
+
+Every measurement runs in a fresh interpreter, so nothing is cached by an
+earlier one. Reported are the import time of the heavy dependencies and of the
+handful modules, the time ``main.py --help`` and ``handful.cli.main --help``
+take, and, for a new HandTracker, its construction time and the latency of the
+first and second frame with and without ``warmup()``.
+
+    python -m benchmarks.bench_startup --output startup.json
+    python -m benchmarks.bench_startup --image media/tracked.png --repeat 5
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+MODULES = (
+    "numpy",
+    "cv2",
+    "yaml",
+    "flask",
+    "mediapipe",
+    "handful.core.tracker",
+    "handful.core.processor",
+    "handful.server.app",
+    "handful.cli.main",
+    "main",
+)
+
+COMMANDS = {
+    "main.py --help": [sys.executable, "main.py", "--help"],
+    "handful.cli.main --help": [sys.executable, "-m", "handful.cli.main", "--help"],
+}
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{
+    'seconds': time.perf_counter() - start,
+    'mediapipe': 'mediapipe' in sys.modules,
+    'flask': 'flask' in sys.modules,
+}}))
+"""
+
+FIRST_FRAMES_SCRIPT = """
+import json, time
+import cv2
+import numpy as np
+from handful.core.tracker import HandTracker
+
+image = {image!r}
+frame = cv2.imread(image) if image else None
+if frame is None:
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+start = time.perf_counter()
+tracker = HandTracker()
+result = {{'construct': time.perf_counter() - start, 'warmup': None}}
+if {warmup}:
+    result['warmup'] = tracker.warmup(frame.shape)
+for name in ('first_frame', 'second_frame'):
+    start = time.perf_counter()
+    tracker.process_frame(frame.copy())
+    result[name] = time.perf_counter() - start
+print(json.dumps(result))
+"""
+
+
+def run_python(script: str) -> Dict:
+    """Run a script in a fresh interpreter and parse the JSON it prints."""
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_command(command: List[str]) -> float:
+    """Wall-clock seconds of a command, including interpreter start-up."""
+    script = (
+        "import subprocess, time\n"
+        "start = time.perf_counter()\n"
+        f"subprocess.run({command!r}, check=True, stdout=subprocess.DEVNULL)\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    return float(output)
+
+
+def median_ms(values: List[float]) -> float:
+    return round(float(np.median(values)) * 1000, 2)
+
+
+def bench_imports(repeat: int) -> Dict[str, Dict]:
+    results = {}
+    for module in MODULES:
+        runs = [run_python(IMPORT_SCRIPT.format(module=module)) for _ in range(repeat)]
+        results[module] = {
+            'import_ms': median_ms([run['seconds'] for run in runs]),
+            'loads_mediapipe': runs[0]['mediapipe'],
+            'loads_flask': runs[0]['flask'],
+        }
+    return results
+
+
+def bench_first_frames(image: Optional[str], repeat: int) -> Dict[str, Dict]:
+    results = {}
+    for warmup in (False, True):
+        runs = [run_python(FIRST_FRAMES_SCRIPT.format(image=image, warmup=warmup)) for _ in range(repeat)]
+        results['warm' if warmup else 'cold'] = {
+            f'{name}_ms': median_ms([run[name] for run in runs]) if runs[0][name] is not None else None
+            for name in ('construct', 'warmup', 'first_frame', 'second_frame')
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark handful start-up costs.")
+    parser.add_argument("--image", type=str, default=None, help="Frame to track (random noise if not given)")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement")
+    parser.add_argument("--output", type=Path, default=Path("bench_startup.json"), help="JSON results file")
+    args = parser.parse_args()
+
+    imports = bench_imports(args.repeat)
+    commands = {
+        name: median_ms([time_command(command) for _ in range(args.repeat)])
+        for name, command in COMMANDS.items()
+    }
+    first_frames = bench_first_frames(args.image, args.repeat)
+
+    report = {
+        'image': args.image,
+        'repeat': args.repeat,
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'imports': imports,
+        'commands_ms': commands,
+        'first_frames': first_frames,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+
+    for module, result in imports.items():
+        loads = [name for name in ('mediapipe', 'flask') if result[f'loads_{name}']]
+        print(f"import {module:>24}: {result['import_ms']:8.1f} ms  {'loads ' + ', '.join(loads) if loads else ''}")
+    for name, ms in commands.items():
+        print(f"{name:>31}: {ms:8.1f} ms")
+    for mode, result in first_frames.items():
+        print(f"{mode} tracker: " + ", ".join(
+            f"{name[:-3]} {value:.1f} ms" for name, value in result.items() if value is not None
+        ))
+    print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,11 @@
 import click
-from typing import Optional
+from typing import Optional, Tuple
 import logging
+import time
 from pathlib import Path
 
-import cv2
-import yaml
-
-from handful.core.processor import StreamProcessor
-from handful.core.tracker import HandTracker
-from handful.server.app import StreamServer
-from handful.sources.mjpeg import MJPEGStreamClient
+# OpenCV, MediaPipe and Flask are imported by the commands that use them, so
+# that --help and argument errors do not wait a second for them to load
 
 # Configure logging
 logging.basicConfig(
@@ -33,6 +29,8 @@ pass_config = click.make_pass_decorator(Config, ensure=True)
 def load_config(ctx: click.Context, config_file: Optional[Path]) -> dict:
     """Load configuration from file if provided"""
     if config_file and config_file.exists():
+        import yaml
+
         with open(config_file) as f:
             return yaml.safe_load(f)
     return {}
@@ -69,10 +67,18 @@ def source():
 @pass_config
 def mjpeg(config: Config, url: str, display: bool, server: bool, port: int):
     """Use MJPEG stream as frame source"""
+    import cv2
+
+    from handful.core.processor import StreamProcessor
+    from handful.core.tracker import HandTracker
+    from handful.server.app import StreamServer
+    from handful.sources.mjpeg import MJPEGStreamClient
+
     cfg = load_config(click.get_current_context(), config.config_file)
 
     source_client = MJPEGStreamClient(url)
     tracker = HandTracker()
+    tracker.warmup()
     processor = StreamProcessor(source_client, tracker)
 
     if server:
@@ -89,3 +95,65 @@ def mjpeg(config: Config, url: str, display: bool, server: bool, port: int):
         finally:
             cv2.destroyAllWindows()
 
+
+@cli.command()
+@click.argument('inputs', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--output', '-o', required=True, type=click.Path(file_okay=False), help='Output directory')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+@click.option('--chunk-frames', default=1000, show_default=True, help='Frames per output chunk and work unit')
+@click.option('--max-hands', default=2, show_default=True, help='Hands tracked per frame')
+@click.option('--min-detection-confidence', default=0.5, show_default=True, help='Hand detection threshold')
+@click.option('--flip/--no-flip', default=True, help='Mirror frames before tracking, as the live pipeline does')
+@click.option(
+    '--image-sequences/--image-stills',
+    default=False,
+    help='Track image directories as video frames rather than unrelated photos'
+)
+@pass_config
+def batch(
+    config: Config,
+    inputs: Tuple[str, ...],
+    output: str,
+    workers: Optional[int],
+    chunk_frames: int,
+    max_hands: int,
+    min_detection_confidence: float,
+    flip: bool,
+    image_sequences: bool
+):
+    """Track recorded videos and image directories offline, on every core.
+
+    Results go to one .npz file of columns per chunk of frames under OUTPUT;
+    run the same command again to resume an interrupted batch.
+    """
+    from handful.core.batch import BatchRunner
+
+    try:
+        runner = BatchRunner(
+            inputs,
+            output,
+            chunk_frames=chunk_frames,
+            max_hands=max_hands,
+            min_detection_confidence=min_detection_confidence,
+            flip=flip,
+            image_sequences=image_sequences
+        )
+    except (OSError, ValueError) as e:
+        raise click.ClickException(str(e))
+
+    done = len(runner.tasks) - len(runner.pending)
+    click.echo(f"{len(runner.inputs)} inputs in {len(runner.tasks)} chunks, {done} already done")
+    totals = {'frames': 0, 'frames_with_hands': 0, 'unreadable': 0}
+    start = time.monotonic()
+    with click.progressbar(length=runner.expected_frames, label='Tracking', show_pos=True) as bar:
+        for result in runner.run(workers):
+            for key in totals:
+                totals[key] += result[key]
+            bar.update(result['frames'])
+
+    elapsed = time.monotonic() - start
+    rate = totals['frames'] / elapsed if elapsed else 0.0
+    click.echo(
+        f"Tracked {totals['frames']} frames ({totals['frames_with_hands']} with hands, "
+        f"{totals['unreadable']} unreadable) in {elapsed:.1f} s, {rate:.1f} frames/s"
+    )
@@ -0,0 +1,168 @@
+"""Closed-loop quality control against a per-frame latency budget."""
+
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, Optional, Sequence
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    """One setting of every knob the controller turns."""
+    inference_scale: float  # Fraction of the frame size the model runs at
+    frame_skip: int  # Frames skipped after each processed one
+    jpeg_quality: int  # Quality of frames encoded for viewers
+
+
+# From full quality to cheapest. Each step turns one knob, starting with the one
+# that costs viewers least. MediaPipe scales its input to fixed-size model
+# tensors, so inference resolution mostly saves the colour conversion and copy
+# of the input; it is not lowered past half, where small hands start to be
+# missed without any further gain. Frame skipping is the last resort.
+DEFAULT_LEVELS = (
+    QualityLevel(1.0, 0, 90),
+    QualityLevel(1.0, 0, 75),
+    QualityLevel(0.75, 0, 75),
+    QualityLevel(0.75, 0, 60),
+    QualityLevel(0.5, 0, 60),
+    QualityLevel(0.5, 0, 45),
+    QualityLevel(0.5, 1, 45),
+    QualityLevel(0.5, 2, 45),
+    QualityLevel(0.5, 3, 45),
+)
+
+
+class AdaptiveController:
+    """Steps through quality levels to keep per-frame processing time within a budget.
+
+    Every processed frame's processing time updates an exponential moving
+    average. When the average exceeds the budget the controller moves one level
+    down; when it stays below ``low_water`` times the budget for ``recover_frames``
+    frames it moves one level up. The gap between the two thresholds, a settling
+    period after every change (during which the average restarts from the new
+    level's frames) and a recovery hold that doubles each time an upgrade has to
+    be undone keep it from oscillating between two levels.
+    """
+
+    def __init__(
+        self,
+        budget: float = 0.05,
+        levels: Sequence[QualityLevel] = DEFAULT_LEVELS,
+        smoothing: float = 0.1,
+        low_water: float = 0.6,
+        settle_frames: int = 10,
+        recover_frames: int = 60,
+        max_recover_frames: int = 960,
+        history: int = 20
+    ):
+        """Initialize the controller at the first (best) level.
+        :param budget: Processing time per frame to stay within, in seconds
+        :param levels: Quality levels from best to cheapest
+        :param smoothing: Weight of each new frame in the moving average
+        :param low_water: Fraction of the budget the average must stay below to upgrade
+        :param settle_frames: Frames measured at a new level before it is judged
+        :param recover_frames: Frames below the low-water mark before an upgrade
+        :param max_recover_frames: Upper bound of the recovery hold after failed upgrades
+        :param history: Number of recent decisions kept for stats()
+        """
+        if not levels:
+            raise ValueError("AdaptiveController needs at least one quality level")
+        if not 0 < low_water < 1:
+            raise ValueError("low_water must be between 0 and 1")
+        self.budget = budget
+        self.levels = tuple(levels)
+        self.smoothing = smoothing
+        self.low_water = low_water
+        self.settle_frames = settle_frames
+        self.recover_frames = recover_frames
+        self.max_recover_frames = max_recover_frames
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=history)
+
+        self.index = 0
+        self.level = self.levels[0]
+        self.average: Optional[float] = None
+        self.frames = 0
+        self._changed_at = 0
+        self._last_step = 0
+        self._recover_hold = recover_frames
+        self._skip_count = 0
+
+    def update(self, seconds: float) -> Optional[Dict[str, Any]]:
+        """Account one processed frame and change level if needed.
+        :param seconds: Time the frame took to process
+        :return The decision taken, or None if the level stays the same
+        """
+        self.frames += 1
+        if self.average is None:
+            self.average = seconds
+        else:
+            self.average += self.smoothing * (seconds - self.average)
+
+        frames_at_level = self.frames - self._changed_at
+        if frames_at_level < self.settle_frames:
+            return None
+
+        if self.average > self.budget and self.index < len(self.levels) - 1:
+            if self._last_step > 0 and frames_at_level < self._recover_hold:
+                # The last upgrade could not hold the budget: wait longer before the next
+                self._recover_hold = min(self._recover_hold * 2, self.max_recover_frames)
+            elif self._last_step > 0:
+                # Conditions changed long after the upgrade
+                self._recover_hold = self.recover_frames
+            return self._change(-1, "over budget")
+
+        if self.average < self.budget * self.low_water and self.index > 0 \
+                and frames_at_level >= self._recover_hold:
+            return self._change(1, "under budget")
+        return None
+
+    def skip_frame(self) -> bool:
+        """Whether to skip the next source frame to honour the level's frame-skip ratio."""
+        skip = self.level.frame_skip
+        if not skip:
+            self._skip_count = 0
+            return False
+        self._skip_count = (self._skip_count + 1) % (skip + 1)
+        return self._skip_count != 1
+
+    @property
+    def inference_scale(self) -> float:
+        return self.level.inference_scale
+
+    @property
+    def jpeg_quality(self) -> int:
+        return self.level.jpeg_quality
+
+    def _change(self, step: int, reason: str) -> Dict[str, Any]:
+        """Move ``step`` levels up (positive) or down (negative) and record the decision."""
+        previous = self.index
+        self.index -= step
+        # One assignment, so other threads never see a mix of two levels
+        self.level = self.levels[self.index]
+        decision = {
+            'time': time.time(),
+            'frame': self.frames,
+            'from_level': previous,
+            'to_level': self.index,
+            'reason': reason,
+            'processing_ms': round(self.average * 1000, 3),
+            **asdict(self.level),
+        }
+        self.decisions.append(decision)
+        self.average = None
+        self._changed_at = self.frames
+        self._last_step = step
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        """Current level, measured processing time and recent decisions, e.g. for /stats."""
+        average = self.average
+        return {
+            'budget_ms': self.budget * 1000,
+            'processing_ms': round(average * 1000, 3) if average is not None else None,
+            'level': self.index,
+            'levels': len(self.levels),
+            **asdict(self.level),
+            'recover_frames': self._recover_hold,
+            'decisions': list(self.decisions),
+        }
@@ -0,0 +1,323 @@
+"""Offline hand tracking of recorded footage on a process pool."""
+
+import hashlib
+import json
+import logging
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from handful.core.types import HANDEDNESS, NUM_LANDMARKS
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = {'.bmp', '.jpeg', '.jpg', '.png', '.tif', '.tiff', '.webp'}
+VIDEO_SUFFIXES = {'.avi', '.m4v', '.mjpeg', '.mkv', '.mov', '.mp4', '.webm'}
+MANIFEST_NAME = "manifest.json"
+_HANDEDNESS_CODES = {label: code for code, label in enumerate(HANDEDNESS)}
+
+
+@dataclass(frozen=True)
+class BatchTask:
+    """A run of consecutive frames of one input, tracked by one worker into one chunk."""
+    path: str  # Video file or image directory
+    name: str  # Output directory of the input, relative to the batch output
+    start: int  # Index of the first frame
+    count: Optional[int]  # Number of frames, or None to read to the end of the input
+    expected: int  # Number of frames according to the container
+    images: bool = False
+
+    @property
+    def chunk(self) -> str:
+        return os.path.join(self.name, f"{self.start:09d}.npz")
+
+
+def list_images(directory: str) -> List[str]:
+    """Image files of a directory in name order, which is their frame order."""
+    return sorted(
+        name for name in os.listdir(directory)
+        if os.path.splitext(name)[1].lower() in IMAGE_SUFFIXES
+    )
+
+
+def find_inputs(paths: Sequence[str]) -> List[Tuple[str, bool]]:
+    """Expand paths into inputs.
+
+    Video files are inputs of their own; every directory that holds images is
+    one input, an image sequence. Directories are searched recursively.
+    :return (path, is_image_directory) pairs in a stable order
+    """
+    inputs = []
+    for path in paths:
+        if os.path.isfile(path):
+            inputs.append((os.path.abspath(path), False))
+            continue
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"No such file or directory: {path}")
+        for directory, subdirectories, files in os.walk(path):
+            subdirectories.sort()
+            if list_images(directory):
+                inputs.append((os.path.abspath(directory), True))
+            inputs.extend(
+                (os.path.abspath(os.path.join(directory, name)), False) for name in sorted(files)
+                if os.path.splitext(name)[1].lower() in VIDEO_SUFFIXES
+            )
+    return inputs
+
+
+def output_name(path: str) -> str:
+    """Output directory name of an input: readable, and unique per absolute path."""
+    stem = os.path.splitext(os.path.basename(path.rstrip(os.sep)))[0] or "input"
+    return f"{stem}-{hashlib.sha1(path.encode()).hexdigest()[:8]}"
+
+
+def plan_tasks(inputs: Sequence[Tuple[str, bool]], chunk_frames: int) -> List[BatchTask]:
+    """Split every input into chunks of ``chunk_frames`` frames.
+
+    Video frame counts come from the container and may be approximate, so the
+    last chunk of a video reads to the end of the file whatever its length.
+    """
+    tasks = []
+    for path, images in inputs:
+        if images:
+            total = len(list_images(path))
+        else:
+            capture = cv2.VideoCapture(path)
+            if not capture.isOpened():
+                logger.warning("Cannot open video %s. Skipping.", path)
+                continue
+            total = max(1, int(capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+            capture.release()
+        name = output_name(path)
+        for start in range(0, total, chunk_frames):
+            last = start + chunk_frames >= total
+            count = None if last and not images else min(chunk_frames, total - start)
+            expected = min(chunk_frames, total - start)
+            tasks.append(BatchTask(path, name, start, count, expected, images))
+    return tasks
+
+
+def read_frames(task: BatchTask) -> Iterator[Tuple[int, Optional[np.ndarray], float, str]]:
+    """Decode a task's frames.
+    :return Iterator of (frame index, frame or None if unreadable, position in ms, file name)
+    """
+    if task.images:
+        names = list_images(task.path)[task.start:task.start + task.count]
+        for index, name in enumerate(names, task.start):
+            yield index, cv2.imread(os.path.join(task.path, name), cv2.IMREAD_COLOR), float('nan'), name
+        return
+
+    capture = cv2.VideoCapture(task.path)
+    try:
+        if task.start:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, task.start)
+        index = task.start
+        while task.count is None or index < task.start + task.count:
+            position = capture.get(cv2.CAP_PROP_POS_MSEC)
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield index, frame, position, ""
+            index += 1
+    finally:
+        capture.release()
+
+
+# Per-process state of pool workers
+_worker_trackers: Dict[bool, Any] = {}
+_worker_options: Dict[str, Any] = {}
+
+
+def _init_worker(options: Dict[str, Any]) -> None:
+    """Pool initializer: workers run single-threaded OpenCV, as there is one per core."""
+    cv2.setNumThreads(1)
+    _worker_options.update(options)
+
+
+def _worker_tracker(static: bool) -> Any:
+    """The worker's tracker for images (static) or video, created on first use."""
+    if static not in _worker_trackers:
+        from handful.core.tracker import HandTracker
+
+        _worker_trackers[static] = HandTracker(
+            static_image_mode=static,
+            max_num_hands=_worker_options['max_hands'],
+            min_detection_confidence=_worker_options['min_detection_confidence']
+        )
+    return _worker_trackers[static]
+
+
+def track_chunk(task: BatchTask, output_dir: str) -> Dict[str, Any]:
+    """Track one task's frames and write them as a columnar chunk.
+
+    Columns have one row per frame: ``frame`` index, ``time_ms`` position in the
+    video (NaN for images), ``image`` file name, ``width`` and ``height``,
+    ``num_hands``, and per hand slot ``handedness`` (index into HANDEDNESS),
+    ``score``, ``fingers`` raised and ``landmarks``, the normalized and world
+    coordinates as in the binary landmark formats. The chunk is written under a
+    temporary name and renamed when complete, so a chunk that exists is whole.
+    :return Task summary: frames tracked, frames with hands, unreadable frames, seconds
+    """
+    start_time = time.monotonic()
+    max_hands = _worker_options['max_hands']
+    # Image directories may hold unrelated photos; treat them as stills unless told otherwise
+    static = task.images and not _worker_options['image_sequences']
+    tracker = _worker_tracker(static)
+    tracker.reset()
+
+    rows: List[Tuple[int, float, str, int, int]] = []
+    hands: List[Tuple[int, int, Any]] = []
+    unreadable = 0
+    for index, frame, position, name in read_frames(task):
+        if frame is None:
+            unreadable += 1
+            continue
+        _, hand_data = tracker.process_frame(frame, flip_horizontal=_worker_options['flip'])
+        for slot, hand in enumerate((hand_data or [])[:max_hands]):
+            hands.append((len(rows), slot, hand))
+        rows.append((index, position, name, frame.shape[1], frame.shape[0]))
+
+    count = len(rows)
+    columns = {
+        'frame': np.array([row[0] for row in rows], np.int64),
+        'time_ms': np.array([row[1] for row in rows], np.float64),
+        'image': np.array([row[2] for row in rows], str),
+        'width': np.array([row[3] for row in rows], np.int32),
+        'height': np.array([row[4] for row in rows], np.int32),
+        'num_hands': np.zeros(count, np.uint8),
+        'handedness': np.zeros((count, max_hands), np.uint8),
+        'score': np.zeros((count, max_hands), np.float32),
+        'fingers': np.zeros((count, max_hands, 5), bool),
+        'landmarks': np.zeros((count, max_hands, 2, NUM_LANDMARKS, 3), np.float32),
+    }
+    for row, slot, hand in hands:
+        columns['num_hands'][row] = slot + 1
+        columns['handedness'][row, slot] = _HANDEDNESS_CODES.get(hand.handedness, 0)
+        columns['score'][row, slot] = hand.score
+        columns['fingers'][row, slot] = hand.fingers
+        columns['landmarks'][row, slot] = hand.coordinates[0::2]
+
+    path = os.path.join(output_dir, task.chunk)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + ".partial.npz"
+    np.savez(temporary, **columns)
+    os.replace(temporary, path)
+
+    return {
+        'chunk': task.chunk,
+        'frames': count,
+        'frames_with_hands': int(np.count_nonzero(columns['num_hands'])),
+        'unreadable': unreadable,
+        'seconds': time.monotonic() - start_time,
+    }
+
+
+class BatchRunner:
+    """Tracks every frame of a set of videos and image directories on a process pool.
+
+    Inputs are split into chunks of ``chunk_frames`` frames, tracked in parallel
+    with one HandTracker per worker process, and written to one ``.npz`` file of
+    columns per chunk under ``output_dir/<input name>/``. Chunks already written
+    by an earlier run with the same settings are skipped, so an interrupted
+    batch resumes where it stopped. ``manifest.json`` maps inputs to names.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        output_dir: str,
+        chunk_frames: int = 1000,
+        max_hands: int = 2,
+        min_detection_confidence: float = 0.5,
+        flip: bool = True,
+        image_sequences: bool = False
+    ):
+        """Plan the batch and write its manifest.
+        :param paths: Video files and directories (searched recursively for videos and images)
+        :param output_dir: Directory receiving the chunks and the manifest
+        :param chunk_frames: Frames per chunk, which is also the unit of work of a worker
+        :param max_hands: Hands tracked and stored per frame
+        :param min_detection_confidence: Minimum confidence for hand detection
+        :param flip: Mirror frames before tracking, like the live pipeline does
+        :param image_sequences: Track image directories as video (with temporal tracking)
+            rather than as unrelated stills
+        :raises ValueError: If ``output_dir`` holds a run with different settings
+        """
+        if chunk_frames < 1:
+            raise ValueError("chunk_frames must be positive")
+        self.output_dir = output_dir
+        self.options = {
+            'chunk_frames': chunk_frames,
+            'max_hands': max_hands,
+            'min_detection_confidence': min_detection_confidence,
+            'flip': flip,
+            'image_sequences': image_sequences,
+        }
+        self.inputs = find_inputs(paths)
+
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        manifest = {'options': self.options, 'inputs': {}}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest['options'] != self.options:
+                raise ValueError(
+                    f"{output_dir} holds results of a run with settings {manifest['options']}; "
+                    "use another output directory"
+                )
+
+        self.tasks = plan_tasks(self.inputs, chunk_frames)
+        for task in self.tasks:
+            manifest['inputs'][task.name] = {'path': task.path, 'images': task.images}
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        self.pending = [
+            task for task in self.tasks if not os.path.exists(os.path.join(output_dir, task.chunk))
+        ]
+
+    @property
+    def expected_frames(self) -> int:
+        """Frames left to track (from container frame counts, so approximate for videos)."""
+        return sum(task.expected for task in self.pending)
+
+    def run(self, workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Track the pending chunks.
+        :param workers: Worker processes (default: one per core)
+        :return Iterator of task summaries (see track_chunk), in completion order
+        """
+        if not self.pending:
+            return
+        workers = min(workers or os.cpu_count() or 1, len(self.pending))
+        # Spawned workers do not inherit the parent's threads or MediaPipe state
+        with ProcessPoolExecutor(
+            workers, mp.get_context("spawn"), initializer=_init_worker, initargs=(self.options,)
+        ) as pool:
+            futures = [pool.submit(track_chunk, task, self.output_dir) for task in self.pending]
+            for future in as_completed(futures):
+                result = future.result()
+                self.pending = [task for task in self.pending if task.chunk != result['chunk']]
+                yield result
+
+
+def load_results(output_dir: str, name: str) -> Dict[str, np.ndarray]:
+    """Concatenate the chunks of one input into whole columns, in frame order.
+    :param output_dir: Batch output directory
+    :param name: Output name of the input (see manifest.json)
+    """
+    directory = os.path.join(output_dir, name)
+    chunks = sorted(
+        chunk for chunk in os.listdir(directory) if chunk.endswith(".npz") and not chunk.endswith(".partial.npz")
+    )
+    columns: Dict[str, List[np.ndarray]] = {}
+    for chunk in chunks:
+        with np.load(os.path.join(directory, chunk)) as data:
+            for key in data.files:
+                columns.setdefault(key, []).append(data[key])
+    return {key: np.concatenate(values) for key, values in columns.items()}
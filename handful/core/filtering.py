@@ -0,0 +1,170 @@
+"""Temporal smoothing and forward prediction of hand landmarks."""
+
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from handful.core.kinematics import compute_kinematics
+from handful.core.tracker import compute_fingers_up
+from handful.core.types import HandLandmarks
+
+
+class _Track:
+    """Filter state of one hand followed across frames."""
+
+    __slots__ = ('track_id', 'x', 'x_hat', 'dx_hat', 'timestamp', 'missing')
+
+    def __init__(self, track_id: int, x: np.ndarray, timestamp: float):
+        self.track_id = track_id
+        self.x = x  # Last raw (3, 21, 3) coordinates, in scaled units
+        self.x_hat = x  # Filtered coordinates
+        self.dx_hat = np.zeros_like(x)  # Filtered velocity, scaled units per second
+        self.timestamp = timestamp
+        self.missing = 0
+
+    @property
+    def center(self) -> np.ndarray:
+        return self.x_hat[0, :, :2].mean(axis=0)
+
+
+class LandmarkFilter:
+    """One-Euro filter over every landmark coordinate of every tracked hand.
+
+    Each hand is matched to the nearest track of the previous frames, so it
+    keeps its ``track_id`` while it stays in view. The normalized, pixel and
+    world coordinates of all matched hands are filtered together as one
+    ``(hands, 3, 21, 3)`` array. Pixel coordinates are scaled to normalized
+    units first, so ``beta`` means the same for every block. The filtered
+    velocity can extrapolate landmarks forward, e.g. by the pipeline latency.
+
+    See Casiez et al., "1€ Filter: A Simple Speed-based Low-pass Filter for
+    Noisy Input in Interactive Systems" (CHI 2012).
+    """
+
+    def __init__(
+        self,
+        min_cutoff: float = 1.0,
+        beta: float = 20.0,
+        d_cutoff: float = 1.0,
+        prediction: Optional[float] = 0.0,
+        max_prediction: float = 0.2,
+        max_match_distance: float = 0.2,
+        max_missing: int = 3
+    ):
+        """Initialize the filter.
+        :param min_cutoff: Cutoff frequency in Hz at rest; lower smooths more
+        :param beta: Cutoff increase per unit of speed (normalized image widths per
+            second); higher lags less during fast motion
+        :param d_cutoff: Cutoff frequency in Hz for the velocity estimate
+        :param prediction: Seconds to extrapolate landmarks forward, or None to use the
+            latency passed to :meth:`apply`
+        :param max_prediction: Upper bound on the extrapolation in seconds
+        :param max_match_distance: Largest movement of a hand's centre between frames,
+            in normalized image units, for it to keep its identity
+        :param max_missing: Frames a track is kept without a matching hand
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.prediction = prediction
+        self.max_prediction = max_prediction
+        self.max_match_distance = max_match_distance
+        self.max_missing = max_missing
+        self._tracks: List[_Track] = []
+        self._last_track_id = 0
+
+    def reset(self) -> None:
+        """Forget all tracks."""
+        self._tracks = []
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * dt))
+
+    def apply(
+        self,
+        hand_data: Optional[List[HandLandmarks]],
+        timestamp: float,
+        image_shape: Tuple[int, ...],
+        latency: float = 0.0
+    ) -> Optional[List[HandLandmarks]]:
+        """Filter the hands of a new frame.
+        :param hand_data: Hands tracked in the frame (None if there are none)
+        :param timestamp: Frame time in seconds
+        :param image_shape: Shape of the frame the pixel coordinates refer to
+        :param latency: Measured pipeline latency in seconds, used as the extrapolation
+            when ``prediction`` is None
+        :return Filtered hands, sharing one coordinate array, in the input order
+        """
+        for track in self._tracks:
+            track.missing += 1
+        if not hand_data:
+            self._expire()
+            return hand_data
+
+        height, width = image_shape[:2]
+        scale = np.ones((1, 3, 1, 3), np.float32)
+        scale[0, 1] = (width, height, width)
+        raw = np.stack([hand.coordinates for hand in hand_data]) / scale
+
+        matches = self._match(raw)
+        new = [i for i, track in enumerate(matches) if track is None]
+        for i in new:
+            self._last_track_id += 1
+            matches[i] = _Track(self._last_track_id, raw[i], timestamp)
+            self._tracks.append(matches[i])
+        tracks: List[_Track] = matches
+
+        # Filter all hands and coordinates at once
+        raw_previous = np.stack([track.x for track in tracks])
+        previous = np.stack([track.x_hat for track in tracks])
+        dx_previous = np.stack([track.dx_hat for track in tracks])
+        dt = np.array([track.timestamp for track in tracks])
+        dt = np.maximum(timestamp - dt, 1e-3).reshape(-1, 1, 1, 1)
+
+        # Velocity from consecutive measurements rather than from the lagging filtered
+        # value, so that it can be used for extrapolation
+        dx = (raw - raw_previous) / dt
+        dx_hat = dx_previous + self._alpha(self.d_cutoff, dt) * (dx - dx_previous)
+        cutoff = self.min_cutoff + self.beta * np.abs(dx_hat)
+        x_hat = previous + self._alpha(cutoff, dt) * (raw - previous)
+        # New tracks start from the raw measurement at rest
+        x_hat[new], dx_hat[new] = raw[new], 0.0
+
+        for i, track in enumerate(tracks):
+            track.x, track.x_hat, track.dx_hat = raw[i], x_hat[i], dx_hat[i]
+            track.timestamp = timestamp
+            track.missing = 0
+        self._expire()
+
+        lead = latency if self.prediction is None else self.prediction
+        lead = min(max(lead, 0.0), self.max_prediction)
+        output = ((x_hat + dx_hat * lead) * scale).astype(np.float32)
+        fingers = compute_fingers_up(output[:, 1])
+        kinematics = compute_kinematics(output, [hand.handedness for hand in hand_data])
+        return [
+            HandLandmarks(output[i], fingers[i], hand.handedness, hand.score, tracks[i].track_id, kinematics[i])
+            for i, hand in enumerate(hand_data)
+        ]
+
+    def _match(self, raw: np.ndarray) -> List[Optional[_Track]]:
+        """Greedily pair hands with the nearest unclaimed track."""
+        matches: List[Optional[_Track]] = [None] * len(raw)
+        if not self._tracks:
+            return matches
+
+        centers = raw[:, 0, :, :2].mean(axis=1)
+        track_centers = np.stack([track.center for track in self._tracks])
+        distances = np.linalg.norm(centers[:, None] - track_centers[None], axis=2)
+        for flat in np.argsort(distances, axis=None):
+            hand, track = divmod(int(flat), len(self._tracks))
+            if distances[hand, track] > self.max_match_distance:
+                break
+            if matches[hand] is None and self._tracks[track] not in matches:
+                matches[hand] = self._tracks[track]
+        return matches
+
+    def _expire(self) -> None:
+        self._tracks = [track for track in self._tracks if track.missing <= self.max_missing]
+
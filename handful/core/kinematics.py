@@ -0,0 +1,124 @@
+"""Finger joint angles, finger curl and palm orientation computed from 3D landmarks."""
+
+from typing import List, Sequence
+
+import numpy as np
+
+# Landmark chain of each finger from the wrist to the tip, thumb first. The
+# flexion at a joint is the angle between the bones on either side of it.
+FINGER_CHAINS = np.array([
+    [0, 1, 2, 3, 4],
+    [0, 5, 6, 7, 8],
+    [0, 9, 10, 11, 12],
+    [0, 13, 14, 15, 16],
+    [0, 17, 18, 19, 20],
+])
+# Summed flexion of each finger's three joints when straight and when fully curled,
+# in radians. The thumb's first joint (CMC) stays bent even when the thumb is straight.
+CURL_OPEN = np.radians([30.0, 15.0, 15.0, 15.0, 15.0])
+CURL_CLOSED = np.radians([150.0, 250.0, 250.0, 250.0, 240.0])
+# Fingers curled less than this count as extended
+EXTENDED_CURL = 0.4
+
+_WRIST, _INDEX_MCP, _MIDDLE_MCP, _PINKY_MCP = 0, 5, 9, 17
+_NEXT_AXIS = np.array([1, 2, 0])
+_PREVIOUS_AXIS = np.array([2, 0, 1])
+
+
+class HandKinematics:
+    """Joint angles, curl and palm orientation of one hand.
+
+    The arrays are views into batch arrays shared by all hands of a frame, as
+    computed by :func:`compute_kinematics`. Angles do not depend on where the
+    hand is or how it is turned, unlike the image-axis comparisons of
+    ``compute_fingers_up``.
+    """
+
+    __slots__ = ('joint_angles', 'curl', 'extended', 'palm_rotation')
+
+    def __init__(
+        self,
+        joint_angles: np.ndarray,
+        curl: np.ndarray,
+        extended: np.ndarray,
+        palm_rotation: np.ndarray
+    ):
+        """Initialize the kinematics of a hand.
+        :param joint_angles: (5, 3) flexion in radians at each finger's three joints, thumb first,
+            from the knuckle (the thumb's CMC) outwards; 0 is straight
+        :param curl: (5,) float32 curl of each finger, 0 straight to 1 fully curled
+        :param extended: (5,) bool array, True for each finger curled less than EXTENDED_CURL
+        :param palm_rotation: (3, 3) rotation whose columns are the palm's axes (see palm_normal)
+        """
+        self.joint_angles = joint_angles
+        self.curl = curl
+        self.extended = extended
+        self.palm_rotation = palm_rotation
+
+    @property
+    def palm_normal(self) -> np.ndarray:
+        """(3,) unit vector out of the palm, the way the palm faces."""
+        return self.palm_rotation[:, 2]
+
+    @property
+    def palm_direction(self) -> np.ndarray:
+        """(3,) unit vector from the wrist towards the middle finger's knuckle."""
+        return self.palm_rotation[:, 1]
+
+    def __repr__(self) -> str:
+        return f"HandKinematics(curl={self.curl.round(2).tolist()}, extended={self.extended.tolist()})"
+
+
+def _cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cross product over the last axis; np.cross spends far longer on setup for a few vectors."""
+    return a.take(_NEXT_AXIS, -1) * b.take(_PREVIOUS_AXIS, -1) - a.take(_PREVIOUS_AXIS, -1) * b.take(_NEXT_AXIS, -1)
+
+
+def _length(vectors: np.ndarray) -> np.ndarray:
+    return np.sqrt(np.einsum('...k,...k->...', vectors, vectors))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(_length(vectors), 1e-9)[..., None]
+
+
+def compute_kinematics(coordinates: np.ndarray, handedness: Sequence[str]) -> List[HandKinematics]:
+    """Compute the kinematics of a batch of hands in one pass.
+
+    World coordinates are used where the model provided them, since they are
+    true 3D; otherwise the pixel coordinates, whose depth shares x's scale.
+    :param coordinates: (hands, 3, 21, 3) normalized, pixel and world coordinates
+    :param handedness: "Left", "Right" or "" per hand, which decides the palm normal's sign
+    :return HandKinematics objects, one per hand, sharing the batch arrays
+    """
+    has_world = coordinates[:, 2].any(axis=(1, 2))
+    points = np.where(has_world[:, None, None], coordinates[:, 2], coordinates[:, 1])
+
+    # (hands, fingers, bones, xyz)
+    bones = points[:, FINGER_CHAINS[:, 1:]] - points[:, FINGER_CHAINS[:, :-1]]
+    inner, outer = bones[:, :, :-1], bones[:, :, 1:]
+    # atan2 of |u x v| and u . v stays accurate near 0 and 180 degrees, unlike arccos
+    sine = _length(_cross(inner, outer))
+    cosine = np.einsum('...k,...k->...', inner, outer)
+    joint_angles = np.arctan2(sine, cosine).astype(np.float32)
+
+    curl = np.clip((joint_angles.sum(axis=-1) - CURL_OPEN) / (CURL_CLOSED - CURL_OPEN), 0.0, 1.0)
+    curl = curl.astype(np.float32)
+    extended = curl < EXTENDED_CURL
+
+    # MediaPipe labels hands as if the image were mirrored, so a "Left" hand has
+    # the chirality of a right hand in image coordinates: the cross product of its
+    # index and pinky knuckles points out of the palm, and a "Right" hand's into it
+    sign = np.array([-1.0 if label == "Right" else 1.0 for label in handedness], np.float32)
+    wrist = points[:, _WRIST]
+    normal = _cross(points[:, _INDEX_MCP] - wrist, points[:, _PINKY_MCP] - wrist) * sign[:, None]
+    direction = _normalize(points[:, _MIDDLE_MCP] - wrist)
+    # The knuckles do not lie quite square to the direction: make the normal perpendicular to it
+    normal = _normalize(normal - np.einsum('...k,...k->...', normal, direction)[:, None] * direction)
+    across = _cross(direction, normal)
+    palm_rotation = np.stack([across, direction, normal], axis=-1).astype(np.float32)
+
+    return [
+        HandKinematics(joint_angles[i], curl[i], extended[i], palm_rotation[i])
+        for i in range(len(coordinates))
+    ]
@@ -0,0 +1,164 @@
+"""Low-overhead latency histograms and Prometheus text exposition."""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Upper bounds in seconds, spanning sub-millisecond stages to stalled frames
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.033, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations.
+
+    An observation is one bisect and two additions under an uncontended lock,
+    cheap enough to record every stage of every frame.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        """Initialize the histogram.
+        :param buckets: Increasing bucket upper bounds; an implicit +Inf bucket is added
+        """
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """Return cumulative bucket counts (the last one is +Inf), the sum and the count."""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation within its bucket.
+        :param q: Quantile between 0 and 1
+        :return Estimated value, or None without observations
+        """
+        cumulative, _, count = self.snapshot()
+        if not count:
+            return None
+        rank = q * count
+        index = bisect_left(cumulative, rank)
+        if index >= len(self.buckets):
+            # Beyond the last finite bucket: the best bound we have
+            return self.buckets[-1]
+        lower = self.buckets[index - 1] if index else 0.0
+        below = cumulative[index - 1] if index else 0
+        in_bucket = cumulative[index] - below
+        fraction = (rank - below) / in_bucket if in_bucket else 1.0
+        return lower + (self.buckets[index] - lower) * fraction
+
+
+class HistogramSet:
+    """Histograms of one component keyed by name, created on first use."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float) -> None:
+        """Record a value in the histogram of the given name."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram(self.buckets))
+        histogram.observe(value)
+
+    def observe_all(self, values: Mapping[str, float]) -> None:
+        """Record one value per histogram, e.g. a frame's stage timings."""
+        for name, value in values.items():
+            self.observe(name, value)
+
+    def summary(self, quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, Dict[str, float]]:
+        """Estimated quantiles in milliseconds of every histogram, e.g. for /stats."""
+        summary = {}
+        for name, histogram in list(self.histograms.items()):
+            estimates = {f"p{round(q * 100)}_ms": histogram.quantile(q) for q in quantiles}
+            summary[name] = {
+                key: round(value * 1000, 3) for key, value in estimates.items() if value is not None
+            }
+        return summary
+
+
+def _format_labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in labels.values()
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+class MetricsExposition:
+    """Collects samples and renders them in the Prometheus text format (version 0.0.4).
+
+    Samples of one metric are grouped under a single HELP/TYPE header whatever
+    order they are added in, so components can add their samples independently.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, prefix: str = "handful_"):
+        self.prefix = prefix
+        self._families: Dict[str, Tuple[str, str, List[str]]] = {}
+
+    def _family(self, name: str, kind: str, help_text: str) -> List[str]:
+        name = self.prefix + name
+        if name not in self._families:
+            self._families[name] = (kind, help_text, [])
+        return self._families[name][2]
+
+    def add(self, name: str, kind: str, help_text: str, value: float, labels: Optional[Mapping[str, str]] = None) -> None:
+        """Add a counter or gauge sample.
+        :param name: Metric name without prefix (counters should end in ``_total``)
+        :param kind: "counter" or "gauge"
+        :param help_text: Description of the metric
+        :param value: Sample value
+        :param labels: Sample labels
+        """
+        self._family(name, kind, help_text).append(
+            f"{self.prefix}{name}{_format_labels(labels or {})} {float(value):g}"
+        )
+
+    def add_histogram(
+        self,
+        name: str,
+        help_text: str,
+        histogram: Histogram,
+        labels: Optional[Mapping[str, str]] = None
+    ) -> None:
+        """Add the buckets, sum and count of a histogram."""
+        labels = dict(labels or {})
+        lines = self._family(name, "histogram", help_text)
+        cumulative, total, count = histogram.snapshot()
+        bounds = [f"{bound:g}" for bound in histogram.buckets] + ["+Inf"]
+        metric = self.prefix + name
+        for bound, value in zip(bounds, cumulative):
+            lines.append(f"{metric}_bucket{_format_labels({**labels, 'le': bound})} {value}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total:.9g}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+
+    def render(self) -> str:
+        """Render every metric added so far."""
+        lines = []
+        for name, (kind, help_text, samples) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,153 @@
+"""Change detection that lets the tracker skip frames of a static scene."""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from handful.core.types import HandLandmarks
+
+
+class MotionGate:
+    """Decides whether a frame has changed enough since the last tracked one to track it.
+
+    Every frame is shrunk to a small grayscale thumbnail, whose area averaging
+    also suppresses sensor noise, and compared with the thumbnail of the last
+    frame the tracker ran on. Comparing with that frame rather than with the
+    previous one means slow motion accumulates until it is noticed. The frame
+    counts as changed when more than ``changed_fraction`` of the thumbnail's
+    pixels differ by more than ``pixel_threshold`` grey levels.
+
+    A hand can move its fingers without changing enough of a whole-frame
+    thumbnail, so with ``roi_check`` the regions around the last tracked hands
+    are also compared, at a higher resolution of their own. Whatever the scene
+    does, the tracker runs at least ``min_rate`` times a second.
+    """
+
+    def __init__(
+        self,
+        thumbnail_width: int = 64,
+        pixel_threshold: int = 12,
+        changed_fraction: float = 0.002,
+        roi_check: bool = True,
+        roi_size: int = 32,
+        roi_changed_fraction: float = 0.02,
+        roi_margin: float = 0.25,
+        min_rate: float = 2.0
+    ):
+        """Initialize the gate.
+        :param thumbnail_width: Width of the whole-frame thumbnail; its height follows the frame
+        :param pixel_threshold: Grey levels a thumbnail pixel must change by to count as changed
+        :param changed_fraction: Share of changed thumbnail pixels above which a frame is tracked
+        :param roi_check: Whether to also compare the regions around the last tracked hands
+        :param roi_size: Side of the square thumbnail each hand region is compared at
+        :param roi_changed_fraction: Share of changed pixels above which a hand region has changed
+        :param roi_margin: Fraction of a hand's bounding box added on every side of its region
+        :param min_rate: Trackings per second forced on an unchanged scene (0 never forces)
+        """
+        self.thumbnail_width = thumbnail_width
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.roi_check = roi_check
+        self.roi_size = roi_size
+        self.roi_changed_fraction = roi_changed_fraction
+        self.roi_margin = roi_margin
+        self.min_interval = 1.0 / min_rate if min_rate > 0 else float('inf')
+
+        self._reference: Optional[np.ndarray] = None
+        self._thumbnail: Optional[np.ndarray] = None
+        self._regions: List[Tuple[Tuple[int, int, int, int], np.ndarray]] = []
+        self._last_tracked: Optional[float] = None
+
+        self.frames_tracked = 0
+        self.frames_reused = 0
+        self.frames_forced = 0
+        # Share of changed thumbnail pixels in the last frame checked
+        self.last_change = 0.0
+
+    def should_track(self, frame: np.ndarray, timestamp: float) -> bool:
+        """Check a frame against the last tracked one, counting the decision.
+
+        When it returns True the caller must track the frame and then call
+        :meth:`tracked` with its hands.
+        :param frame: BGR frame as the tracker would see it
+        :param timestamp: Capture time of the frame in seconds (monotonic)
+        :return Whether the frame needs tracking; if not, the last hands still apply
+        """
+        self._thumbnail = self._make_thumbnail(frame)
+        if self._reference is None or self._reference.shape != self._thumbnail.shape:
+            return self._track()
+
+        self.last_change = self._changed(self._reference, self._thumbnail)
+        if self.last_change > self.changed_fraction:
+            return self._track()
+        if self.roi_check and any(
+            self._changed(reference, self._region(frame, box)) > self.roi_changed_fraction
+            for box, reference in self._regions
+        ):
+            return self._track()
+        if timestamp - self._last_tracked >= self.min_interval:
+            self.frames_forced += 1
+            return self._track()
+
+        self.frames_reused += 1
+        return False
+
+    def tracked(self, frame: np.ndarray, hand_data: Optional[List[HandLandmarks]], timestamp: float) -> None:
+        """Make a tracked frame the reference for the following ones.
+        :param frame: The frame passed to should_track()
+        :param hand_data: Hands the tracker found in it (None if none)
+        :param timestamp: Capture time of the frame in seconds (monotonic)
+        """
+        self._reference = self._thumbnail
+        self._last_tracked = timestamp
+        self._regions = []
+        if self.roi_check and hand_data:
+            for hand in hand_data:
+                box = self._hand_box(hand, frame.shape)
+                if box is not None:
+                    self._regions.append((box, self._region(frame, box)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Frames tracked and reused so far, e.g. for /stats."""
+        return {
+            'frames_tracked': self.frames_tracked,
+            'frames_reused': self.frames_reused,
+            'frames_forced': self.frames_forced,
+            'last_change': round(self.last_change, 4),
+        }
+
+    def _track(self) -> bool:
+        self.frames_tracked += 1
+        return True
+
+    def _make_thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (self.thumbnail_width, max(1, round(self.thumbnail_width * height / width)))
+        # Averaging every row of a large frame costs more than the rest of the check;
+        # four rows per thumbnail row are enough to keep noise down
+        step = max(1, height // (size[1] * 4))
+        thumbnail = cv2.resize(frame[::step], size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY) if thumbnail.ndim == 3 else thumbnail
+
+    def _region(self, frame: np.ndarray, box: Tuple[int, int, int, int]) -> np.ndarray:
+        x0, y0, x1, y1 = box
+        region = cv2.resize(frame[y0:y1, x0:x1], (self.roi_size, self.roi_size), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if region.ndim == 3 else region
+
+    def _hand_box(self, hand: HandLandmarks, shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+        """Pixel region around a hand, widened by the margin and clipped to the frame."""
+        height, width = shape[:2]
+        points = hand.pixels[:, :2]
+        (x0, y0), (x1, y1) = points.min(axis=0), points.max(axis=0)
+        margin_x, margin_y = (x1 - x0) * self.roi_margin, (y1 - y0) * self.roi_margin
+        x0, x1 = max(0, int(x0 - margin_x)), min(width, int(np.ceil(x1 + margin_x)))
+        y0, y1 = max(0, int(y0 - margin_y)), min(height, int(np.ceil(y1 + margin_y)))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        return x0, y0, x1, y1
+
+    def _changed(self, reference: np.ndarray, thumbnail: np.ndarray) -> float:
+        """Share of pixels that differ by more than the pixel threshold."""
+        difference = cv2.absdiff(reference, thumbnail)
+        return np.count_nonzero(difference > self.pixel_threshold) / difference.size
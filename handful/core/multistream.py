@@ -0,0 +1,408 @@
+"""Multi-camera tracking with one worker process per stream."""
+
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from handful.core.types import HandLandmarks, ProcessedFrame
+from handful.utils.bufferpool import BufferPool
+from handful.utils.shared_ring import SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+
+def _fit_frame(
+    frame: np.ndarray,
+    hand_data: Optional[List[HandLandmarks]],
+    frame_shape: Tuple[int, int, int]
+) -> Tuple[np.ndarray, Optional[List[HandLandmarks]]]:
+    """Downscale a frame that does not fit the ring, keeping its aspect ratio.
+
+    Pixel landmark coordinates are rescaled to match the resized frame.
+    """
+    height, width = frame.shape[:2]
+    scale = min(frame_shape[0] / height, frame_shape[1] / width)
+    if scale >= 1.0:
+        return frame, hand_data
+
+    frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    if hand_data:
+        scale_x, scale_y = frame.shape[1] / width, frame.shape[0] / height
+        scaled = []
+        for hand in hand_data:
+            coordinates = hand.coordinates.copy()
+            coordinates[1, :, 0] *= scale_x
+            coordinates[1, :, 1] *= scale_y
+            coordinates[1, :, 2] *= scale_x  # z shares x's scale
+            scaled.append(HandLandmarks(coordinates, hand.fingers, hand.handedness, hand.score))
+        hand_data = scaled
+    return frame, hand_data
+
+
+def _stop_when_set(stop_event: Any, processor: Any) -> None:
+    """Stop a processor once the supervisor signals shutdown, even if no frames arrive."""
+    stop_event.wait()
+    processor.stop()
+
+
+def _camera_worker(
+    url: str,
+    ring_name: str,
+    new_frame: Any,
+    stop_event: Any,
+    sequence_offset: int,
+    options: Dict[str, Any]
+) -> None:
+    """Worker process body: stream, track and publish frames into a shared ring.
+    :param url: MJPEG stream URL, local camera, or a file to replay in a loop at its native rate
+    :param ring_name: Shared memory name of the stream's ring
+    :param new_frame: Cross-process condition notified after each publish
+    :param stop_event: Event set by the supervisor to shut the worker down
+    :param sequence_offset: Added to frame sequence numbers, so they keep increasing
+        across worker restarts
+    :param options: Worker options built by :class:`MultiStreamSupervisor`
+    """
+    from handful.core.processor import StreamProcessor
+    from handful.core.tracker import HandTracker
+    from handful.sources.async_mjpeg import AsyncMJPEGSource
+    from handful.sources.capture import CaptureFrameSource, is_capture_device
+    from handful.sources.decoders import FrameDecoder
+    from handful.sources.file import FileFrameSource
+    from handful.sources.mjpeg import MJPEGStreamClient
+
+    ring = SharedFrameRing.attach(ring_name)
+    buffer_pool = BufferPool()
+    tracker = HandTracker(buffer_pool=buffer_pool, **options['tracker_kwargs'])
+
+    preprocessing_fn = None
+    if options['resize']:
+        width, height = options['resize']
+        preprocessing_fn = lambda frame: cv2.resize(
+            frame, (width, height), dst=buffer_pool.lease((height, width, 3))
+        )
+        tracker.warmup((height, width, 3))
+    else:
+        tracker.warmup()
+
+    postprocessing_fn = None
+    if options['debug_visualization']:
+        postprocessing_fn = lambda proc: tracker.create_debug_visualization(proc.frame, proc.hand_data)
+
+    # Frames that are resized anyway are decoded at a reduced size
+    decoder = FrameDecoder(options['decoder'], target_size=options['resize'], buffer_pool=buffer_pool)
+    if is_capture_device(url):
+        source = CaptureFrameSource(url, buffer_pool=buffer_pool)
+    elif os.path.isfile(url):
+        source = FileFrameSource(url, loop=True, buffer_pool=buffer_pool, decoder=decoder)
+    elif options['ingest'] == "asyncio":
+        source = AsyncMJPEGSource(url, decoder=decoder)
+    else:
+        source = MJPEGStreamClient(url, decoder=decoder)
+    processor = StreamProcessor(
+        source,
+        tracker,
+        preprocessing_fn=preprocessing_fn,
+        postprocessing_fn=postprocessing_fn,
+        buffer_pool=buffer_pool,
+        **options['processor_kwargs']
+    )
+    watcher = threading.Thread(target=_stop_when_set, args=(stop_event, processor), daemon=True)
+    watcher.start()
+
+    try:
+        for processed in processor.process_frames():
+            if stop_event.is_set():
+                break
+
+            frame, hand_data = _fit_frame(processed.frame, processed.hand_data, ring.frame_shape)
+            ring.write(sequence_offset + processed.sequence, processed.timestamp, frame, hand_data)
+            with new_frame:
+                new_frame.notify_all()
+    finally:
+        processor.stop()
+        ring.close()
+
+
+class SharedStreamProcessor:
+    """Parent-side view of a camera worker, yielding its results like StreamProcessor."""
+
+    def __init__(
+        self,
+        name: str,
+        ring: SharedFrameRing,
+        new_frame: Any,
+        frame_timeout: float = 0.5,
+        encode_fn: Optional[Callable[[np.ndarray], Optional[bytes]]] = None,
+        status_fn: Optional[Callable[[], Dict[str, Any]]] = None,
+        postprocessing_fn: Optional[Callable[[ProcessedFrame], np.ndarray]] = None
+    ):
+        """Initialize the processor.
+        :param name: Stream name
+        :param ring: Ring the worker publishes into
+        :param new_frame: Cross-process condition notified after each publish
+        :param frame_timeout: Seconds to wait for a new frame before re-checking for stop
+        :param encode_fn: Optional function encoding the output frame, stored in ProcessedFrame.encoded
+        :param status_fn: Optional function reporting the worker's state, included in stats()
+        :param postprocessing_fn: Optional function annotating the worker's output frame
+        """
+        self.name = name
+        self.ring = ring
+        self.new_frame = new_frame
+        self.frame_timeout = frame_timeout
+        self.encode_fn = encode_fn
+        self.status_fn = status_fn
+        self.postprocessing_fn = postprocessing_fn
+        self._running = False
+        self._track_listeners: List[Callable[[ProcessedFrame], None]] = []
+
+        self.frames_processed = 0
+        self.frames_dropped = 0
+
+    def add_track_listener(self, listener: Callable[[ProcessedFrame], None]) -> None:
+        """Call ``listener(result)`` for every frame read from the ring, before encoding."""
+        self._track_listeners.append(listener)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return frame accounting for the current run."""
+        stats = {
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped,
+        }
+        if self.status_fn:
+            stats['worker'] = self.status_fn()
+        return stats
+
+    def process_frames(self) -> Generator[ProcessedFrame, None, None]:
+        """Yield frames published by the worker process.
+
+        Yields:
+            ProcessedFrame objects containing the frame and analysis results
+        """
+        self._running = True
+        last_sequence = 0
+        while self._running:
+            with self.new_frame:
+                if self.ring.latest <= last_sequence:
+                    self.new_frame.wait(self.frame_timeout)
+
+            slot = self.ring.read()
+            if slot is None or slot.sequence <= last_sequence:
+                continue
+            if last_sequence:
+                self.frames_dropped += slot.sequence - last_sequence - 1
+            last_sequence = slot.sequence
+
+            result = ProcessedFrame(
+                frame=slot.frame,
+                hand_data=slot.hand_data(),
+                timestamp=slot.timestamp,
+                sequence=slot.sequence
+            )
+            for listener in self._track_listeners:
+                listener(result)
+            if self.postprocessing_fn:
+                result.frame = self.postprocessing_fn(result)
+            if self.encode_fn:
+                result.encoded = self.encode_fn(result.frame)
+
+            self.frames_processed += 1
+            yield result
+
+    def stop(self):
+        """Stop yielding frames (the worker is stopped by the supervisor)."""
+        self._running = False
+
+
+class _Worker:
+    """Supervisor bookkeeping for one camera's worker process."""
+
+    def __init__(self, name: str, url: str, ring: SharedFrameRing, new_frame: Any):
+        self.name = name
+        self.url = url
+        self.ring = ring
+        self.new_frame = new_frame
+        self.process: Any = None
+        self.restarts = 0
+        self.restart_at: Optional[float] = None
+        self.failed = False
+
+    def status(self) -> Dict[str, Any]:
+        process = self.process
+        return {
+            'pid': process.pid if process else None,
+            'alive': bool(process and process.is_alive()),
+            'exitcode': process.exitcode if process else None,
+            'restarts': self.restarts,
+            'failed': self.failed,
+        }
+
+
+class MultiStreamSupervisor:
+    """Runs one MJPEGStreamClient + HandTracker worker process per camera.
+
+    Frames and landmarks come back through a :class:`SharedFrameRing` per camera
+    instead of being pickled, so the parent only pays for one memcpy per frame.
+    The per-camera :class:`SharedStreamProcessor` objects can be served together
+    by a single StreamServer.
+
+    A monitor thread restarts workers that exit unexpectedly, backing off
+    exponentially, and gives up on a stream after ``max_restarts`` attempts.
+    """
+
+    def __init__(
+        self,
+        streams: Dict[str, str],
+        max_frame_shape: Tuple[int, int, int] = (1080, 1920, 3),
+        ring_slots: int = 4,
+        tracker_kwargs: Optional[Dict[str, Any]] = None,
+        processor_kwargs: Optional[Dict[str, Any]] = None,
+        resize: Optional[Tuple[int, int]] = None,
+        decoder: str = "opencv",
+        ingest: str = "thread",
+        debug_visualization: bool = False,
+        max_restarts: int = 5,
+        restart_backoff: float = 1.0,
+        monitor_interval: float = 0.5,
+        worker_fn: Callable[..., None] = _camera_worker
+    ):
+        """Initialize the supervisor.
+        :param streams: Mapping of stream name to MJPEG URL, local camera or file
+        :param max_frame_shape: Largest (height, width, channels) frame any camera sends
+        :param ring_slots: Number of frames buffered per camera
+        :param tracker_kwargs: Keyword arguments for each worker's HandTracker
+        :param processor_kwargs: Keyword arguments for each worker's StreamProcessor
+            (e.g. pipelined, queue_size, queue_policy)
+        :param resize: Optional (width, height) each worker resizes frames to before tracking
+        :param decoder: JPEG decoder backend of the workers (see handful.sources.decoders)
+        :param ingest: How workers read MJPEG streams: "thread" (MJPEGStreamClient) or
+            "asyncio" (AsyncMJPEGSource, which reconnects instead of ending the worker)
+        :param debug_visualization: Draw the tracker's debug overlay in the workers
+        :param max_restarts: Restarts attempted per stream before giving up on it
+        :param restart_backoff: Delay before the first restart, doubled for each further one
+        :param monitor_interval: Seconds between worker liveness checks
+        :param worker_fn: Worker process body (must be picklable, i.e. module level)
+        """
+        self.streams = dict(streams)
+        self.max_frame_shape = max_frame_shape
+        self.ring_slots = ring_slots
+        self.tracker_kwargs = tracker_kwargs or {}
+        self.worker_options = {
+            'tracker_kwargs': self.tracker_kwargs,
+            'processor_kwargs': processor_kwargs or {},
+            'resize': resize,
+            'decoder': decoder,
+            'ingest': ingest,
+            'debug_visualization': debug_visualization,
+        }
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.monitor_interval = monitor_interval
+        self.worker_fn = worker_fn
+        self._context = mp.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._workers: Dict[str, _Worker] = {}
+        self._monitor: Optional[threading.Thread] = None
+        self.processors: Dict[str, SharedStreamProcessor] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> Dict[str, SharedStreamProcessor]:
+        """Create the rings and start one worker process per stream.
+        :return Mapping of stream name to its parent-side processor
+        """
+        with self._lock:
+            self._stop_event.clear()
+            max_hands = self.tracker_kwargs.get('max_num_hands', 2)
+            for name, url in self.streams.items():
+                ring = SharedFrameRing.create(self.max_frame_shape, self.ring_slots, max_hands)
+                worker = _Worker(name, url, ring, self._context.Condition())
+                self._workers[name] = worker
+                self._spawn(worker)
+                self.processors[name] = SharedStreamProcessor(
+                    name, ring, worker.new_frame, status_fn=worker.status
+                )
+
+            self._monitor = threading.Thread(target=self._monitor_workers, name="supervisor", daemon=True)
+            self._monitor.start()
+            return self.processors
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the state of every stream's worker process."""
+        return {name: worker.status() for name, worker in self._workers.items()}
+
+    def _spawn(self, worker: _Worker) -> None:
+        worker.process = self._context.Process(
+            target=self.worker_fn,
+            args=(
+                worker.url,
+                worker.ring.name,
+                worker.new_frame,
+                self._stop_event,
+                worker.ring.latest,
+                self.worker_options
+            ),
+            name=f"handful-{worker.name}",
+            daemon=True
+        )
+        worker.process.start()
+        logger.info(f"Started worker {worker.process.pid} for stream {worker.name!r} ({worker.url})")
+
+    def _monitor_workers(self) -> None:
+        """Restart dead workers until stopped."""
+        while not self._stop_event.wait(self.monitor_interval):
+            with self._lock:
+                if self._stop_event.is_set():
+                    return
+                for worker in self._workers.values():
+                    self._check_worker(worker)
+
+    def _check_worker(self, worker: _Worker) -> None:
+        if worker.failed or worker.process.is_alive():
+            return
+        if worker.restarts >= self.max_restarts:
+            logger.error(
+                f"Worker for stream {worker.name!r} exited with code {worker.process.exitcode} "
+                f"after {worker.restarts} restarts, giving up"
+            )
+            worker.failed = True
+            return
+
+        now = time.monotonic()
+        if worker.restart_at is None:
+            worker.restart_at = now + self.restart_backoff * 2 ** worker.restarts
+            logger.warning(
+                f"Worker for stream {worker.name!r} exited with code {worker.process.exitcode}, "
+                f"restarting in {worker.restart_at - now:.1f}s"
+            )
+        if now >= worker.restart_at:
+            # A worker killed mid-write leaves its slot locked for readers
+            worker.ring.recover()
+            worker.restarts += 1
+            worker.restart_at = None
+            self._spawn(worker)
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop all workers and release the shared memory."""
+        self._stop_event.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout)
+            self._monitor = None
+        with self._lock:
+            for processor in self.processors.values():
+                processor.stop()
+            for name, worker in self._workers.items():
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    logger.warning(f"Worker for stream {name!r} did not exit, terminating")
+                    worker.process.terminate()
+                    worker.process.join()
+            for worker in self._workers.values():
+                worker.ring.close()
+                worker.ring.unlink()
+            self._workers.clear()
+            self.processors.clear()
@@ -0,0 +1,117 @@
+"""On-demand drawing of tracking results for viewers."""
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from handful.core.types import Color, HandLandmarks
+from handful.utils.bufferpool import BufferPool
+
+# Landmark index pairs joined by a line, as in MediaPipe's HAND_CONNECTIONS
+HAND_CONNECTIONS = np.array([
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (17, 18), (18, 19), (19, 20), (0, 17),
+])
+
+
+class OverlayRenderer:
+    """Draws hand landmarks and the finger count onto a frame.
+
+    Drawing is kept out of the tracking path: it works from ``HandLandmarks``
+    alone, so it can run only when a viewer asks for pixels, and at the
+    viewer's resolution rather than the capture resolution. It draws in place,
+    into the frame itself or into a caller-supplied buffer, without copying.
+    """
+
+    def __init__(
+        self,
+        color: Color = Color.WHITE,
+        thickness: int = 2,
+        circle_radius: int = 2,
+        show_finger_count: bool = True,
+        output_size: Optional[Tuple[int, int]] = None,
+        buffer_pool: Optional[BufferPool] = None
+    ):
+        """Initialize the renderer.
+        :param color: Color of landmarks and connections
+        :param thickness: Thickness of connection lines
+        :param circle_radius: Radius of landmark circles
+        :param show_finger_count: Whether to draw the first hand's raised finger count
+        :param output_size: (width, height) to scale frames to before drawing, or None
+            to draw at the frame's own size
+        :param buffer_pool: Optional pool providing the scaled frames
+        """
+        self.color = color.value
+        self.thickness = thickness
+        self.circle_radius = circle_radius
+        self.show_finger_count = show_finger_count
+        self.output_size = output_size
+        self.buffer_pool = buffer_pool
+
+    def render(
+        self,
+        frame: np.ndarray,
+        hand_data: Optional[List[HandLandmarks]],
+        dst: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Draw the overlay.
+        :param frame: Frame the landmarks' pixel coordinates refer to. It is drawn on
+            in place unless it is scaled to ``output_size`` or ``dst`` is given.
+        :param hand_data: Hands to draw (None if there are none)
+        :param dst: Optional buffer of the output shape to draw into
+        :return The annotated frame: ``dst``, ``frame`` itself or a scaled copy
+        """
+        height, width = frame.shape[:2]
+        if self.output_size is not None and self.output_size != (width, height):
+            if dst is None and self.buffer_pool is not None:
+                output_width, output_height = self.output_size
+                dst = self.buffer_pool.lease((output_height, output_width) + frame.shape[2:], frame.dtype)
+            canvas = cv2.resize(frame, self.output_size, dst=dst, interpolation=cv2.INTER_AREA)
+        elif dst is not None:
+            np.copyto(dst, frame)
+            canvas = dst
+        else:
+            canvas = frame
+
+        if hand_data:
+            scale = (canvas.shape[1] / width, canvas.shape[0] / height)
+            self.draw_landmarks(canvas, hand_data, scale)
+            if self.show_finger_count:
+                self.draw_finger_count(canvas, hand_data)
+        return canvas
+
+    def draw_landmarks(
+        self,
+        canvas: np.ndarray,
+        hand_data: List[HandLandmarks],
+        scale: Tuple[float, float] = (1.0, 1.0)
+    ) -> None:
+        """Draw every hand's landmarks and connections in place.
+        :param canvas: Image to draw on
+        :param hand_data: Hands to draw
+        :param scale: (x, y) factors from the landmarks' pixel coordinates to the canvas
+        """
+        points = np.stack([hand.pixels[:, :2] for hand in hand_data]) * scale
+        points = np.rint(points).astype(np.int32)
+        # One call draws the connections of all hands
+        cv2.polylines(canvas, list(points[:, HAND_CONNECTIONS].reshape(-1, 2, 2)), False, self.color, self.thickness)
+        for x, y in points.reshape(-1, 2).tolist():
+            cv2.circle(canvas, (x, y), self.circle_radius, self.color, cv2.FILLED)
+
+    @staticmethod
+    def draw_finger_count(canvas: np.ndarray, hand_data: List[HandLandmarks]) -> None:
+        """Draw the first hand's raised finger count in a box, in place."""
+        cv2.rectangle(canvas, (25, 130), (100, 200), Color.BLUE.value, cv2.FILLED)
+        cv2.putText(
+            canvas,
+            str(hand_data[0].num_fingers_up),
+            (50, 180),
+            cv2.FONT_HERSHEY_PLAIN,
+            3,
+            Color.WHITE.value,
+            3
+        )
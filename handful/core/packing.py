@@ -0,0 +1,131 @@
+"""Compact binary and JSON encodings of tracking results."""
+
+import json
+import struct
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from handful.core.types import HANDEDNESS, NUM_LANDMARKS, HandLandmarks, ProcessedFrame
+
+PACKET_MAGIC = b"HFLM"
+PACKET_VERSION = 1
+_HANDEDNESS_CODES = {label: code for code, label in enumerate(HANDEDNESS)}
+
+# magic, version, hand count, frame width, frame height, sequence,
+# frame timestamp (s), wall-clock send time (s)
+PACKET_HEADER = struct.Struct("<4sBBHHxxQdd")
+# handedness, raised-finger bitmask (bit 0 = thumb), track id (0 if untracked), score
+HAND_HEADER = struct.Struct("<BBHf")
+# Normalized and world (x, y, z) coordinates of every landmark
+HAND_COORDINATES = 2 * NUM_LANDMARKS * 3
+HAND_SIZE = HAND_HEADER.size + HAND_COORDINATES * 4
+
+_FINGER_BITS = 1 << np.arange(5)
+
+
+def pack_frame(result: ProcessedFrame) -> bytes:
+    """Pack a frame's hands into a little-endian binary packet.
+
+    The packet is a :data:`PACKET_HEADER` followed by one :data:`HAND_HEADER`
+    and ``(2, 21, 3)`` float32 normalized and world coordinates per hand, about
+    0.5 KiB per hand. Pixel coordinates are the normalized ones scaled by the
+    frame size in the header.
+    :param result: Tracking result
+    :return Packet bytes
+    """
+    hand_data = result.hand_data or []
+    height, width = result.frame.shape[:2]
+    parts = [PACKET_HEADER.pack(
+        PACKET_MAGIC,
+        PACKET_VERSION,
+        len(hand_data),
+        width,
+        height,
+        result.sequence,
+        result.timestamp,
+        time.time()
+    )]
+    for hand in hand_data:
+        parts.append(HAND_HEADER.pack(
+            _HANDEDNESS_CODES.get(hand.handedness, 0),
+            int(np.dot(hand.fingers, _FINGER_BITS)),
+            hand.track_id & 0xffff,
+            hand.score
+        ))
+        parts.append(hand.coordinates[0::2].astype('<f4', copy=False).tobytes())
+    return b"".join(parts)
+
+
+def unpack_frame(packet: bytes) -> Tuple[Dict[str, Any], List[HandLandmarks]]:
+    """Decode a packet made by :func:`pack_frame`.
+    :param packet: Packet bytes
+    :return Header fields and the packet's hands
+    :raises ValueError: If the packet is malformed
+    """
+    if len(packet) < PACKET_HEADER.size:
+        raise ValueError("Packet is shorter than its header")
+    magic, version, num_hands, width, height, sequence, timestamp, sent_at = (
+        PACKET_HEADER.unpack_from(packet)
+    )
+    if magic != PACKET_MAGIC or version != PACKET_VERSION:
+        raise ValueError(f"Not a version {PACKET_VERSION} landmark packet")
+    if len(packet) != PACKET_HEADER.size + num_hands * HAND_SIZE:
+        raise ValueError("Packet length does not match its hand count")
+
+    hand_data = []
+    offset = PACKET_HEADER.size
+    for _ in range(num_hands):
+        handedness, finger_bits, track_id, score = HAND_HEADER.unpack_from(packet, offset)
+        offset += HAND_HEADER.size
+        coordinates = np.empty((3, NUM_LANDMARKS, 3), np.float32)
+        coordinates[0::2] = np.frombuffer(packet, '<f4', HAND_COORDINATES, offset).reshape(2, NUM_LANDMARKS, 3)
+        np.multiply(coordinates[0], (width, height, width), out=coordinates[1])
+        offset += HAND_COORDINATES * 4
+        hand_data.append(HandLandmarks(
+            coordinates,
+            (finger_bits & _FINGER_BITS).astype(bool),
+            HANDEDNESS[handedness],
+            score,
+            track_id
+        ))
+
+    header = {
+        'sequence': sequence,
+        'timestamp': timestamp,
+        'sent_at': sent_at,
+        'width': width,
+        'height': height,
+    }
+    return header, hand_data
+
+
+def frame_to_dict(result: ProcessedFrame) -> Dict[str, Any]:
+    """Convert a frame's hands to JSON-serializable data."""
+    height, width = result.frame.shape[:2]
+    return {
+        'sequence': result.sequence,
+        'timestamp': result.timestamp,
+        'sent_at': time.time(),
+        'width': width,
+        'height': height,
+        'hands': [
+            {
+                'track_id': hand.track_id,
+                'handedness': hand.handedness,
+                'score': round(float(hand.score), 4),
+                'fingers_up': hand.fingers_up,
+                'curl': hand.kinematics.curl.round(3).tolist(),
+                'palm_normal': hand.kinematics.palm_normal.round(4).tolist(),
+                'normalized': hand.normalized.round(5).tolist(),
+                'world': hand.world.round(5).tolist(),
+            }
+            for hand in result.hand_data or []
+        ],
+    }
+
+
+def pack_frame_json(result: ProcessedFrame) -> bytes:
+    """Encode a frame's hands as compact JSON."""
+    return json.dumps(frame_to_dict(result), separators=(",", ":")).encode()
@@ -0,0 +1,137 @@
+"""Threaded pipeline stages joined by bounded queues."""
+
+import threading
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, Deque, Optional
+
+
+class QueuePolicy(Enum):
+    """What a full stage queue does with a new item."""
+    BLOCK = "block"  # Wait for the consumer to make room
+    DROP_OLDEST = "drop_oldest"  # Evict the oldest queued item
+    LATEST = "latest"  # Keep only the newest item, discarding everything queued (ignores maxsize)
+
+
+class QueueClosed(Exception):
+    """Raised when getting from a queue that has been closed and drained."""
+
+
+class StageQueue:
+    """Bounded FIFO queue with a configurable overflow policy."""
+
+    def __init__(self, maxsize: int = 2, policy: QueuePolicy = QueuePolicy.BLOCK):
+        """Initialize the queue.
+        :param maxsize: Maximum number of queued items (at least 1)
+        :param policy: Behaviour when an item is put into a full queue
+        """
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.dropped = 0
+        self._items: Deque[Any] = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item: Any) -> bool:
+        """Add an item, applying the overflow policy.
+        :param item: Item to enqueue
+        :return False if the queue was closed and the item was discarded
+        """
+        with self._condition:
+            if self.policy == QueuePolicy.BLOCK:
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._items) < self.maxsize
+                )
+            elif self.policy == QueuePolicy.LATEST:
+                self.dropped += len(self._items)
+                self._items.clear()
+            elif len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+
+            if self._closed:
+                return False
+            self._items.append(item)
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Remove and return the oldest item.
+        :param timeout: Maximum time to wait in seconds (None waits forever)
+        :return The item, or None if the timeout expired
+        :raises QueueClosed: If the queue is closed and empty
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                raise QueueClosed()
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+    def close(self) -> None:
+        """Close the queue, waking all waiting producers and consumers."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class PipelineStage:
+    """A worker thread applying a function to every item of its input queue.
+
+    Each stage runs exactly one worker, so items leave a stage in the order they
+    entered it. A function returning None filters the item out of the pipeline.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Optional[Any]],
+        input_queue: StageQueue,
+        output_queue: StageQueue
+    ):
+        """Initialize the stage.
+        :param name: Stage name, used for the thread name and statistics
+        :param fn: Function applied to each item
+        :param input_queue: Queue the stage consumes from
+        :param output_queue: Queue the stage produces into
+        """
+        self.name = name
+        self.fn = fn
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the worker thread."""
+        self._thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for the worker thread to exit."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                item = self.input_queue.get()
+                result = self.fn(item)
+                if result is not None and not self.output_queue.put(result):
+                    break
+        except QueueClosed:
+            pass
+        except BaseException as e:
+            self.error = e
+        finally:
+            # Propagate shutdown (or failure) downstream
+            self.output_queue.close()
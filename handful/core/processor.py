@@ -1,10 +1,32 @@
-from typing import Generator, Callable, Optional
+import threading
+import time
+from typing import Any, Dict, Generator, Callable, List, Optional, Union
 
 import cv2
 import numpy as np
 
+from handful.core.adaptive import AdaptiveController
+from handful.core.filtering import LandmarkFilter
+from handful.core.metrics import HistogramSet
+from handful.core.motion import MotionGate
+from handful.core.pipeline import PipelineStage, QueueClosed, QueuePolicy, StageQueue
 from handful.core.tracker import HandTracker
 from handful.core.types import FrameSource, ProcessedFrame
+from handful.utils.bufferpool import BufferPool
+
+PIPELINE_STAGES = ("preprocess", "track", "annotate", "encode")
+# Timings that make up a frame's processing time, as opposed to decoding and waiting
+PROCESSING_TIMINGS = PIPELINE_STAGES + ("filter",)
+
+# The first queue only ever needs the newest source frame; the queues between
+# stages keep up to ``queue_size`` frames so a brief stall does not drain the pipeline
+DEFAULT_QUEUE_POLICIES = {
+    "preprocess": QueuePolicy.LATEST,
+    "track": QueuePolicy.DROP_OLDEST,
+    "annotate": QueuePolicy.DROP_OLDEST,
+    "encode": QueuePolicy.DROP_OLDEST,
+    "output": QueuePolicy.DROP_OLDEST,
+}
 
 
 class StreamProcessor:
@@ -15,19 +37,97 @@ class StreamProcessor:
         frame_source: FrameSource,
         tracker: Optional[HandTracker] = None,
         preprocessing_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None,
-        postprocessing_fn: Optional[Callable[[ProcessedFrame], np.ndarray]] = None
+        postprocessing_fn: Optional[Callable[[ProcessedFrame], np.ndarray]] = None,
+        frame_timeout: float = 0.5,
+        encode_fn: Optional[Callable[[np.ndarray], Optional[bytes]]] = None,
+        pipelined: bool = False,
+        queue_size: int = 2,
+        queue_policy: Optional[Union[QueuePolicy, Dict[str, QueuePolicy]]] = None,
+        landmark_filter: Optional[LandmarkFilter] = None,
+        buffer_pool: Optional[BufferPool] = None,
+        adaptive: Optional[AdaptiveController] = None,
+        motion_gate: Optional[MotionGate] = None
     ):
         """Initialize the stream processor.
         :param frame_source: Source of video frames (must implement FrameSource protocol)
         :param tracker: HandTracker instance (creates new one if None)
         :param preprocessing_fn: Optional function to preprocess frames before tracking
         :param postprocessing_fn: Optional function to postprocess frames after tracking
+        :param frame_timeout: Seconds to wait for a new frame before re-checking for stop
+        :param encode_fn: Optional function encoding the output frame, stored in ProcessedFrame.encoded
+        :param pipelined: Run each stage on its own worker thread instead of one after another
+        :param queue_size: Capacity of the queue in front of each pipelined stage
+            (ignored by queues using QueuePolicy.LATEST, which hold one item)
+        :param queue_policy: Overflow policy for all stage queues, or a mapping of stage
+            name ("preprocess", "track", "annotate", "encode", "output") to policy.
+            Stages left unset use DEFAULT_QUEUE_POLICIES.
+        :param landmark_filter: Optional filter smoothing (and predicting) landmarks right
+            after tracking; it is given the time since the frame was captured as latency
+        :param buffer_pool: Pool shared by the source, preprocessing and tracker, whose
+            allocation counts are reported in stats()
+        :param adaptive: Optional controller fed every frame's processing time, whose
+            level sets the tracker's inference scale and the share of source frames
+            skipped (the server reads its JPEG quality)
+        :param motion_gate: Optional change detector; frames it finds unchanged since the
+            last tracked one are not tracked but get that frame's hands
         """
         self.frame_source = frame_source
         self.tracker = tracker or HandTracker()
         self.preprocessing_fn = preprocessing_fn
         self.postprocessing_fn = postprocessing_fn
+        self.frame_timeout = frame_timeout
+        self.encode_fn = encode_fn
+        self.pipelined = pipelined
+        self.queue_size = queue_size
+        self.queue_policy = queue_policy
+        self.landmark_filter = landmark_filter
+        self.buffer_pool = buffer_pool
+        self.adaptive = adaptive
+        self.motion_gate = motion_gate
+        self._last_hand_data = None
         self._running = False
+        self._queues: Dict[str, StageQueue] = {}
+        self._track_listeners: List[Callable[[ProcessedFrame], None]] = []
+
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+        # Seconds per frame in each stage, and from capture to output ("end_to_end")
+        self.latency = HistogramSet()
+
+    def add_track_listener(self, listener: Callable[[ProcessedFrame], None]) -> None:
+        """Call ``listener(result)`` as soon as a frame has been tracked.
+
+        Listeners run on the tracking thread before annotation and encoding, so
+        consumers of the hand data (e.g. actuators) do not wait for the video
+        path. They must return quickly and must not modify the result.
+        """
+        self._track_listeners.append(listener)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return frame accounting for the current run.
+
+        ``frames_dropped`` counts source frames that were superseded by a newer one
+        before the processor got to them, including frames dropped by a full stage
+        queue in pipelined mode.
+        """
+        stats = {
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped + sum(q.dropped for q in self._queues.values()),
+        }
+        if self._queues:
+            stats['queues'] = {
+                name: {'depth': len(queue), 'dropped': queue.dropped}
+                for name, queue in self._queues.items()
+            }
+        if self.buffer_pool is not None:
+            stats['buffer_pool'] = self.buffer_pool.stats()
+        if self.adaptive is not None:
+            stats['frames_skipped'] = self.frames_skipped
+            stats['adaptive'] = self.adaptive.stats()
+        if self.motion_gate is not None:
+            stats['motion'] = self.motion_gate.stats()
+        return stats
 
     def process_frames(self) -> Generator[ProcessedFrame, None, None]:
         """Process frames from the source and yield results.
@@ -37,38 +137,198 @@ class StreamProcessor:
         """
         self.frame_source.start()
         self._running = True
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+        self._last_hand_data = None
+        self._queues = {}
+
+        try:
+            if self.pipelined:
+                yield from self._process_pipelined()
+                return
+
+            for new_frame in self._new_frames():
+                result = self._encode(self._annotate(self._track(self._preprocess(new_frame))))
+                self._record_latency(result)
+                self.frames_processed += 1
+                yield result
+
+        finally:
+            self.stop()
+
+    def _new_frames(self) -> Generator[ProcessedFrame, None, None]:
+        """Yield every frame not seen before, with its capture time, counting skipped ones."""
+        frame_info = getattr(self.frame_source, 'frame_info', None)
+        last_sequence = 0
+        while self._running:
+            # Wait for a frame we have not processed yet
+            new_frame = self.frame_source.wait_for_frame(last_sequence, self.frame_timeout)
+            if new_frame is None:
+                continue
 
+            sequence, frame = new_frame
+            if last_sequence:
+                self.frames_dropped += sequence - last_sequence - 1
+            last_sequence = sequence
+            if self.adaptive is not None and self.adaptive.skip_frame():
+                self.frames_skipped += 1
+                continue
+
+            now = time.monotonic()
+            capture_time, timings = frame_info(sequence) if frame_info else (None, {})
+            if capture_time is None:
+                capture_time = now
+            timings = dict(timings)
+            # Time between the source finishing with the frame and the processor taking it
+            timings['wait'] = max(0.0, now - capture_time - sum(timings.values()))
+            yield ProcessedFrame(
+                frame=frame,
+                hand_data=None,
+                timestamp=capture_time,
+                sequence=sequence,
+                capture_time=capture_time,
+                timings=timings
+            )
+
+    def _process_pipelined(self) -> Generator[ProcessedFrame, None, None]:
+        """Run preprocess, track, annotate and encode on one worker thread each.
+
+        Decoding already happens on the frame source's own thread; a feeder thread
+        hands new frames to the first stage queue. Every stage has a single worker,
+        so frames cannot overtake each other and results come out in frame order.
+        """
+        names = PIPELINE_STAGES + ("output",)
+        self._queues = {
+            name: StageQueue(self.queue_size, self._policy_for(name)) for name in names
+        }
+        functions = (self._preprocess, self._track, self._annotate, self._encode)
+        stages: List[PipelineStage] = [
+            PipelineStage(name, fn, self._queues[name], self._queues[next_name])
+            for name, fn, next_name in zip(PIPELINE_STAGES, functions, names[1:])
+        ]
+        first_queue = self._queues[PIPELINE_STAGES[0]]
+        output_queue = self._queues["output"]
+
+        def feed():
+            try:
+                for new_frame in self._new_frames():
+                    if not first_queue.put(new_frame):
+                        break
+            finally:
+                first_queue.close()
+
+        feeder = threading.Thread(target=feed, name="stage-feed", daemon=True)
+        feeder.start()
+        for stage in stages:
+            stage.start()
+
+        last_sequence = 0
         try:
             while self._running:
-                # Get frame from source
-                frame = self.frame_source.get_frame()
-                if frame is None:
+                result = output_queue.get(self.frame_timeout)
+                if result is None:
                     continue
+                if result.sequence <= last_sequence:
+                    continue
+                last_sequence = result.sequence
+                self._record_latency(result)
+                self.frames_processed += 1
+                yield result
+        except QueueClosed:
+            pass
+        finally:
+            self._running = False
+            for queue in self._queues.values():
+                queue.close()
+            feeder.join(timeout=1.0)
+            for stage in stages:
+                stage.join(timeout=1.0)
 
-                # Apply preprocessing if specified
-                if self.preprocessing_fn:
-                    frame = self.preprocessing_fn(frame)
+        for stage in stages:
+            if stage.error is not None:
+                raise stage.error
 
-                # Process frame with hand tracker
-                processed_frame, hand_data = self.tracker.process_frame(frame)
+    def _policy_for(self, stage: str) -> QueuePolicy:
+        if isinstance(self.queue_policy, QueuePolicy):
+            return self.queue_policy
+        return (self.queue_policy or {}).get(stage, DEFAULT_QUEUE_POLICIES[stage])
 
-                # Create processed frame object
-                result = ProcessedFrame(
-                    frame=processed_frame,
-                    hand_data=hand_data,
-                    timestamp=cv2.getTickCount() / cv2.getTickFrequency()
-                )
+    def _preprocess(self, result: ProcessedFrame) -> ProcessedFrame:
+        """Apply preprocessing if specified."""
+        if self.preprocessing_fn:
+            start = time.monotonic()
+            result.frame = self.preprocessing_fn(result.frame)
+            result.timings['preprocess'] = time.monotonic() - start
+        return result
 
-                # Apply postprocessing if specified
-                if self.postprocessing_fn:
-                    result.frame = self.postprocessing_fn(result)
+    def _track(self, result: ProcessedFrame) -> ProcessedFrame:
+        """Process frame with hand tracker."""
+        if self.adaptive is not None:
+            self.tracker.inference_scale = self.adaptive.inference_scale
+        start = time.monotonic()
+        if self.motion_gate is None:
+            result.frame, result.hand_data = self.tracker.process_frame(result.frame)
+        else:
+            self._track_gated(result)
+        now = time.monotonic()
+        result.timings['track'] = now - start
+        for step, seconds in getattr(self.tracker, 'timings', {}).items():
+            result.timings[f"track_{step}"] = seconds
 
-                yield result
+        if self.landmark_filter is not None:
+            result.hand_data = self.landmark_filter.apply(
+                result.hand_data,
+                result.capture_time,
+                result.frame.shape,
+                latency=now - result.capture_time
+            )
+            result.timings['filter'] = time.monotonic() - now
 
-        finally:
-            self.stop()
+        result.timestamp = cv2.getTickCount() / cv2.getTickFrequency()
+        for listener in self._track_listeners:
+            listener(result)
+        return result
+
+    def _track_gated(self, result: ProcessedFrame) -> None:
+        """Track the frame only if the motion gate finds it changed, else reuse the last hands."""
+        # Flip here rather than in the tracker, so the gate sees the frame the hands refer to
+        frame = result.frame
+        dst = self.buffer_pool.lease(frame.shape, frame.dtype) if self.buffer_pool is not None else None
+        result.frame = cv2.flip(frame, 1, dst=dst)
+        if self.motion_gate.should_track(result.frame, result.capture_time):
+            result.frame, self._last_hand_data = self.tracker.process_frame(result.frame, flip_horizontal=False)
+            self.motion_gate.tracked(result.frame, self._last_hand_data, result.capture_time)
+        else:
+            self.tracker.timings = {}
+        result.hand_data = self._last_hand_data
+
+    def _annotate(self, result: ProcessedFrame) -> ProcessedFrame:
+        """Apply postprocessing if specified."""
+        if self.postprocessing_fn:
+            start = time.monotonic()
+            result.frame = self.postprocessing_fn(result)
+            result.timings['annotate'] = time.monotonic() - start
+        return result
+
+    def _encode(self, result: ProcessedFrame) -> ProcessedFrame:
+        """Encode the output frame if an encoder is specified."""
+        if self.encode_fn:
+            start = time.monotonic()
+            result.encoded = self.encode_fn(result.frame)
+            result.timings['encode'] = time.monotonic() - start
+        return result
+
+    def _record_latency(self, result: ProcessedFrame) -> None:
+        """Add a finished frame's stage timings and capture-to-output latency to the histograms."""
+        self.latency.observe_all(result.timings)
+        self.latency.observe('end_to_end', time.monotonic() - result.capture_time)
+        if self.adaptive is not None:
+            self.adaptive.update(sum(result.timings.get(name, 0.0) for name in PROCESSING_TIMINGS))
 
     def stop(self):
         """Stop processing frames"""
         self._running = False
-        self.frame_source.stop()
\ No newline at end of file
+        for queue in self._queues.values():
+            queue.close()
+        self.frame_source.stop()
@@ -1,9 +1,40 @@
-from typing import List, Optional, Tuple
+import time
+from typing import Dict, List, Optional, Tuple
 import cv2
-import mediapipe as mp
 import numpy as np
 
-from handful.core.types import Color, HandLandmarks
+from handful.core.kinematics import compute_kinematics
+from handful.core.overlay import OverlayRenderer
+from handful.core.types import NUM_LANDMARKS, Color, HandLandmarks
+from handful.utils.bufferpool import BufferPool
+
+# Landmark indices compared to decide whether each finger is up
+_FINGER_TIPS = np.array([4, 8, 12, 16, 20])
+_FINGER_JOINTS = np.array([5, 6, 10, 14, 18])
+
+
+def compute_fingers_up(pixels: np.ndarray) -> np.ndarray:
+    """Determine which fingers are up for a batch of hands.
+    :param pixels: (hands, 21, 3) landmark pixel coordinates
+    :return (hands, 5) bool array, thumb first
+    """
+    tips = pixels[:, _FINGER_TIPS]
+    joints = pixels[:, _FINGER_JOINTS]
+    fingers = np.empty(tips.shape[:2], bool)
+    # The thumb folds sideways, the other fingers fold downwards
+    np.less_equal(tips[:, 0, 0], joints[:, 0, 0], out=fingers[:, 0])
+    np.less_equal(tips[:, 1:4, 1], joints[:, 1:4, 1], out=fingers[:, 1:4])
+    np.less(tips[:, 4, 1], joints[:, 4, 1], out=fingers[:, 4])
+    return fingers
+
+
+def _landmark_array(landmark_list) -> np.ndarray:
+    """Read a MediaPipe landmark list into a (21, 3) float32 array."""
+    return np.fromiter(
+        (value for landmark in landmark_list.landmark for value in (landmark.x, landmark.y, landmark.z)),
+        np.float32,
+        count=NUM_LANDMARKS * 3
+    ).reshape(NUM_LANDMARKS, 3)
 
 
 class HandTracker:
@@ -17,7 +48,13 @@ class HandTracker:
         min_tracking_confidence: float = 0.5,
         draw_color: Color = Color.WHITE,
         draw_thickness: int = 2,
-        draw_circle_radius: int = 2
+        draw_circle_radius: int = 2,
+        roi_tracking: bool = False,
+        roi_padding: float = 0.5,
+        roi_redetect_interval: int = 30,
+        roi_min_confidence: float = 0.8,
+        buffer_pool: Optional[BufferPool] = None,
+        inference_scale: float = 1.0
     ):
         """Initialize the hand tracker with customizable parameters.
         :param static_image_mode: Whether to treat input as static images (vs video)
@@ -27,9 +64,25 @@ class HandTracker:
         :param draw_color: Color to use for landmark visualization
         :param draw_thickness: Thickness of drawn landmarks and connections
         :param draw_circle_radius: Radius of landmark circles when drawing
+        :param roi_tracking: Run the model on a crop around the previous frame's hands
+            instead of the whole frame (crops use a second, static-image mode model)
+        :param roi_padding: Padding added on each side of the hand bounding box, as a
+            fraction of its larger side
+        :param roi_redetect_interval: Run full-frame detection at least every N frames
+            so new hands entering the frame are picked up
+        :param roi_min_confidence: Fall back to full-frame detection when a hand found
+            in the crop scores below this handedness confidence
+        :param buffer_pool: Optional pool providing the flipped output frame and the
+            RGB model input, instead of allocating both for every frame
+        :param inference_scale: Fraction of the frame size full-frame detection runs at.
+            Landmarks are still reported in the frame's own pixel coordinates, and ROI
+            crops, which are small already, are not scaled.
         """
+        # MediaPipe takes most of a second to import; load it with the first tracker,
+        # not with every module that imports this one
+        import mediapipe as mp
+
         self.mp_hands = mp.solutions.hands
-        self.mp_draw = mp.solutions.drawing_utils
 
         self.hands = self.mp_hands.Hands(
             static_image_mode=static_image_mode,
@@ -38,57 +91,114 @@ class HandTracker:
             min_tracking_confidence=min_tracking_confidence
         )
 
-        self.draw_specs = self.mp_draw.DrawingSpec(
-            color=draw_color.value,
-            thickness=draw_thickness,
-            circle_radius=draw_circle_radius
-        )
+        self.renderer = OverlayRenderer(draw_color, draw_thickness, draw_circle_radius)
+
+        # Crops move and change size from frame to frame, so they must not feed the
+        # full-frame model's temporal tracking state; a static-image instance runs
+        # detection on every crop instead
+        self.roi_hands = None
+        if roi_tracking:
+            self.roi_hands = self.mp_hands.Hands(
+                static_image_mode=True,
+                max_num_hands=max_num_hands,
+                min_detection_confidence=min_detection_confidence
+            )
+
+        self.buffer_pool = buffer_pool
+        self.inference_scale = inference_scale
+        self.roi_tracking = roi_tracking
+        self.roi_padding = roi_padding
+        self.roi_redetect_interval = roi_redetect_interval
+        self.roi_min_confidence = roi_min_confidence
+        self._roi: Optional[Tuple[int, int, int, int]] = None
+        self._frames_since_detection = 0
+
+        self.roi_detections = 0
+        self.full_frame_detections = 0
+        # Seconds spent in each step of the last process_frame call
+        self.timings: Dict[str, float] = {}
+
+    def warmup(self, frame_shape: Tuple[int, int, int] = (480, 640, 3), frames: int = 2) -> float:
+        """Run the models on blank frames so the first real frame is not slowed by initialization.
+
+        The first inference of a model allocates its tensors and prepares its
+        kernels, which takes several times as long as a normal frame. Blank frames
+        only reach the palm detector (and the ROI model, if any); the landmark
+        model is prepared on the first frame with a hand. With a buffer pool,
+        warming up at the stream's frame shape also preallocates its buffers.
+        :param frame_shape: Shape of the frames that will be tracked
+        :param frames: Number of blank frames to run
+        :return Seconds the warm-up took
+        """
+        start = time.monotonic()
+        frame = np.zeros(frame_shape, np.uint8)
+        for _ in range(frames):
+            self.process_frame(frame)
+        if self.roi_hands is not None:
+            self.roi_hands.process(np.zeros((frame_shape[0] // 2, frame_shape[1] // 2, 3), np.uint8))
+        # Not reset(): restarting the graph would undo the warm-up. Blank frames
+        # leave no hands in the graph's state anyway.
+        self._roi = None
+        self._frames_since_detection = 0
+        self.full_frame_detections = 0
+        self.timings = {}
+        return time.monotonic() - start
+
+    def reset(self) -> None:
+        """Forget the hands of previous frames, e.g. before tracking an unrelated video."""
+        self.hands.reset()
+        self._roi = None
+        self._frames_since_detection = 0
 
     def _process_landmarks(
         self,
-        hand_landmarks,
+        results,
         image_shape: Tuple[int, int, int]
-    ) -> HandLandmarks:
-        """Process detected landmarks to determine finger positions.
-        :param hand_landmarks: MediaPipe hand landmarks
+    ) -> List[HandLandmarks]:
+        """Process detected landmarks of all hands in one batch.
+        :param results: MediaPipe hands results with at least one hand
         :param image_shape: Shape of the input image (height, width, channels)
-        :return HandLandmarks object containing processed data
+        :return HandLandmarks objects, one per detected hand, sharing one coordinate array
         """
         height, width, _ = image_shape
-        x_list = []
-        y_list = []
-        landmark_points = []
+        num_hands = len(results.multi_hand_landmarks)
+
+        # (hands, [normalized, pixel, world], landmarks, xyz)
+        coordinates = np.zeros((num_hands, 3, NUM_LANDMARKS, 3), np.float32)
+        for i, hand_landmarks in enumerate(results.multi_hand_landmarks):
+            coordinates[i, 0] = _landmark_array(hand_landmarks)
+        world_landmarks = getattr(results, 'multi_hand_world_landmarks', None)
+        for i, hand_world_landmarks in enumerate((world_landmarks or [])[:num_hands]):
+            coordinates[i, 2] = _landmark_array(hand_world_landmarks)
 
         # Convert normalized coordinates to pixel coordinates
-        for landmark in hand_landmarks.landmark:
-            x = int(landmark.x * width)
-            y = int(landmark.y * height)
-            x_list.append(x)
-            y_list.append(y)
-            landmark_points.append((x, y))
-
-        # Determine which fingers are up
-        fingers_up = [
-            x_list[4] <= x_list[5],  # thumb
-            y_list[8] <= y_list[6],  # index
-            y_list[12] <= y_list[10],  # middle
-            y_list[16] <= y_list[14],  # ring
-            y_list[20] < y_list[18]  # pinky
-        ]
+        np.multiply(coordinates[:, 0], (width, height, width), out=coordinates[:, 1])
 
-        return HandLandmarks(
-            fingers_up=fingers_up,
-            num_fingers_up=sum(fingers_up),
-            landmark_points=landmark_points
-        )
+        fingers = compute_fingers_up(coordinates[:, 1])
+
+        handedness = getattr(results, 'multi_handedness', None) or []
+        labels, scores = [""] * num_hands, [0.0] * num_hands
+        for i in range(min(num_hands, len(handedness))):
+            classification = handedness[i].classification[0]
+            labels[i], scores[i] = classification.label, classification.score
+        kinematics = compute_kinematics(coordinates, labels)
+
+        return [
+            HandLandmarks(coordinates[i], fingers[i], labels[i], scores[i], kinematics=kinematics[i])
+            for i in range(num_hands)
+        ]
 
     def process_frame(
         self,
         frame: np.ndarray,
-        draw_landmarks: bool = True,
+        draw_landmarks: bool = False,
         flip_horizontal: bool = True
     ) -> Tuple[np.ndarray, Optional[List[HandLandmarks]]]:
         """Process a single frame and detect hands.
+
+        The output frame is the flipped frame, or the input frame itself when it is
+        not flipped; it is only copied to draw landmarks onto an unflipped frame.
+        Annotation for viewers belongs in an OverlayRenderer, run on demand.
         :param frame: Input frame (BGR format)
         :param draw_landmarks: Whether to draw landmarks on the output frame
         :param flip_horizontal: Whether to flip the frame horizontally
@@ -96,32 +206,130 @@ class HandTracker:
             - Processed frame with optional landmark visualization
             - List of HandLandmarks objects (None if no hands detected)
         """
+        start = time.monotonic()
         if flip_horizontal:
-            frame = cv2.flip(frame, 1)
+            frame = cv2.flip(frame, 1, dst=self._lease(frame.shape, frame.dtype))
 
-        # Convert BGR to RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(frame_rgb)
+        roi = None
+        if self._roi is not None and self._frames_since_detection < self.roi_redetect_interval:
+            roi = self._roi
+        results = self._detect(frame, roi)
+        if roi is not None and not self._is_confident(results):
+            roi = None
+            results = self._detect(frame, roi)
+        detected = time.monotonic()
+        self.timings = {'inference': detected - start}
 
-        output_frame = frame.copy()
-        hand_data = []
+        if roi is None:
+            self.full_frame_detections += 1
+            self._frames_since_detection = 0
+        else:
+            self.roi_detections += 1
+            self._frames_since_detection += 1
 
         if results.multi_hand_landmarks:
+            hand_data = self._process_landmarks(results, frame.shape)
+            processed = time.monotonic()
+            self.timings['landmarks'] = processed - detected
+
+            if draw_landmarks:
+                if not flip_horizontal:
+                    # Do not draw on the caller's frame
+                    frame = frame.copy()
+                self.renderer.draw_landmarks(frame, hand_data)
+                self.timings['draw'] = time.monotonic() - processed
+
+            if self.roi_tracking:
+                self._roi = self._roi_from_hands(hand_data, frame.shape)
+            return frame, hand_data
+
+        self._roi = None
+        return frame, None
+
+    def _detect(self, frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]]):
+        """Run the model on the frame, or only on a region of it.
+        :param frame: Input frame (BGR format)
+        :param roi: (x0, y0, x1, y1) region to run on, or None for the whole frame
+        :return MediaPipe results with landmarks in full-frame normalized coordinates
+        """
+        scaled = None
+        if roi is None:
+            crop, hands = frame, self.hands
+            if self.inference_scale < 1.0:
+                # Normalized landmarks do not depend on the resolution the model saw
+                height, width = frame.shape[:2]
+                size = (max(1, round(width * self.inference_scale)), max(1, round(height * self.inference_scale)))
+                scaled = crop = cv2.resize(
+                    frame,
+                    size,
+                    dst=self._lease((size[1], size[0]) + frame.shape[2:], frame.dtype),
+                    interpolation=cv2.INTER_AREA
+                )
+        else:
+            crop, hands = frame[roi[1]:roi[3], roi[0]:roi[2]], self.roi_hands
+
+        # Convert BGR to RGB; the model copies its input, so the buffers are free again after
+        frame_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB, dst=self._lease(crop.shape, crop.dtype))
+        results = hands.process(frame_rgb)
+        if self.buffer_pool is not None:
+            self.buffer_pool.release(frame_rgb)
+            if scaled is not None:
+                self.buffer_pool.release(scaled)
+
+        if roi is not None and results.multi_hand_landmarks:
+            height, width = frame.shape[:2]
+            x0, y0, x1, y1 = roi
+            scale_x = (x1 - x0) / width
+            scale_y = (y1 - y0) / height
             for hand_landmarks in results.multi_hand_landmarks:
-                if draw_landmarks:
-                    self.mp_draw.draw_landmarks(
-                        output_frame,
-                        hand_landmarks,
-                        self.mp_hands.HAND_CONNECTIONS,
-                        self.draw_specs,
-                        self.draw_specs
-                    )
+                for landmark in hand_landmarks.landmark:
+                    landmark.x = landmark.x * scale_x + x0 / width
+                    landmark.y = landmark.y * scale_y + y0 / height
+                    # z shares the scale of x
+                    landmark.z = landmark.z * scale_x
 
-                hand_data.append(self._process_landmarks(hand_landmarks, frame.shape))
+        return results
 
-            return output_frame, hand_data
+    def _lease(self, shape: Tuple[int, ...], dtype) -> Optional[np.ndarray]:
+        """Lease an output buffer from the pool, or None to let OpenCV allocate one."""
+        if self.buffer_pool is None:
+            return None
+        return self.buffer_pool.lease(shape, dtype)
 
-        return output_frame, None
+    def _is_confident(self, results) -> bool:
+        """Whether every hand in the results is detected with enough confidence."""
+        if not results.multi_hand_landmarks:
+            return False
+        return all(
+            handedness.classification[0].score >= self.roi_min_confidence
+            for handedness in results.multi_handedness
+        )
+
+    def _roi_from_hands(
+        self,
+        hand_data: List[HandLandmarks],
+        image_shape: Tuple[int, int, int]
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """Compute a padded, square region around all tracked hands.
+        :param hand_data: Hands tracked in the current frame
+        :param image_shape: Shape of the frame (height, width, channels)
+        :return (x0, y0, x1, y1) region clamped to the frame, or None if it would
+            cover most of the frame anyway
+        """
+        height, width = image_shape[:2]
+        points = np.concatenate([hand.pixels[:, :2] for hand in hand_data])
+        (min_x, min_y), (max_x, max_y) = points.min(axis=0), points.max(axis=0)
+
+        side = max(max_x - min_x, max_y - min_y) * (1 + 2 * self.roi_padding)
+        center_x, center_y = (min_x + max_x) / 2, (min_y + max_y) / 2
+        x0 = int(max(0, center_x - side / 2))
+        y0 = int(max(0, center_y - side / 2))
+        x1 = int(min(width, center_x + side / 2))
+        y1 = int(min(height, center_y + side / 2))
+
+        if (x1 - x0) * (y1 - y0) > 0.75 * width * height or x1 - x0 < 16 or y1 - y0 < 16:
+            return None
+        return x0, y0, x1, y1
 
     def create_debug_visualization(
         self,
@@ -129,25 +337,14 @@ class HandTracker:
         hand_data: List[HandLandmarks],
         show_finger_count: bool = True
     ) -> np.ndarray:
-        """Create a debug visualization of the hand tracking results.
-        :param frame: Input frame
+        """Draw the landmarks and finger count onto a frame the caller owns, in place.
+        :param frame: Frame returned by process_frame
         :param hand_data: List of HandLandmarks objects
         :param show_finger_count: Whether to show finger count on the frame
-        :return Frame with debug visualization
+        :return The same frame, with debug visualization
         """
-        debug_frame = frame.copy()
-
-        if show_finger_count and hand_data:
-            # Draw a blue rectangle with finger count
-            cv2.rectangle(debug_frame, (25, 130), (100, 200), Color.BLUE.value, cv2.FILLED)
-            cv2.putText(
-                debug_frame,
-                str(hand_data[0].num_fingers_up),
-                (50, 180),
-                cv2.FONT_HERSHEY_PLAIN,
-                3,
-                Color.WHITE.value,
-                3
-            )
-
-        return debug_frame
+        if hand_data:
+            self.renderer.draw_landmarks(frame, hand_data)
+            if show_finger_count:
+                self.renderer.draw_finger_count(frame, hand_data)
+        return frame
@@ -1,10 +1,12 @@
 """Shared types and protocols."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Optional, Protocol, Tuple
+from typing import Dict, List, Optional, Protocol, Tuple
 import numpy as np
 
+from handful.core.kinematics import HandKinematics, compute_kinematics
+
 
 class Color(Enum):
     """Standard colors for visualization."""
@@ -15,20 +17,108 @@ class Color(Enum):
     BLUE = (255, 0, 0)
 
 
-@dataclass
+NUM_LANDMARKS = 21
+HANDEDNESS = ("", "Left", "Right")  # Index is the handedness code in binary formats
+
+
 class HandLandmarks:
-    """Stores processed hand landmark data."""
-    fingers_up: List[bool]
-    num_fingers_up: int
-    landmark_points: List[Tuple[int, int]]
+    """Stores processed hand landmark data.
+
+    Coordinates live in a single ``(3, 21, 3)`` float32 array holding the
+    normalized, pixel and world (x, y, z) coordinates of every landmark. When the
+    tracker finds several hands, each one is a view into one batch array, so no
+    per-landmark Python objects are created.
+    """
+
+    __slots__ = ('coordinates', 'fingers', 'handedness', 'score', 'track_id', '_kinematics')
+
+    def __init__(
+        self,
+        coordinates: np.ndarray,
+        fingers: np.ndarray,
+        handedness: str = "",
+        score: float = 0.0,
+        track_id: int = 0,
+        kinematics: Optional[HandKinematics] = None
+    ):
+        """Initialize the hand.
+        :param coordinates: (3, 21, 3) float32 array of normalized, pixel and world coordinates
+        :param fingers: (5,) bool array, True for each raised finger (thumb first)
+        :param handedness: "Left" or "Right" as classified by the model
+        :param score: Handedness classification confidence
+        :param track_id: Identity kept across frames by a LandmarkFilter (0 if untracked)
+        :param kinematics: Joint angles and palm orientation computed with the frame's other
+            hands; computed on first access if not given
+        """
+        self.coordinates = coordinates
+        self.fingers = fingers
+        self.handedness = handedness
+        self.score = score
+        self.track_id = track_id
+        self._kinematics = kinematics
+
+    @property
+    def normalized(self) -> np.ndarray:
+        """(21, 3) landmarks in image-normalized coordinates (z shares x's scale)."""
+        return self.coordinates[0]
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """(21, 3) landmarks in pixel coordinates (z shares x's scale)."""
+        return self.coordinates[1]
+
+    @property
+    def world(self) -> np.ndarray:
+        """(21, 3) landmarks in metres, relative to the hand's approximate centre."""
+        return self.coordinates[2]
+
+    @property
+    def fingers_up(self) -> List[bool]:
+        return self.fingers.tolist()
+
+    @property
+    def num_fingers_up(self) -> int:
+        return int(np.count_nonzero(self.fingers))
+
+    @property
+    def kinematics(self) -> HandKinematics:
+        """Joint angles, finger curl and palm orientation of the hand."""
+        if self._kinematics is None:
+            self._kinematics = compute_kinematics(self.coordinates[None], [self.handedness])[0]
+        return self._kinematics
+
+    @property
+    def curl(self) -> List[float]:
+        """Curl of each finger, 0 straight to 1 fully curled (thumb first)."""
+        return self.kinematics.curl.tolist()
+
+    @property
+    def landmark_points(self) -> List[Tuple[int, int]]:
+        """Integer pixel (x, y) positions of all landmarks."""
+        return [tuple(point) for point in self.pixels[:, :2].astype(np.int32).tolist()]
+
+    def __repr__(self) -> str:
+        return (
+            f"HandLandmarks(track_id={self.track_id}, handedness={self.handedness!r}, score={self.score:.2f}, "
+            f"fingers_up={self.fingers_up})"
+        )
 
 
 @dataclass
 class ProcessedFrame:
-    """Container for a processed frame and its analysis results."""
+    """Container for a processed frame and its analysis results.
+
+    ``capture_time`` is the ``time.monotonic()`` at which the frame's bytes
+    arrived at the source, and ``timings`` holds the seconds the frame spent in
+    each stage (e.g. "decode", "wait", "track"), filled in as it moves along.
+    """
     frame: np.ndarray
     hand_data: Optional[List[HandLandmarks]]
     timestamp: float
+    sequence: int = 0
+    encoded: Optional[bytes] = None
+    capture_time: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)
 
 
 class FrameSource(Protocol):
@@ -44,4 +134,16 @@ class FrameSource(Protocol):
 
     def get_frame(self) -> Optional[np.ndarray]:
         """Get the next frame"""
-        ...
\ No newline at end of file
+        ...
+
+    def wait_for_frame(
+        self,
+        last_sequence: int,
+        timeout: Optional[float] = None
+    ) -> Optional[Tuple[int, np.ndarray]]:
+        """Block until a frame newer than ``last_sequence`` is available.
+        :param last_sequence: Sequence number of the last frame the caller has seen
+        :param timeout: Maximum time to wait in seconds (None waits forever)
+        :return (sequence, frame) tuple, or None if the timeout expired
+        """
+        ...
@@ -1,14 +1,35 @@
+import struct
 import threading
 import time
 from dataclasses import dataclass
-from queue import Queue
-from typing import Generator, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generator, List, Optional, Union
 
 import cv2
-from flask import Flask, Response, render_template
 
+from handful.core.metrics import MetricsExposition
+from handful.core.overlay import OverlayRenderer
+from handful.core.packing import pack_frame, pack_frame_json
 from handful.core.processor import StreamProcessor
 from handful.core.types import ProcessedFrame
+from handful.server.broadcast import BroadcastHub
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+DEFAULT_STREAM = "default"
+# Landmark stream formats: (encoder, per-message framing, mimetype)
+LANDMARK_FORMATS = {
+    'binary': (
+        pack_frame,
+        lambda packet: struct.pack("<I", len(packet)) + packet,
+        'application/octet-stream'
+    ),
+    'json': (
+        pack_frame_json,
+        lambda message: b"data: " + message + b"\n\n",
+        'text/event-stream'
+    ),
+}
 
 
 @dataclass
@@ -17,27 +38,63 @@ class StreamServer:
 
     def __init__(
         self,
-        processor: StreamProcessor,
+        processor: Union[StreamProcessor, Dict[str, StreamProcessor]],
         host: str = "0.0.0.0",
         port: int = 5000,
-        frame_queue_size: int = 10
+        overlay: Optional[OverlayRenderer] = None
     ):
         """Initialize the stream server.
-        :param processor: Stream processor instance
+        :param processor: Stream processor instance, or a mapping of stream name to
+            processor to serve several streams (the first one is the default stream)
         :param host: Host address to bind to
         :param port: Port to listen on
-        :param frame_queue_size: Maximum number of frames to queue
+        :param overlay: Renderer annotating video frames, run only while a stream has
+            viewers (processors that already have a postprocessing_fn keep it)
         """
-        self.processor = processor
+        if not isinstance(processor, dict):
+            processor = {DEFAULT_STREAM: processor}
+        if not processor:
+            raise ValueError("StreamServer needs at least one processor")
+
+        self.processors = processor
+        self.processor = next(iter(processor.values()))
         self.host = host
         self.port = port
-        self.frame_queue = Queue(maxsize=frame_queue_size)
+        self.broadcasters: Dict[str, BroadcastHub] = {
+            name: BroadcastHub(self._frame_encoder(stream_processor), self._wrap_part)
+            for name, stream_processor in self.processors.items()
+        }
+        self.broadcaster = self.broadcasters[next(iter(self.processors))]
+        for name, stream_processor in self.processors.items():
+            if stream_processor.encode_fn is None:
+                # Encode on the processing side (its own stage when pipelined), and only
+                # while someone is watching
+                stream_processor.encode_fn = self.broadcasters[name].encode_if_watched
+        self.overlay = overlay
+        if overlay is not None:
+            for name, stream_processor in self.processors.items():
+                if stream_processor.postprocessing_fn is None:
+                    stream_processor.postprocessing_fn = self._overlay_if_watched(self.broadcasters[name])
+        self.landmark_hubs: Dict[str, Dict[str, BroadcastHub]] = {
+            name: {
+                fmt: BroadcastHub(encode_fn, wrap_fn)
+                for fmt, (encode_fn, wrap_fn, _) in LANDMARK_FORMATS.items()
+            }
+            for name in self.processors
+        }
+        for name, stream_processor in self.processors.items():
+            stream_processor.add_track_listener(self._landmark_publisher(self.landmark_hubs[name]))
         self.app = self._create_app()
         self._running = False
-        self._processing_thread: Optional[threading.Thread] = None
+        self._current_fps = 0
+        self._stream_fps: Dict[str, int] = {name: 0 for name in self.processors}
+        self._processing_threads: List[threading.Thread] = []
 
-    def _create_app(self) -> Flask:
+    def _create_app(self) -> "Flask":
         """Create and configure Flask application"""
+        # Imported here so that importing the server module stays cheap
+        from flask import Flask, Response, abort, render_template, request
+
         app = Flask(
             __name__,
             template_folder='templates',
@@ -47,49 +104,211 @@ class StreamServer:
         @app.route('/')
         def index():
             """Serve the main page."""
-            return render_template("index.html")
+            return render_template("index.html", streams=list(self.processors))
 
         @app.route('/video_feed')
-        def video_feed():
+        @app.route('/video_feed/<name>')
+        def video_feed(name: Optional[str] = None):
             """Stream the processed video frames."""
+            broadcaster = self.broadcaster if name is None else self.broadcasters.get(name)
+            if broadcaster is None:
+                abort(404)
             return Response(
-                self._generate_frames(),
+                self._generate_frames(broadcaster),
                 mimetype='multipart/x-mixed-replace; boundary=frame'
             )
 
+        @app.route('/landmarks')
+        @app.route('/landmarks/<name>')
+        def landmarks(name: Optional[str] = None):
+            """Stream hand data as soon as each frame is tracked.
+
+            ``?format=binary`` (default) sends length-prefixed packed frames,
+            ``?format=json`` sends JSON server-sent events.
+            """
+            hubs = self.landmark_hubs.get(name or next(iter(self.processors)))
+            fmt = request.args.get('format', 'binary')
+            if hubs is None or fmt not in hubs:
+                abort(404)
+            return Response(
+                self._generate_frames(hubs[fmt]),
+                mimetype=LANDMARK_FORMATS[fmt][2],
+                headers={'Cache-Control': 'no-cache'}
+            )
+
         @app.route('/stats')
         def stats():
             """Return current processing statistics."""
-            return {
-                'queue_size': self.frame_queue.qsize(),
-                'is_running': self._running,
-                'fps': self._current_fps
-            }
+            return self._stats()
+
+        @app.route('/metrics')
+        def metrics():
+            """Return stage latencies and frame counters in the Prometheus text format."""
+            return Response(self._metrics(), content_type=MetricsExposition.CONTENT_TYPE)
 
         return app
 
+    def _stats(self) -> Dict[str, Any]:
+        """Collect processing statistics for the /stats endpoint."""
+        stats = {
+            'is_running': self._running,
+            'fps': self._current_fps,
+            **self.broadcaster.stats(),
+            **self.processor.stats()
+        }
+        latency = getattr(self.processor, 'latency', None)
+        if latency is not None:
+            stats['latency_ms'] = latency.summary()
+        if len(self.processors) > 1:
+            stats['streams'] = {
+                name: {
+                    'viewers': self.broadcasters[name].viewers,
+                    'fps': self._stream_fps[name],
+                    **stream_processor.stats()
+                }
+                for name, stream_processor in self.processors.items()
+            }
+        return stats
+
+    def _metrics(self) -> str:
+        """Render stage latency histograms, queue depths and frame counters of every stream."""
+        exposition = MetricsExposition()
+        for name, stream_processor in self.processors.items():
+            labels = {'stream': name}
+            stats = stream_processor.stats()
+            exposition.add(
+                'frames_processed_total', 'counter', 'Frames that went through the whole pipeline.',
+                stats['frames_processed'], labels
+            )
+            exposition.add(
+                'frames_dropped_total', 'counter', 'Source frames superseded before they were processed.',
+                stats['frames_dropped'], labels
+            )
+            for queue, queue_stats in stats.get('queues', {}).items():
+                exposition.add(
+                    'queue_depth', 'gauge', 'Frames waiting in a pipeline stage queue.',
+                    queue_stats['depth'], {**labels, 'queue': queue}
+                )
+            pool_stats = stats.get('buffer_pool')
+            if pool_stats is not None:
+                exposition.add(
+                    'buffer_pool_leases_total', 'counter', 'Frame buffers leased from the pool.',
+                    pool_stats['leases'], labels
+                )
+                exposition.add(
+                    'buffer_pool_allocations_total', 'counter', 'Frame buffers the pool had to allocate.',
+                    pool_stats['allocations'], labels
+                )
+                exposition.add(
+                    'buffer_pool_bytes', 'gauge', 'Memory held by the frame buffer pool.',
+                    pool_stats['bytes'], labels
+                )
+            adaptive_stats = stats.get('adaptive')
+            if adaptive_stats is not None:
+                exposition.add(
+                    'frames_skipped_total', 'counter', 'Source frames skipped by the adaptive controller.',
+                    stats['frames_skipped'], labels
+                )
+                exposition.add(
+                    'adaptive_level', 'gauge', 'Quality level of the adaptive controller (0 is best).',
+                    adaptive_stats['level'], labels
+                )
+            motion_stats = stats.get('motion')
+            if motion_stats is not None:
+                exposition.add(
+                    'motion_frames_tracked_total', 'counter', 'Frames the motion gate passed to the tracker.',
+                    motion_stats['frames_tracked'], labels
+                )
+                exposition.add(
+                    'motion_frames_reused_total', 'counter',
+                    'Unchanged frames that reused the last tracked hands.',
+                    motion_stats['frames_reused'], labels
+                )
+            hub_stats = self.broadcasters[name].stats()
+            exposition.add('viewers', 'gauge', 'Connected video viewers.', hub_stats['viewers'], labels)
+            exposition.add(
+                'frames_encoded_total', 'counter', 'Frames JPEG-encoded for viewers.',
+                hub_stats['items_encoded'], labels
+            )
+
+            latency = getattr(stream_processor, 'latency', None)
+            if latency is None:
+                continue
+            for stage, histogram in sorted(latency.histograms.items()):
+                if stage == 'end_to_end':
+                    exposition.add_histogram(
+                        'end_to_end_latency_seconds', 'Time from frame capture to pipeline output.',
+                        histogram, labels
+                    )
+                else:
+                    exposition.add_histogram(
+                        'stage_latency_seconds', 'Time a frame spent in each pipeline stage.',
+                        histogram, {**labels, 'stage': stage}
+                    )
+        return exposition.render()
+
+
+    def _overlay_if_watched(self, broadcaster: BroadcastHub) -> Callable[[ProcessedFrame], Any]:
+        """Build a postprocessing function drawing the overlay only while someone watches."""
+        def annotate(result: ProcessedFrame):
+            if not broadcaster.viewers:
+                return result.frame
+            return self.overlay.render(result.frame, result.hand_data)
+        return annotate
+
+    @staticmethod
+    def _landmark_publisher(hubs: Dict[str, BroadcastHub]) -> Callable[[ProcessedFrame], None]:
+        """Build a track listener publishing each result to the landmark hubs."""
+        def publish(result: ProcessedFrame):
+            for hub in hubs.values():
+                # Pack on the tracking thread while the result still holds the tracked frame
+                hub.publish(result, hub.encode_if_watched(result))
+        return publish
+
+    def _frame_encoder(self, processor: StreamProcessor) -> Callable[[Any], Optional[bytes]]:
+        """Build a stream's JPEG encoder, following the quality of its adaptive controller if any."""
+        def encode(frame) -> Optional[bytes]:
+            adaptive = getattr(processor, 'adaptive', None)
+            return self._encode_frame(frame, adaptive.jpeg_quality if adaptive is not None else None)
+        return encode
+
+    @staticmethod
+    def _encode_frame(frame, quality: Optional[int] = None) -> Optional[bytes]:
+        """JPEG-encode a frame for streaming.
+        :param frame: Frame to encode
+        :param quality: JPEG quality from 0 to 100, or None for OpenCV's default
+        """
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality] if quality is not None else []
+        ret, buffer = cv2.imencode('.jpg', frame, params)
+        return buffer.tobytes() if ret else None
+
+    @staticmethod
+    def _wrap_part(jpeg: bytes) -> bytes:
+        """Add the MIME multipart headers to an encoded frame."""
+        return (b'--frame\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' +
+                jpeg +
+                b'\r\n')
 
-    def _generate_frames(self) -> Generator[bytes, None, None]:
-        """Generate MJPEG stream from processed frames.
+    def _generate_frames(self, broadcaster: BroadcastHub) -> Generator[bytes, None, None]:
+        """Generate a stream of the items published to a hub.
+        :param broadcaster: Hub of the requested stream
 
         Yields:
-            JPEG-encoded frame data with MIME multipart headers
+            Encoded items with their framing, e.g. JPEG frames with MIME multipart headers
         """
-        while self._running:
-            try:
-                frame = self.frame_queue.get(timeout=0.1)
-                ret, buffer = cv2.imencode('.jpg', frame)
-                if ret:
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' +
-                           buffer.tobytes() +
-                           b'\r\n')
-            except:
-                continue  # No frame available, try again
-
-
-    def _process_frames(self):
-        """Process frames in a separate thread."""
+        with broadcaster.subscribe() as subscription:
+            while self._running:
+                part = subscription.next(timeout=0.5)
+                if part is not None:
+                    yield part
+
+
+    def _process_frames(self, name: str):
+        """Process frames of one stream in a separate thread."""
+        processor = self.processors[name]
+        broadcaster = self.broadcasters[name]
+        is_default = processor is self.processor
         last_frame_time = time.time()
         frames_processed = 0
 
@@ -100,36 +319,36 @@ class StreamServer:
             current_time = time.time()
             frames_processed += 1
             if current_time - last_frame_time >= 1.0:
-                self._current_fps = frames_processed
+                self._stream_fps[name] = frames_processed
+                if is_default:
+                    self._current_fps = frames_processed
                 frames_processed = 0
                 last_frame_time = current_time
 
-            # Add frame to queue, dropping oldest if full
-            if self.frame_queue.full():
-                try:
-                    self.frame_queue.get_nowait()
-                except:
-                    pass
-            self.frame_queue.put(processed.frame)
+            # Hand the frame to viewers; it is encoded on demand if not already
+            broadcaster.publish(processed.frame, processed.encoded)
 
         # Start processing frames
-        for processed_frame in self.processor.process_frames():
+        for processed_frame in processor.process_frames():
             if not self._running:
                 break
             handle_frame(processed_frame)
 
 
-    def start(self):
-        """Start the stream server."""
+    def _start_processing(self):
+        """Start frame processing for every stream in a separate thread."""
         self._running = True
         self._current_fps = 0
+        self._processing_threads = [
+            threading.Thread(target=self._process_frames, args=(name,), daemon=True)
+            for name in self.processors
+        ]
+        for thread in self._processing_threads:
+            thread.start()
 
-        # Start frame processing in a separate thread
-        self._processing_thread = threading.Thread(
-            target=self._process_frames,
-            daemon=True
-        )
-        self._processing_thread.start()
+    def start(self):
+        """Start the stream server."""
+        self._start_processing()
 
         # Start Flask server
         self.app.run(
@@ -143,11 +362,5 @@ class StreamServer:
     def stop(self):
         """Stop the stream server."""
         self._running = False
-        if self._processing_thread:
-            self._processing_thread.join(timeout=1.0)
-        # Clear the queue
-        while not self.frame_queue.empty():
-            try:
-                self.frame_queue.get_nowait()
-            except:
-                break
\ No newline at end of file
+        for thread in self._processing_threads:
+            thread.join(timeout=1.0)
@@ -0,0 +1,193 @@
+"""Single event loop HTTP server for many concurrent viewers."""
+
+import asyncio
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+from handful.core.metrics import MetricsExposition
+from handful.core.overlay import OverlayRenderer
+from handful.core.processor import StreamProcessor
+from handful.server.app import LANDMARK_FORMATS, StreamServer
+from handful.server.broadcast import BroadcastHub
+
+logger = logging.getLogger(__name__)
+
+_MJPEG_TYPE = "multipart/x-mixed-replace; boundary=frame"
+
+
+class AsyncStreamServer(StreamServer):
+    """Serves the same routes as StreamServer from one asyncio event loop.
+
+    Every viewer is a coroutine rather than an OS thread. Processing threads
+    wake the loop through a hub listener when a frame is published, and each
+    connection writes the newest frame without blocking, then awaits the
+    socket draining. A slow viewer therefore skips frames instead of buffering
+    them, and one that stops reading for ``send_timeout`` seconds is dropped.
+    """
+
+    def __init__(
+        self,
+        processor: Union[StreamProcessor, Dict[str, StreamProcessor]],
+        host: str = "0.0.0.0",
+        port: int = 5000,
+        send_timeout: float = 10.0,
+        write_buffer_size: int = 1 << 20,
+        overlay: Optional[OverlayRenderer] = None
+    ):
+        """Initialize the stream server.
+        :param processor: Stream processor instance, or a mapping of stream name to processor
+        :param host: Host address to bind to
+        :param port: Port to listen on (0 picks a free port, stored in ``port`` once started)
+        :param send_timeout: Seconds a viewer may take to accept one frame before it is dropped
+        :param write_buffer_size: Bytes buffered per connection before writes wait for the socket
+        :param overlay: Renderer annotating video frames, run only while a stream has viewers
+        """
+        super().__init__(processor, host, port, overlay)
+        self.send_timeout = send_timeout
+        self.write_buffer_size = write_buffer_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._frame_events: Dict[BroadcastHub, asyncio.Event] = {}
+        self._index_page = b""
+        self.started = threading.Event()
+
+    def start(self):
+        """Start processing and serve until stopped."""
+        from flask import render_template
+
+        self._start_processing()
+        with self.app.app_context():
+            self._index_page = render_template("index.html", streams=list(self.processors)).encode()
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._running = False
+
+    def stop(self):
+        """Stop the stream server."""
+        self._running = False
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._shutdown)
+        super().stop()
+
+    def _shutdown(self):
+        self._server.close()
+        for hub in list(self._frame_events):
+            self._wake_viewers(hub)
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        listeners = {}
+        for hub in self._hubs():
+            self._frame_events[hub] = asyncio.Event()
+            listeners[hub] = lambda sequence, hub=hub: self._loop.call_soon_threadsafe(
+                self._wake_viewers, hub
+            )
+            hub.add_listener(listeners[hub])
+
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.started.set()
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for hub, listener in listeners.items():
+                hub.remove_listener(listener)
+            self.started.clear()
+
+    def _hubs(self) -> List[BroadcastHub]:
+        hubs = list(self.broadcasters.values())
+        for formats in self.landmark_hubs.values():
+            hubs.extend(formats.values())
+        return hubs
+
+    def _wake_viewers(self, hub: BroadcastHub):
+        """Wake every connection waiting for an item of the hub."""
+        event = self._frame_events[hub]
+        self._frame_events[hub] = asyncio.Event()
+        event.set()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.transport.set_write_buffer_limits(high=self.write_buffer_size)
+        try:
+            method, path, query = await self._read_request(reader)
+            route, _, name = path.lstrip("/").partition("/")
+            name = name or next(iter(self.processors))
+            hub, content_type = None, None
+            if route == "video_feed":
+                hub, content_type = self.broadcasters.get(name), _MJPEG_TYPE
+            elif route == "landmarks":
+                fmt = query.get("format", ["binary"])[0]
+                hub = self.landmark_hubs.get(name, {}).get(fmt)
+                content_type = LANDMARK_FORMATS[fmt][2] if hub else None
+
+            if method != "GET":
+                await self._respond(writer, 405, b"Method Not Allowed", "text/plain")
+            elif path == "/":
+                await self._respond(writer, 200, self._index_page, "text/html; charset=utf-8")
+            elif path == "/stats":
+                await self._respond(writer, 200, json.dumps(self._stats()).encode(), "application/json")
+            elif path == "/metrics":
+                await self._respond(writer, 200, self._metrics().encode(), MetricsExposition.CONTENT_TYPE)
+            elif hub is not None:
+                await self._stream(writer, hub, content_type)
+            else:
+                await self._respond(writer, 404, b"Not Found", "text/plain")
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except asyncio.TimeoutError:
+            logger.info(f"Dropping viewer {writer.get_extra_info('peername')} that stopped reading")
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, List[str]]]:
+        """Read the request head and return its method, path and query parameters."""
+        head = await reader.readuntil(b"\r\n\r\n")
+        method, target, _ = head.split(b"\r\n", 1)[0].decode("latin-1").split(" ", 2)
+        url = urlsplit(target)
+        return method, url.path.rstrip("/") or "/", parse_qs(url.query)
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str):
+        reason = {200: "OK", 404: "Not Found", 405: "Method Not Allowed"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def _stream(self, writer: asyncio.StreamWriter, hub: BroadcastHub, content_type: str):
+        """Push the newest item of a hub to one viewer until it disconnects."""
+        writer.write(
+            f"HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Cache-Control: no-cache, no-store\r\n"
+            f"Connection: close\r\n\r\n".encode()
+        )
+        with hub.subscribe() as subscription:
+            while self._running and not writer.is_closing():
+                # Take the event before polling so a publish in between is not missed
+                frame_event = self._frame_events[hub]
+                taken = subscription.poll()
+                if taken is None:
+                    await frame_event.wait()
+                    continue
+
+                if taken[2] is None:
+                    # Not encoded by the processor (e.g. the first frame after connecting)
+                    part = await self._loop.run_in_executor(None, subscription.encode, *taken)
+                else:
+                    part = subscription.encode(*taken)
+                if part is None:
+                    continue
+
+                writer.write(part)
+                await asyncio.wait_for(writer.drain(), self.send_timeout)
@@ -0,0 +1,192 @@
+"""Latest-value broadcasting of encoded frames to many viewers."""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class BroadcastHub:
+    """Shares the newest published item with any number of subscribers.
+
+    Each item is encoded at most once, and only when someone is watching: either
+    ahead of time by the producer through :meth:`encode_if_watched`, or lazily by
+    the first subscriber that asks for it. Every subscriber receives the same
+    bytes object, so memory is shared and released once the last viewer drops
+    its reference. Subscribers keep a cursor to the newest item rather than a
+    queue, so a slow viewer skips items instead of holding anyone else back.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[Any], Optional[bytes]],
+        wrap_fn: Optional[Callable[[bytes], bytes]] = None
+    ):
+        """Initialize the hub.
+        :param encode_fn: Encodes a published item, returning None on failure
+        :param wrap_fn: Optional framing applied once to each encoded item (e.g. MIME part headers)
+        """
+        self.encode_fn = encode_fn
+        self.wrap_fn = wrap_fn
+        self._condition = threading.Condition()
+        self._encode_lock = threading.Lock()
+        self._sequence = 0
+        self._item: Any = None
+        self._payload: Optional[bytes] = None
+        self._viewers = 0
+        self._listeners: List[Callable[[int], None]] = []
+
+        self.items_published = 0
+        self.items_encoded = 0
+
+    @property
+    def viewers(self) -> int:
+        """Number of active subscriptions."""
+        return self._viewers
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'viewers': self._viewers,
+            'items_published': self.items_published,
+            'items_encoded': self.items_encoded,
+        }
+
+    def encode_if_watched(self, item: Any) -> Optional[bytes]:
+        """Encode an item ahead of publishing, but only if anyone is subscribed.
+
+        Suitable as a processor ``encode_fn`` so encoding runs in the producer's
+        pipeline instead of on a viewer's thread.
+        """
+        if not self._viewers:
+            return None
+        with self._condition:
+            self.items_encoded += 1
+        return self.encode_fn(item)
+
+    def add_listener(self, listener: Callable[[int], None]) -> None:
+        """Call ``listener(sequence)`` on the publishing thread after every publish.
+
+        Lets consumers that cannot block on the hub's condition (e.g. an event
+        loop) be woken up instead of polling. Listeners must return quickly.
+        """
+        with self._condition:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int], None]) -> None:
+        with self._condition:
+            self._listeners.remove(listener)
+
+    def publish(self, item: Any, encoded: Optional[bytes] = None) -> int:
+        """Replace the current item and wake all subscribers.
+        :param item: New item
+        :param encoded: The item's encoding, if the producer already has it
+        :return Sequence number of the item
+        """
+        payload = None
+        if encoded is not None:
+            payload = self.wrap_fn(encoded) if self.wrap_fn else encoded
+        with self._condition:
+            self._sequence += 1
+            self._item = item
+            self._payload = payload
+            self.items_published += 1
+            self._condition.notify_all()
+            sequence, listeners = self._sequence, list(self._listeners)
+        for listener in listeners:
+            listener(sequence)
+        return sequence
+
+    def subscribe(self) -> "Subscription":
+        """Register a new viewer. Use the result as a context manager."""
+        with self._condition:
+            self._viewers += 1
+        return Subscription(self)
+
+    def _unsubscribe(self) -> None:
+        with self._condition:
+            self._viewers -= 1
+
+    def _encode(self, sequence: int, item: Any) -> Optional[bytes]:
+        """Encode an item for subscribers, once per sequence number."""
+        with self._encode_lock:
+            with self._condition:
+                if self._sequence == sequence and self._payload is not None:
+                    return self._payload
+
+            encoded = self.encode_fn(item)
+            payload = None
+            if encoded is not None:
+                payload = self.wrap_fn(encoded) if self.wrap_fn else encoded
+
+            with self._condition:
+                self.items_encoded += 1
+                if payload is not None and self._sequence == sequence:
+                    self._payload = payload
+            return payload
+
+
+class Subscription:
+    """A viewer's cursor into a :class:`BroadcastHub`."""
+
+    def __init__(self, hub: BroadcastHub):
+        self.hub = hub
+        self.cursor = 0
+        self.items_received = 0
+        self.items_skipped = 0
+        self._closed = False
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def next(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Wait for an item newer than the last one received.
+        :param timeout: Maximum time to wait in seconds (None waits forever)
+        :return Encoded item, or None if the timeout expired
+        """
+        hub = self.hub
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with hub._condition:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not hub._condition.wait_for(lambda: hub._sequence > self.cursor, remaining):
+                    return None
+            taken = self.poll()
+            if taken is None:
+                continue
+            payload = self.encode(*taken)
+            if payload is not None:
+                return payload
+
+    def poll(self) -> Optional[Tuple[int, Any, Optional[bytes]]]:
+        """Take the newest item without waiting or encoding.
+
+        For callers that must not block, such as an event loop, which can run
+        :meth:`encode` elsewhere when the payload is not ready yet.
+        :return (sequence, item, payload or None), or None if there is nothing new
+        """
+        hub = self.hub
+        with hub._condition:
+            if hub._sequence <= self.cursor:
+                return None
+            sequence, item, payload = hub._sequence, hub._item, hub._payload
+
+        if self.cursor:
+            self.items_skipped += sequence - self.cursor - 1
+        self.cursor = sequence
+        return sequence, item, payload
+
+    def encode(self, sequence: int, item: Any, payload: Optional[bytes] = None) -> Optional[bytes]:
+        """Complete an item taken by :meth:`poll`, encoding it if needed (may block)."""
+        if payload is None:
+            payload = self.hub._encode(sequence, item)
+        if payload is not None:
+            self.items_received += 1
+        return payload
+
+    def close(self) -> None:
+        """Unregister the viewer from the hub."""
+        if not self._closed:
+            self._closed = True
+            self.hub._unsubscribe()
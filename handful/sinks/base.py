@@ -0,0 +1,156 @@
+"""Base class for actuator output sinks."""
+
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+import numpy as np
+
+from handful.core.packing import pack_frame
+from handful.core.types import ProcessedFrame
+
+logger = logging.getLogger(__name__)
+
+
+class OutputSink(ABC):
+    """Sends the newest tracking result to an actuator at a fixed rate.
+
+    Results are submitted from the tracking thread (see :meth:`attach`) and
+    coalesced: only the newest one waiting at each send tick goes out. A sender
+    thread ticks at ``rate_hz`` on an absolute schedule, drops updates older
+    than ``deadline`` seconds instead of actuating on stale state, and records
+    how late each send was against its tick.
+    """
+
+    def __init__(
+        self,
+        rate_hz: float = 50.0,
+        deadline: float = 0.1,
+        encode_fn: Callable[[ProcessedFrame], bytes] = pack_frame,
+        jitter_window: int = 1000
+    ):
+        """Initialize the sink.
+        :param rate_hz: Send rate in updates per second
+        :param deadline: Maximum age in seconds of an update, measured from submission
+        :param encode_fn: Converts a result into the bytes sent to the actuator
+        :param jitter_window: Number of recent sends kept for jitter statistics
+        """
+        self.period = 1.0 / rate_hz
+        self.deadline = deadline
+        self.encode_fn = encode_fn
+        self._condition = threading.Condition()
+        self._pending: Optional[ProcessedFrame] = None
+        self._pending_time = 0.0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._jitter: Deque[float] = deque(maxlen=jitter_window)
+
+        self.updates_submitted = 0
+        self.updates_coalesced = 0
+        self.updates_sent = 0
+        self.updates_stale = 0
+        self.send_errors = 0
+
+    @abstractmethod
+    def _open(self) -> None:
+        """Open the transport."""
+        pass
+
+    @abstractmethod
+    def _send(self, data: bytes) -> None:
+        """Send one encoded update without blocking; raise OSError on failure."""
+        pass
+
+    @abstractmethod
+    def _close(self) -> None:
+        """Close the transport."""
+        pass
+
+    def attach(self, processor: Any) -> None:
+        """Feed the sink from a processor's tracking thread."""
+        processor.add_track_listener(self.submit)
+
+    def submit(self, result: ProcessedFrame) -> None:
+        """Offer a new result, replacing any result not sent yet."""
+        with self._condition:
+            if self._pending is not None:
+                self.updates_coalesced += 1
+            self._pending = result
+            self._pending_time = time.monotonic()
+            self.updates_submitted += 1
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return update accounting and send jitter in milliseconds."""
+        jitter = np.array(self._jitter) * 1000
+        return {
+            'updates_submitted': self.updates_submitted,
+            'updates_coalesced': self.updates_coalesced,
+            'updates_sent': self.updates_sent,
+            'updates_stale': self.updates_stale,
+            'send_errors': self.send_errors,
+            'jitter_ms': {
+                'mean': float(jitter.mean()) if len(jitter) else 0.0,
+                'p99': float(np.percentile(jitter, 99)) if len(jitter) else 0.0,
+                'max': float(jitter.max()) if len(jitter) else 0.0,
+            },
+        }
+
+    def start(self) -> None:
+        """Open the transport and start the sender thread."""
+        if self._running:
+            return
+        self._open()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the sender thread and close the transport."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self._close()
+
+    def _run(self) -> None:
+        next_tick = time.monotonic()
+        while True:
+            with self._condition:
+                # Sleep until there is an update to send and its tick has come
+                while self._running:
+                    if self._pending is None:
+                        self._condition.wait()
+                        continue
+                    delay = next_tick - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if not self._running:
+                    return
+                now = time.monotonic()
+                result, submitted = self._pending, self._pending_time
+                self._pending = None
+
+            if now - next_tick >= self.period:
+                # Nothing was sent for a whole period: restart the schedule here
+                next_tick = now
+
+            if now - submitted > self.deadline:
+                self.updates_stale += 1
+            else:
+                try:
+                    self._send(self.encode_fn(result))
+                    self.updates_sent += 1
+                    self._jitter.append(time.monotonic() - next_tick)
+                except OSError as e:
+                    self.send_errors += 1
+                    logger.warning(f"{type(self).__name__} send failed: {e}")
+
+            # Absolute schedule, so send times do not drift
+            next_tick += self.period
@@ -0,0 +1,330 @@
+"""Fixed-stride binary recording of tracking results, replayed through numpy.memmap."""
+
+import logging
+import os
+import struct
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from handful.core.types import HANDEDNESS, NUM_LANDMARKS, HandLandmarks, ProcessedFrame
+
+logger = logging.getLogger(__name__)
+
+RECORD_MAGIC = b"HFREC\x00"
+RECORD_VERSION = 1
+# magic, version, hand slots per record, record size, records per index entry
+FILE_HEADER = struct.Struct("<6sBBII")
+# Records start at this offset, leaving room for the header to grow
+HEADER_SIZE = 64
+INDEX_SUFFIX = ".idx"
+# Timestamp and record number of every ``index_interval``-th record
+INDEX_DTYPE = np.dtype([('timestamp', '<f8'), ('record', '<u8')])
+
+_HANDEDNESS_CODES = {label: code for code, label in enumerate(HANDEDNESS)}
+_FINGER_BITS = 1 << np.arange(5)
+
+
+def record_dtype(max_hands: int = 2) -> np.dtype:
+    """Layout of one recorded frame.
+
+    Every frame takes the same number of bytes whatever its hand count, so
+    record ``i`` starts at ``HEADER_SIZE + i * itemsize`` and a log can be
+    memory-mapped as one structured array. Hands carry the same fields as
+    :func:`handful.core.packing.pack_frame`: normalized and world coordinates,
+    with pixel coordinates recovered from the frame size.
+    :param max_hands: Hand slots per record; unused slots are zero
+    """
+    hand = np.dtype([
+        ('handedness', 'u1'),  # Index into HANDEDNESS
+        ('fingers', 'u1'),  # Raised-finger bitmask, bit 0 = thumb
+        ('track_id', '<u2'),
+        ('score', '<f4'),
+        ('coordinates', '<f4', (2, NUM_LANDMARKS, 3)),  # Normalized and world
+    ])
+    return np.dtype([
+        ('timestamp', '<f8'),  # Wall-clock capture time in seconds
+        ('sequence', '<u8'),
+        ('width', '<u2'),
+        ('height', '<u2'),
+        ('num_hands', 'u1'),
+        ('reserved', 'u1', (3,)),
+        ('hands', hand, (max_hands,)),
+    ])
+
+
+def _read_header(f) -> Tuple[int, int]:
+    """Validate a log's header.
+    :return Hand slots per record and records per index entry
+    """
+    magic, version, max_hands, record_size, index_interval = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+    if magic != RECORD_MAGIC or version != RECORD_VERSION:
+        raise ValueError(f"Not a landmark recording (version {RECORD_VERSION})")
+    if record_size != record_dtype(max_hands).itemsize:
+        raise ValueError("Landmark recording has an unexpected record size")
+    return max_hands, index_interval
+
+
+class LandmarkRecorder:
+    """Appends every tracked frame's hands to a fixed-stride binary log.
+
+    Attached to a processor, :meth:`submit` runs on the tracking thread and only
+    queues a reference to the hand data; a writer thread packs queued frames in
+    batches into one structured array and appends it with a single write, so
+    recording costs the tracking thread about a microsecond per frame. A
+    sparse index file next to the log maps time to record numbers. Recording
+    to an existing log appends to it.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        max_hands: int = 2,
+        index_interval: int = 256,
+        max_pending: int = 10000,
+        flush_interval: float = 0.5
+    ):
+        """Initialize the recorder.
+        :param path: Log file; the index is written to the same path plus ``.idx``
+        :param max_hands: Hand slots per record; further hands are not recorded
+        :param index_interval: Records between two index entries
+        :param max_pending: Frames queued for the writer before new ones are dropped
+        :param flush_interval: Seconds between writes of queued frames
+        """
+        self.path = os.fspath(path)
+        self.max_hands = max_hands
+        self.index_interval = index_interval
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.dtype = record_dtype(max_hands)
+        self._pending: Deque[Tuple[float, int, Tuple[int, ...], Any]] = deque()
+        self._batch = np.zeros(0, self.dtype)
+        self._wake = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._file: Any = None
+        self._index_file: Any = None
+        # Offset from time.monotonic() capture times to wall-clock time
+        self._clock_offset = 0.0
+
+        self.records_written = 0
+        self.records_dropped = 0
+        self.hands_truncated = 0
+
+    def attach(self, processor: Any) -> None:
+        """Record every frame a processor tracks."""
+        processor.add_track_listener(self.submit)
+
+    def submit(self, result: ProcessedFrame) -> None:
+        """Queue a tracked frame for writing, without waiting for the disk."""
+        if len(self._pending) >= self.max_pending:
+            self.records_dropped += 1
+            return
+        capture_time = result.capture_time or time.monotonic()
+        self._pending.append((capture_time, result.sequence, result.frame.shape, result.hand_data))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'records_written': self.records_written,
+            'records_dropped': self.records_dropped,
+            'records_pending': len(self._pending),
+            'hands_truncated': self.hands_truncated,
+            'bytes': HEADER_SIZE + self.records_written * self.dtype.itemsize,
+        }
+
+    def start(self) -> None:
+        """Open (or continue) the log and start the writer thread."""
+        if self._running:
+            return
+        self._open()
+        self._clock_offset = time.time() - time.monotonic()
+        self._running = True
+        self._wake.clear()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write everything still queued and close the log."""
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._close()
+
+    def _open(self) -> None:
+        self.records_written = 0
+        existing = os.path.exists(self.path) and os.path.getsize(self.path) >= HEADER_SIZE
+        self._file = open(self.path, "r+b" if existing else "wb")
+        if existing:
+            max_hands, self.index_interval = _read_header(self._file)
+            if max_hands != self.max_hands:
+                self._file.close()
+                raise ValueError(f"{self.path} records {max_hands} hands per frame, not {self.max_hands}")
+            # Drop a record cut short by a crash
+            self.records_written = (os.path.getsize(self.path) - HEADER_SIZE) // self.dtype.itemsize
+            self._file.truncate(HEADER_SIZE + self.records_written * self.dtype.itemsize)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            header = FILE_HEADER.pack(
+                RECORD_MAGIC, RECORD_VERSION, self.max_hands, self.dtype.itemsize, self.index_interval
+            )
+            self._file.write(header.ljust(HEADER_SIZE, b"\0"))
+
+        index_path = self.path + INDEX_SUFFIX
+        index_size = -(-self.records_written // self.index_interval) * INDEX_DTYPE.itemsize
+        if existing and os.path.exists(index_path) and os.path.getsize(index_path) >= index_size:
+            self._index_file = open(index_path, "r+b")
+            self._index_file.truncate(index_size)
+            self._index_file.seek(0, os.SEEK_END)
+        else:
+            self._index_file = open(index_path, "wb")
+            if self.records_written:
+                # The index lost entries, e.g. in a crash: rebuild it from the log
+                self._file.flush()
+                timestamps = LandmarkLog(self.path, use_index=False).timestamps[::self.index_interval]
+                index = np.zeros(len(timestamps), INDEX_DTYPE)
+                index['timestamp'] = timestamps
+                index['record'] = np.arange(len(timestamps)) * self.index_interval
+                self._index_file.write(index.tobytes())
+
+    def _close(self) -> None:
+        for f in (self._file, self._index_file):
+            if f is not None:
+                f.close()
+        self._file = self._index_file = None
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            running = self._running
+            try:
+                self._write_pending()
+            except OSError:
+                logger.exception("Cannot write landmark recording %s", self.path)
+            if not running:
+                return
+
+    def _write_pending(self) -> None:
+        """Pack every queued frame into one batch and append it to the log and index."""
+        count = len(self._pending)
+        if not count:
+            return
+        if len(self._batch) < count:
+            self._batch = np.zeros(max(count, 2 * len(self._batch)), self.dtype)
+        batch = self._batch[:count]
+        batch.fill(0)
+        frames = [self._pending.popleft() for _ in range(count)]
+        batch['timestamp'] = [frame[0] for frame in frames]
+        batch['timestamp'] += self._clock_offset
+        batch['sequence'] = [frame[1] for frame in frames]
+        batch['height'] = [frame[2][0] for frame in frames]
+        batch['width'] = [frame[2][1] for frame in frames]
+
+        hands = batch['hands']
+        for i, (_, _, _, hand_data) in enumerate(frames):
+            if not hand_data:
+                continue
+            if len(hand_data) > self.max_hands:
+                self.hands_truncated += len(hand_data) - self.max_hands
+                hand_data = hand_data[:self.max_hands]
+            batch['num_hands'][i] = len(hand_data)
+            for slot, hand in enumerate(hand_data):
+                hands['handedness'][i, slot] = _HANDEDNESS_CODES.get(hand.handedness, 0)
+                hands['fingers'][i, slot] = int(np.dot(hand.fingers, _FINGER_BITS))
+                hands['track_id'][i, slot] = hand.track_id & 0xffff
+                hands['score'][i, slot] = hand.score
+                hands['coordinates'][i, slot] = hand.coordinates[0::2]
+
+        first = self.records_written
+        numbers = np.arange(first, first + count)
+        indexed = numbers % self.index_interval == 0
+        self._file.write(batch.data)
+        self._file.flush()
+        if indexed.any():
+            index = np.zeros(np.count_nonzero(indexed), INDEX_DTYPE)
+            index['timestamp'] = batch['timestamp'][indexed]
+            index['record'] = numbers[indexed]
+            self._index_file.write(index.tobytes())
+            self._index_file.flush()
+        self.records_written += count
+
+
+class LandmarkLog:
+    """Read-only view of a recording, memory-mapped rather than loaded.
+
+    Opening a log reads only its header and index, whatever its size. Slices of
+    :attr:`records` (e.g. from :meth:`between`) are views into the mapped file,
+    and the operating system pages in only the records that are touched. A
+    recording that is still being written can be opened; it shows the records
+    written so far.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], use_index: bool = True):
+        """Open a recording.
+        :param path: Log file written by LandmarkRecorder
+        :param use_index: Whether to read the ``.idx`` file to speed up time lookups
+        """
+        self.path = os.fspath(path)
+        with open(self.path, "rb") as f:
+            self.max_hands, self.index_interval = _read_header(f)
+        self.dtype = record_dtype(self.max_hands)
+        count = (os.path.getsize(self.path) - HEADER_SIZE) // self.dtype.itemsize
+        if count:
+            self.records = np.memmap(self.path, self.dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, self.dtype)
+
+        self.index = np.zeros(0, INDEX_DTYPE)
+        index_path = self.path + INDEX_SUFFIX
+        if use_index and os.path.exists(index_path):
+            index = np.fromfile(index_path, INDEX_DTYPE)
+            self.index = index[index['record'] < count]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Wall-clock capture time of every record (a strided view, not a copy)."""
+        return self.records['timestamp']
+
+    def search(self, timestamp: float, side: str = "left") -> int:
+        """Find the record number where ``timestamp`` would be inserted, as np.searchsorted.
+
+        The index narrows the search to one block of ``index_interval`` records,
+        so only those pages of the log are read.
+        """
+        lo, hi = 0, len(self.records)
+        if len(self.index):
+            block = int(np.searchsorted(self.index['timestamp'], timestamp, side))
+            if block > 0:
+                lo = int(self.index['record'][block - 1])
+            if block < len(self.index):
+                hi = int(self.index['record'][block])
+        return lo + int(np.searchsorted(self.timestamps[lo:hi], timestamp, side))
+
+    def between(self, start: float, end: float) -> np.ndarray:
+        """Records captured at ``start <= timestamp < end``, as a view into the log."""
+        return self.records[self.search(start):self.search(end)]
+
+    def hand_landmarks(self, record: np.void) -> List[HandLandmarks]:
+        """Rebuild the HandLandmarks of one record."""
+        size = (int(record['width']), int(record['height']), int(record['width']))
+        hand_data = []
+        for slot in record['hands'][:record['num_hands']]:
+            coordinates = np.empty((3, NUM_LANDMARKS, 3), np.float32)
+            coordinates[0::2] = slot['coordinates']
+            np.multiply(coordinates[0], size, out=coordinates[1])
+            fingers = (int(slot['fingers']) & _FINGER_BITS) != 0
+            hand_data.append(HandLandmarks(
+                coordinates,
+                fingers,
+                HANDEDNESS[slot['handedness']] if slot['handedness'] < len(HANDEDNESS) else "",
+                float(slot['score']),
+                int(slot['track_id'])
+            ))
+        return hand_data
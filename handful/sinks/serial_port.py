@@ -0,0 +1,63 @@
+"""Serial port output sink."""
+
+import os
+import struct
+import termios
+import tty
+from typing import Any, Optional
+
+from handful.sinks.base import OutputSink
+
+SYNC = b"\xaa\x55"
+_LENGTH = struct.Struct("<H")
+_BAUDRATES = {
+    rate: getattr(termios, f"B{rate}")
+    for rate in (9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600, 1000000)
+    if hasattr(termios, f"B{rate}")
+}
+
+
+def frame_message(data: bytes) -> bytes:
+    """Frame an update for a byte stream: sync bytes, little-endian u16 length, payload."""
+    return SYNC + _LENGTH.pack(len(data)) + data
+
+
+class SerialSink(OutputSink):
+    """Writes framed updates to a serial device (POSIX only).
+
+    The device is opened non-blocking in raw mode. When the driver's output
+    buffer is full the update is dropped and counted in ``send_errors``, so a
+    slow link never delays later, fresher updates.
+    """
+
+    def __init__(self, device: str, baudrate: int = 115200, **kwargs: Any):
+        """Initialize the sink.
+        :param device: Device path, e.g. /dev/ttyUSB0
+        :param baudrate: Line speed in bits per second
+        :param kwargs: OutputSink options (rate_hz, deadline, encode_fn)
+        """
+        if baudrate not in _BAUDRATES:
+            raise ValueError(f"Unsupported baudrate {baudrate}, expected one of {sorted(_BAUDRATES)}")
+        super().__init__(**kwargs)
+        self.device = device
+        self.baudrate = baudrate
+        self._fd: Optional[int] = None
+
+    def _open(self) -> None:
+        self._fd = os.open(self.device, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        tty.setraw(self._fd)
+        attributes = termios.tcgetattr(self._fd)
+        attributes[4] = attributes[5] = _BAUDRATES[self.baudrate]  # ispeed, ospeed
+        termios.tcsetattr(self._fd, termios.TCSANOW, attributes)
+
+    def _send(self, data: bytes) -> None:
+        message = frame_message(data)
+        written = os.write(self._fd, message)
+        if written != len(message):
+            # The rest of a partial frame is never written; the receiver resyncs on SYNC
+            raise BlockingIOError(f"Short write ({written} of {len(message)} bytes)")
+
+    def _close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
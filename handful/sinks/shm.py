@@ -0,0 +1,198 @@
+"""Publication of tracked frames to local processes through shared memory."""
+
+import logging
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Optional, Tuple
+
+from handful.core.types import ProcessedFrame
+from handful.utils.shared_ring import RingSlot, SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAME = "handful"
+
+
+class SharedMemoryPublisher:
+    """Writes every tracked frame and its hands into a named :class:`SharedFrameRing`.
+
+    Any process on the host can attach a :class:`SharedMemoryReader` to the
+    ring by name and read frames and landmarks in place, without the HTTP and
+    JPEG work of the MJPEG stream. :meth:`submit` copies the frame into the ring
+    on the tracking thread; the ring's seqlocks mean it never waits for readers.
+    """
+
+    def __init__(
+        self,
+        name: str = DEFAULT_NAME,
+        slots: int = 4,
+        max_hands: int = 2,
+        frame_shape: Optional[Tuple[int, int, int]] = None
+    ):
+        """Initialize the publisher.
+        :param name: Shared memory block name readers attach to
+        :param slots: Frames kept before the oldest is overwritten
+        :param max_hands: Hands stored per frame; further hands are not published
+        :param frame_shape: Largest (height, width, channels) frame to publish; None sizes
+            the ring for the first frame
+        """
+        self.name = name
+        self.slots = slots
+        self.max_hands = max_hands
+        self.frame_shape = frame_shape
+        self.ring: Optional[SharedFrameRing] = None
+        self._running = False
+        # Keeps stop() from unmapping the ring during a write
+        self._lock = threading.Lock()
+
+        self.frames_published = 0
+        self.frames_rejected = 0
+
+    def attach(self, processor: Any) -> None:
+        """Publish every frame a processor tracks."""
+        processor.add_track_listener(self.submit)
+
+    def submit(self, result: ProcessedFrame) -> None:
+        """Publish a tracked frame, overwriting the oldest one in the ring."""
+        with self._lock:
+            if not self._running:
+                return
+            if self.ring is None:
+                try:
+                    self.ring = self._create(self.frame_shape or result.frame.shape)
+                except OSError:
+                    logger.exception("Cannot create shared memory %r; not publishing", self.name)
+                    self._running = False
+                    return
+            try:
+                capture_time = result.capture_time or time.monotonic()
+                self.ring.write(result.sequence, capture_time, result.frame, result.hand_data)
+            except ValueError:
+                # Larger than the ring: readers keep the frames they have
+                self.frames_rejected += 1
+                return
+            self.frames_published += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'frames_published': self.frames_published,
+            'frames_rejected': self.frames_rejected,
+            'frame_shape': list(self.ring.frame_shape) if self.ring is not None else None,
+        }
+
+    def start(self) -> None:
+        """Create the ring now if its frame shape is known, else with the first frame.
+        :raises FileExistsError: If shared memory of that name exists already
+        """
+        if self._running:
+            return
+        if self.frame_shape is not None:
+            self.ring = self._create(self.frame_shape)
+        else:
+            try:
+                existing = shared_memory.SharedMemory(self.name)
+            except FileNotFoundError:
+                pass
+            else:
+                # Not ours: keep the resource tracker from removing it when we exit
+                resource_tracker.unregister(existing._name, "shared_memory")
+                existing.close()
+                raise FileExistsError(f"Shared memory {self.name!r} exists already")
+        self._running = True
+
+    def stop(self) -> None:
+        """Remove the ring; readers still attached keep their mapping until they close it."""
+        with self._lock:
+            self._running = False
+            if self.ring is not None:
+                self.ring.close()
+                self.ring.unlink()
+                self.ring = None
+
+    def _create(self, frame_shape: Tuple[int, ...]) -> SharedFrameRing:
+        if len(frame_shape) == 2:
+            frame_shape = frame_shape + (1,)
+        ring = SharedFrameRing.create(frame_shape, self.slots, self.max_hands, name=self.name)
+        logger.info("Publishing frames of up to %s to shared memory %r", frame_shape, self.name)
+        return ring
+
+
+class SharedMemoryReader:
+    """Reads the frames and hands a :class:`SharedMemoryPublisher` publishes, in place.
+
+    Reads return :class:`RingSlot` views into shared memory unless ``copy`` is
+    given. A view stays valid until the publisher wraps around to its slot,
+    ``slots - 1`` frames later; check :meth:`is_current` after using one, and
+    drop all views before :meth:`close`.
+
+        with SharedMemoryReader() as reader:
+            slot = reader.wait_for_frame(0, timeout=1.0)
+            hands = slot.hand_data()
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        """Attach to a publisher's ring.
+        :param name: Shared memory block name given to the publisher
+        :raises FileNotFoundError: If no ring of that name exists (yet)
+        """
+        # Not tracked: this process must not remove the ring when it exits
+        self.ring = SharedFrameRing.attach(name, track=False)
+
+    @property
+    def latest(self) -> int:
+        """Sequence number of the newest published frame (0 if none)."""
+        return self.ring.latest
+
+    def read(self, sequence: Optional[int] = None, copy: bool = False) -> Optional[RingSlot]:
+        """Read a frame and its hands.
+        :param sequence: Sequence number to read (the latest frame if None)
+        :param copy: Copy the data out of shared memory instead of returning views
+        :return The slot, or None if the frame is not (or no longer) in the ring
+        """
+        return self.ring.read(sequence, copy=copy)
+
+    def wait_for_frame(
+        self,
+        last_sequence: int,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.0001,
+        copy: bool = False
+    ) -> Optional[RingSlot]:
+        """Wait until a frame newer than ``last_sequence`` is published and read it.
+
+        The ring has no cross-process notification, so this polls its header,
+        which takes well under a microsecond per check.
+        :param last_sequence: Sequence number of the last frame the caller has seen
+        :param timeout: Maximum time to wait in seconds (None waits forever)
+        :param poll_interval: Seconds to sleep between checks
+        :param copy: Copy the data out of shared memory instead of returning views
+        :return The newest slot, or None if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            sequence = self.ring.latest
+            if sequence > last_sequence:
+                slot = self.ring.read(sequence, copy=copy)
+                if slot is not None:
+                    return slot
+                # Overwritten between the two reads: take the newer frame
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def is_current(self, slot: RingSlot) -> bool:
+        """Whether a slot read without copying has not been overwritten since."""
+        return self.ring.is_current(slot)
+
+    def close(self) -> None:
+        """Release this process's mapping of the ring."""
+        self.ring.close()
+
+    def __enter__(self) -> "SharedMemoryReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
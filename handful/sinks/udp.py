@@ -0,0 +1,39 @@
+"""UDP datagram output sink."""
+
+import socket
+from typing import Any, Optional
+
+from handful.sinks.base import OutputSink
+
+
+class UDPSink(OutputSink):
+    """Sends each update as one UDP datagram.
+
+    Datagrams are sent from a non-blocking socket, so a full send buffer drops
+    the update (counted in ``send_errors``) rather than delaying the next one.
+    """
+
+    def __init__(self, host: str, port: int, **kwargs: Any):
+        """Initialize the sink.
+        :param host: Destination host
+        :param port: Destination UDP port
+        :param kwargs: OutputSink options (rate_hz, deadline, encode_fn)
+        """
+        super().__init__(**kwargs)
+        self.address = (host, port)
+        self._socket: Optional[socket.socket] = None
+
+    def _open(self) -> None:
+        family = socket.getaddrinfo(*self.address, type=socket.SOCK_DGRAM)[0][0]
+        self._socket = socket.socket(family, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        # Connecting fixes the destination and surfaces ICMP errors on later sends
+        self._socket.connect(self.address)
+
+    def _send(self, data: bytes) -> None:
+        self._socket.send(data)
+
+    def _close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
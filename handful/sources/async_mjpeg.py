@@ -0,0 +1,478 @@
+"""Ingest of many MJPEG streams on a single asyncio event loop."""
+
+import asyncio
+import base64
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+from handful.sources.base import BaseFrameSource
+from handful.sources.decoders import FrameDecoder
+from handful.sources.mjpeg_parser import MJPEGParser
+
+logger = logging.getLogger(__name__)
+
+JPEG_SOI = b"\xff\xd8"
+DEFAULT_BOUNDARY = "mjpegstream"
+# Bodies of error responses are read (to keep the connection) only up to this size
+MAX_ERROR_BODY = 64 << 10
+
+
+class HTTPStatusError(ConnectionError):
+    """The server answered a stream request with a status other than 200."""
+
+    def __init__(self, status: int, reason: str):
+        super().__init__(f"HTTP {status} {reason}".rstrip())
+        self.status = status
+        # Whether the error response was read completely and the connection stays open
+        self.reusable = False
+
+
+class _Response:
+    """Status line and headers of an HTTP response."""
+
+    def __init__(self, version: str, status: int, reason: str, headers: Dict[str, str]):
+        self.version = version
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+
+    @property
+    def keep_alive(self) -> bool:
+        """Whether the server keeps the connection open after this response."""
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    @property
+    def boundary(self) -> Optional[str]:
+        """Multipart boundary announced in the Content-Type header, if any."""
+        for parameter in self.headers.get("content-type", "").split(";")[1:]:
+            key, _, value = parameter.strip().partition("=")
+            if key.lower() == "boundary" and value:
+                return value.strip('"')
+        return None
+
+
+class MJPEGIngest:
+    """Reads any number of MJPEG streams on one event loop in a background thread.
+
+    Each stream is a task holding one HTTP/1.1 connection, so dozens of cameras
+    cost one thread for the network and a small pool for decoding, instead of a
+    blocking reader thread each. Reads are bounded by ``read_timeout``; a stream
+    that fails to connect, answers with an error status, stalls or drops is
+    retried with exponential backoff (with jitter, so cameras behind one server
+    do not reconnect in lockstep), which resets once frames flow again. A
+    connection is reused for the retry whenever the server kept it alive.
+
+    JPEG decoding runs in a thread pool, at most one frame per stream at a time.
+    Frames that arrive while their stream's previous frame is still decoding
+    replace each other, so a slow decode never builds a backlog.
+
+    Streams are :class:`AsyncMJPEGSource` objects, created with :meth:`source`.
+    The loop starts with the first source started and stops with the last one.
+    """
+
+    def __init__(
+        self,
+        decode_workers: Optional[int] = None,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 5.0,
+        backoff_initial: float = 0.5,
+        backoff_max: float = 30.0,
+        chunk_size: int = 65536
+    ):
+        """Initialize the ingest engine.
+        :param decode_workers: Decode threads shared by all streams (default: up to 4, one per CPU)
+        :param connect_timeout: Seconds allowed to open a connection
+        :param read_timeout: Seconds a stream may go without sending any bytes
+        :param backoff_initial: Delay before the first retry of a failed stream, in seconds
+        :param backoff_max: Upper bound of the retry delay, which doubles with every failure
+        :param chunk_size: Maximum number of bytes read from a connection at a time
+        """
+        self.decode_workers = decode_workers or min(4, os.cpu_count() or 1)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.chunk_size = chunk_size
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._sources: Set["AsyncMJPEGSource"] = set()
+        self._tasks: Dict["AsyncMJPEGSource", asyncio.Task] = {}
+        # Serializes adding and removing streams with starting and stopping the loop
+        self._lock = threading.Lock()
+
+    def source(
+        self,
+        url: str,
+        boundary: Optional[str] = None,
+        decoder: Optional[FrameDecoder] = None
+    ) -> "AsyncMJPEGSource":
+        """Create a frame source for a stream read by this engine."""
+        return AsyncMJPEGSource(url, boundary=boundary, decoder=decoder, ingest=self)
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def add(self, source: "AsyncMJPEGSource") -> None:
+        """Start reading a stream, starting the event loop if it is not running."""
+        with self._lock:
+            if source in self._sources:
+                return
+            if self._loop is None:
+                self._start_loop()
+            self._sources.add(source)
+            asyncio.run_coroutine_threadsafe(self._spawn(source), self._loop).result()
+
+    def remove(self, source: "AsyncMJPEGSource") -> None:
+        """Stop reading a stream, and stop the event loop if it was the last one."""
+        with self._lock:
+            if source not in self._sources:
+                return
+            self._sources.discard(source)
+            asyncio.run_coroutine_threadsafe(self._cancel([source]), self._loop).result()
+            if not self._sources:
+                self._stop_loop()
+
+    def stop(self) -> None:
+        """Stop reading all streams and stop the event loop."""
+        with self._lock:
+            if self._loop is None:
+                return
+            sources, self._sources = list(self._sources), set()
+            asyncio.run_coroutine_threadsafe(self._cancel(sources), self._loop).result()
+            self._stop_loop()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Connection and frame counters of every stream, e.g. for /stats."""
+        with self._lock:
+            sources = list(self._sources)
+        return [source.stats() for source in sources]
+
+    def _start_loop(self) -> None:
+        self._executor = ThreadPoolExecutor(self.decode_workers, thread_name_prefix="mjpeg-decode")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mjpeg-ingest", daemon=True)
+        self._thread.start()
+
+    def _stop_loop(self) -> None:
+        # Decodes still running deliver their frames through the loop, so the
+        # pool is drained before the loop goes away
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._thread = self._executor = None
+
+    async def _spawn(self, source: "AsyncMJPEGSource") -> None:
+        source._active = True
+        self._tasks[source] = asyncio.get_running_loop().create_task(self._run(source), name=source.url)
+
+    async def _cancel(self, sources: List["AsyncMJPEGSource"]) -> None:
+        tasks = []
+        for source in sources:
+            source._active = False
+            source._pending = None
+            task = self._tasks.pop(source, None)
+            if task is not None:
+                task.cancel()
+                tasks.append(task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, source: "AsyncMJPEGSource") -> None:
+        """Read a stream until cancelled, reconnecting with backoff after every failure."""
+        backoff = self.backoff_initial
+        connection: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = None
+        try:
+            while True:
+                frames_before = source.frames_received
+                reusable = False
+                try:
+                    if connection is None:
+                        connection = await self._connect(source)
+                    reusable = await self._request(source, *connection)
+                    source.last_error = "stream ended"
+                except HTTPStatusError as e:
+                    source.http_errors += 1
+                    source.last_error = str(e)
+                    reusable = e.reusable
+                except asyncio.TimeoutError:
+                    source.timeouts += 1
+                    source.last_error = "timed out"
+                except (OSError, EOFError, asyncio.LimitOverrunError, ValueError) as e:
+                    source.last_error = str(e) or type(e).__name__
+                source.connected = False
+                if not reusable and connection is not None:
+                    connection[1].close()
+                    connection = None
+
+                # A stream that delivered frames was healthy: start backing off afresh
+                if source.frames_received > frames_before:
+                    backoff = self.backoff_initial
+                delay = random.uniform(backoff / 2, backoff)
+                logger.warning("MJPEG stream %s: %s; retrying in %.1fs", source.url, source.last_error, delay)
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, self.backoff_max)
+                source.retries += 1
+        finally:
+            source.connected = False
+            if connection is not None:
+                connection[1].close()
+
+    async def _connect(self, source: "AsyncMJPEGSource") -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(source.host, source.port, ssl=source.ssl, limit=2 * self.chunk_size),
+            self.connect_timeout
+        )
+        source.connects += 1
+        return connection
+
+    async def _request(self, source: "AsyncMJPEGSource", reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Request the stream on an open connection and read it until it ends.
+        :return Whether the connection can carry another request
+        :raises HTTPStatusError: If the server did not answer 200 OK
+        """
+        writer.write(source.request)
+        await self._wait(source, writer.drain())
+        response = await self._read_head(source, reader)
+
+        if response.status != 200:
+            error = HTTPStatusError(response.status, response.reason)
+            error.reusable = response.keep_alive and await self._read_body(
+                source, reader, response, lambda data: None, MAX_ERROR_BODY
+            )
+            raise error
+
+        source.connected = True
+        parser = MJPEGParser((source.boundary or response.boundary or DEFAULT_BOUNDARY).encode())
+
+        def on_data(data: bytes):
+            parser.feed(data)
+            # A frame counts as captured when its last bytes arrive
+            arrival = time.monotonic()
+            while (frame_data := parser.next_frame()) is not None:
+                self._submit(source, bytes(frame_data), arrival)
+
+        complete = await self._read_body(source, reader, response, on_data)
+        return complete and response.keep_alive
+
+    async def _wait(self, source: "AsyncMJPEGSource", awaitable):
+        """Await a network operation, bounded by the read timeout."""
+        result = await asyncio.wait_for(awaitable, self.read_timeout)
+        # Before Python 3.12, wait_for can swallow a cancellation that coincides with
+        # the operation completing; a stopped stream must not go on reading
+        if not source._active:
+            raise asyncio.CancelledError
+        return result
+
+    async def _read_head(self, source: "AsyncMJPEGSource", reader: asyncio.StreamReader) -> _Response:
+        head = await self._wait(source, reader.readuntil(b"\r\n\r\n"))
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        version, status, reason = (status_line.split(None, 2) + [""])[:3]
+        if not version.startswith("HTTP/"):
+            raise ValueError(f"Not an HTTP response: {status_line[:80]!r}")
+        headers = {}
+        for line in header_lines:
+            name, separator, value = line.partition(":")
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+        return _Response(version, int(status), reason, headers)
+
+    async def _read_body(
+        self,
+        source: "AsyncMJPEGSource",
+        reader: asyncio.StreamReader,
+        response: _Response,
+        on_data: Callable[[bytes], None],
+        limit: Optional[int] = None
+    ) -> bool:
+        """Hand a response body to ``on_data`` as it arrives, undoing chunked encoding.
+        :param limit: Give up on bodies longer than this many bytes
+        :return Whether the body ended where its framing said, rather than at end of
+            connection or at the limit, leaving the connection ready for the next response
+        """
+        if "chunked" in response.headers.get("transfer-encoding", "").lower():
+            total = 0
+            while True:
+                size_line = await self._wait(source, reader.readuntil(b"\r\n"))
+                size = int(size_line.split(b";", 1)[0], 16)
+                if size == 0:
+                    # Trailers, if any, end with an empty line
+                    while await self._wait(source, reader.readuntil(b"\r\n")) != b"\r\n":
+                        pass
+                    return True
+                total += size
+                if limit is not None and total > limit:
+                    return False
+                await self._read_exactly(source, reader, size, on_data)
+                await self._wait(source, reader.readexactly(2))
+
+        if "content-length" in response.headers:
+            length = int(response.headers["content-length"])
+            if limit is not None and length > limit:
+                return False
+            await self._read_exactly(source, reader, length, on_data)
+            return True
+
+        # Delimited by the end of the connection
+        while data := await self._wait(source, reader.read(self.chunk_size)):
+            on_data(data)
+        return False
+
+    async def _read_exactly(
+        self,
+        source: "AsyncMJPEGSource",
+        reader: asyncio.StreamReader,
+        size: int,
+        on_data: Callable[[bytes], None]
+    ) -> None:
+        while size > 0:
+            data = await self._wait(source, reader.read(min(size, self.chunk_size)))
+            if not data:
+                raise asyncio.IncompleteReadError(b"", size)
+            on_data(data)
+            size -= len(data)
+
+    def _submit(self, source: "AsyncMJPEGSource", payload: bytes, arrival: float) -> None:
+        """Decode a frame in the pool, or hold it until the stream's current decode is done."""
+        source.frames_received += 1
+        if payload[:2] != JPEG_SOI:
+            source.frames_invalid += 1
+            return
+        if source._decoding:
+            if source._pending is not None:
+                source.frames_skipped += 1
+            source._pending = (payload, arrival)
+            return
+        self._decode(source, payload, arrival)
+
+    def _decode(self, source: "AsyncMJPEGSource", payload: bytes, arrival: float) -> None:
+        source._decoding = True
+        future = self._loop.run_in_executor(self._executor, source._decode, payload, arrival)
+        future.add_done_callback(lambda future: self._decoded(source, future))
+
+    def _decoded(self, source: "AsyncMJPEGSource", future: asyncio.Future) -> None:
+        source._decoding = False
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error("MJPEG stream %s: frame decoding error: %s", source.url, future.exception())
+        if source._pending is not None and source._active:
+            payload, arrival = source._pending
+            source._pending = None
+            self._decode(source, payload, arrival)
+
+
+class AsyncMJPEGSource(BaseFrameSource):
+    """An MJPEG stream read by an :class:`MJPEGIngest`.
+
+    Unlike :class:`MJPEGStreamClient`, which gives up on the first error, the
+    source keeps reconnecting until it is stopped. Without an ``ingest`` the
+    source gets an engine of its own; pass a shared one to read many streams on
+    one event loop:
+
+        ingest = MJPEGIngest()
+        sources = [ingest.source(url) for url in urls]
+    """
+
+    def __init__(
+        self,
+        url: str,
+        boundary: Optional[str] = None,
+        decoder: Optional[FrameDecoder] = None,
+        ingest: Optional[MJPEGIngest] = None
+    ):
+        """Initialize the source.
+        :param url: http:// or https:// URL of the MJPEG stream, optionally with user:password@
+        :param boundary: Multipart boundary; None takes it from the response's Content-Type
+            and falls back to "mjpegstream"
+        :param decoder: JPEG decoder, e.g. one that decodes at a reduced size (full-size OpenCV by default)
+        :param ingest: Engine reading the stream (a new one by default)
+        """
+        super().__init__()
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Not an http(s) URL: {url!r}")
+        self.url = url
+        self.host = parts.hostname
+        self.ssl = parts.scheme == "https"
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.boundary = boundary
+        self.decoder = decoder or FrameDecoder()
+        self.ingest = ingest or MJPEGIngest()
+        self.request = self._build_request(parts)
+
+        self.connected = False
+        self.last_error: Optional[str] = None
+        self.connects = 0
+        self.retries = 0
+        self.http_errors = 0
+        self.timeouts = 0
+        self.frames_received = 0
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+        self.frames_invalid = 0
+
+        # Owned by the ingest's event loop
+        self._active = False
+        self._decoding = False
+        self._pending: Optional[Tuple[bytes, float]] = None
+
+    def start(self):
+        """Start reading the stream on the ingest's event loop."""
+        self.ingest.add(self)
+
+    def stop(self):
+        """Stop reading the stream and close its connection."""
+        self.ingest.remove(self)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'connected': self.connected,
+            'connects': self.connects,
+            'retries': self.retries,
+            'http_errors': self.http_errors,
+            'timeouts': self.timeouts,
+            'frames_received': self.frames_received,
+            'frames_decoded': self.frames_decoded,
+            'frames_skipped': self.frames_skipped,
+            'frames_invalid': self.frames_invalid,
+            'last_error': self.last_error,
+        }
+
+    def _decode(self, payload: bytes, arrival: float) -> None:
+        """Decode a frame and publish it; runs in the ingest's decode pool."""
+        start = time.monotonic()
+        frame = self.decoder.decode(payload)
+        if frame is None:
+            self.frames_invalid += 1
+            return
+        self.frames_decoded += 1
+        self._publish_frame(frame, arrival, {'decode': time.monotonic() - start})
+
+    @staticmethod
+    def _build_request(parts) -> bytes:
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        host = parts.netloc.rpartition("@")[2]
+        lines = [
+            f"GET {target} HTTP/1.1",
+            f"Host: {host}",
+            "User-Agent: handful",
+            "Accept: multipart/x-mixed-replace, image/jpeg",
+            "Connection: keep-alive",
+        ]
+        if parts.username is not None:
+            credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+            lines.append(f"Authorization: Basic {base64.b64encode(credentials.encode()).decode()}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
@@ -1,7 +1,9 @@
 """Base classes for frame sources."""
 
 from abc import ABC, abstractmethod
-from typing import Optional
+import time
+from threading import Condition
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 
@@ -9,7 +11,22 @@ from handful.core.types import FrameSource
 
 
 class BaseFrameSource(ABC, FrameSource):
-    """Abstract base class for frame sources."""
+    """Abstract base class for frame sources.
+
+    Subclasses hand each new frame to :meth:`_publish_frame`, which stamps it with
+    a sequence number and wakes any consumer blocked in :meth:`wait_for_frame`.
+    The capture time and source-side stage timings of recent frames can be looked
+    up by sequence number with :meth:`frame_info`.
+    """
+
+    # Number of recent frames whose capture info is kept
+    FRAME_INFO_HISTORY = 16
+
+    def __init__(self):
+        self._frame: Optional[np.ndarray] = None
+        self._frame_sequence = 0
+        self._frame_condition = Condition()
+        self._frame_info: Dict[int, Tuple[float, Dict[str, float]]] = {}
 
     @abstractmethod
     def start(self) -> None:
@@ -21,7 +38,61 @@ class BaseFrameSource(ABC, FrameSource):
         """Stop the frame source."""
         pass
 
-    @abstractmethod
+    @property
+    def frame_sequence(self) -> int:
+        """Sequence number of the latest published frame (0 before the first frame)."""
+        return self._frame_sequence
+
     def get_frame(self) -> Optional[np.ndarray]:
-        """Get the next frame."""
-        pass
+        """Get the latest frame without waiting."""
+        return self._frame
+
+    def wait_for_frame(
+        self,
+        last_sequence: int,
+        timeout: Optional[float] = None
+    ) -> Optional[Tuple[int, np.ndarray]]:
+        """Block until a frame newer than ``last_sequence`` is available.
+        :param last_sequence: Sequence number of the last frame the caller has seen
+        :param timeout: Maximum time to wait in seconds (None waits forever)
+        :return (sequence, frame) tuple, or None if the timeout expired
+        """
+        with self._frame_condition:
+            if not self._frame_condition.wait_for(
+                lambda: self._frame_sequence > last_sequence,
+                timeout
+            ):
+                return None
+            return self._frame_sequence, self._frame
+
+    def frame_info(self, sequence: int) -> Tuple[Optional[float], Dict[str, float]]:
+        """Get the capture time and source-side stage timings of a recent frame.
+        :param sequence: Sequence number of the frame
+        :return ``time.monotonic()`` at which the frame's bytes arrived (None if the
+            frame is too old) and a dict of stage name to seconds, e.g. "decode"
+        """
+        with self._frame_condition:
+            return self._frame_info.get(sequence, (None, {}))
+
+    def _publish_frame(
+        self,
+        frame: np.ndarray,
+        capture_time: Optional[float] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> int:
+        """Make a frame available to consumers.
+        :param frame: Newly captured frame
+        :param capture_time: ``time.monotonic()`` at which the frame's bytes arrived
+            (defaults to now)
+        :param timings: Seconds spent in source-side stages, e.g. {"decode": 0.004}
+        :return Sequence number assigned to the frame
+        """
+        if capture_time is None:
+            capture_time = time.monotonic()
+        with self._frame_condition:
+            self._frame = frame
+            self._frame_sequence += 1
+            self._frame_info[self._frame_sequence] = (capture_time, timings or {})
+            self._frame_info.pop(self._frame_sequence - self.FRAME_INFO_HISTORY, None)
+            self._frame_condition.notify_all()
+            return self._frame_sequence
@@ -0,0 +1,197 @@
+"""Local capture devices and video files read through ``cv2.VideoCapture``."""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from handful.sources.base import BaseFrameSource
+from handful.utils.bufferpool import BufferPool
+
+logger = logging.getLogger(__name__)
+
+FOURCCS = ("MJPG", "YUYV")
+
+
+def is_capture_device(url: str) -> bool:
+    """Whether a stream URL names a local camera: a device index or a /dev/video* path."""
+    return url.isdigit() or url.startswith("/dev/video")
+
+
+class CaptureFrameSource(BaseFrameSource):
+    """Reads a camera (or a video file) with a dedicated grab thread.
+
+    The grab thread calls ``grab()`` back to back, which keeps the driver's
+    queue empty: the frame it returns is always the newest one, never one that
+    waited in a buffer. ``retrieve()``, which decodes or converts the grabbed
+    frame, only runs while a consumer is waiting in :meth:`wait_for_frame`, so
+    frames nobody takes cost a grab and nothing more. Grabbed frames that were
+    not retrieved are counted in ``frames_skipped``.
+
+    Video files are paced at their own frame rate, as a camera would deliver
+    them; ``realtime=False`` reads them as fast as they decode.
+    """
+
+    def __init__(
+        self,
+        device: Union[int, str] = 0,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        fps: Optional[float] = None,
+        fourcc: Optional[str] = None,
+        api_preference: int = cv2.CAP_ANY,
+        lazy: bool = True,
+        loop: bool = False,
+        realtime: bool = True,
+        buffer_pool: Optional[BufferPool] = None
+    ):
+        """Initialize the capture source.
+        :param device: Camera index, device path (e.g. /dev/video0) or video file
+        :param width: Requested capture width (the driver picks the nearest mode)
+        :param height: Requested capture height
+        :param fps: Requested capture frame rate
+        :param fourcc: Requested pixel format, "MJPG" (compressed, for high resolutions
+            over USB 2) or "YUYV" (uncompressed, cheaper to convert)
+        :param api_preference: OpenCV capture backend, e.g. cv2.CAP_V4L2
+        :param lazy: Retrieve only frames a consumer is waiting for; False retrieves every frame
+        :param loop: Whether to restart a video file at its end
+        :param realtime: Whether to pace video files at their frame rate
+        :param buffer_pool: Optional pool that frames are retrieved into
+        """
+        super().__init__()
+        if fourcc is not None and fourcc not in FOURCCS:
+            raise ValueError(f"Unsupported capture format {fourcc!r}, expected one of {FOURCCS}")
+        if isinstance(device, str) and device.isdigit():
+            device = int(device)
+        self.device = device
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.api_preference = api_preference
+        self.lazy = lazy
+        self.loop = loop
+        self.is_file = isinstance(device, str) and os.path.isfile(device)
+        self.realtime = realtime
+        self.buffer_pool = buffer_pool
+        self.finished = threading.Event()
+        # Mode the driver actually chose, known once the device is open
+        self.frame_size: Optional[Tuple[int, int]] = None
+        self.capture_fps: Optional[float] = None
+
+        self._capture: Optional[cv2.VideoCapture] = None
+        self._waiting = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.frames_grabbed = 0
+        self.frames_retrieved = 0
+        self.frames_skipped = 0
+
+    def start(self):
+        """Open the device and start grabbing in a separate thread.
+        :raises IOError: If the device cannot be opened
+        """
+        if self._running:
+            return
+        self._capture = self._open()
+        self._running = True
+        self.finished.clear()
+        self._thread = threading.Thread(target=self._grab_frames, name="capture-grab", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop grabbing and release the device."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+    def wait_for_frame(
+        self,
+        last_sequence: int,
+        timeout: Optional[float] = None
+    ) -> Optional[Tuple[int, np.ndarray]]:
+        """Block until a frame newer than ``last_sequence`` is available.
+
+        While a consumer waits here, the grab thread retrieves the frames it grabs.
+        """
+        with self._frame_condition:
+            self._waiting += 1
+        try:
+            return super().wait_for_frame(last_sequence, timeout)
+        finally:
+            with self._frame_condition:
+                self._waiting -= 1
+
+    def _open(self) -> cv2.VideoCapture:
+        capture = cv2.VideoCapture(self.device, self.api_preference)
+        if not capture.isOpened():
+            raise IOError(f"Cannot open capture device {self.device!r}")
+        if not self.is_file:
+            # The format has to be chosen before the resolution it is available at
+            if self.fourcc is not None:
+                capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+            if self.width is not None:
+                capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            if self.height is not None:
+                capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            if self.fps is not None:
+                capture.set(cv2.CAP_PROP_FPS, self.fps)
+            # Drivers that support it keep a single buffer, so even a stalled grab thread
+            # does not leave old frames queued
+            capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.frame_size = (
+            int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        )
+        self.capture_fps = capture.get(cv2.CAP_PROP_FPS) or None
+        requested = (self.width or self.frame_size[0], self.height or self.frame_size[1])
+        if not self.is_file and requested != self.frame_size:
+            logger.warning("Capture device %r runs at %dx%d instead of %dx%d", self.device, *self.frame_size, *requested)
+        return capture
+
+    def _grab_frames(self):
+        capture = self._capture
+        interval = 1.0 / (self.capture_fps or 30.0) if self.is_file and self.realtime else 0.0
+        next_time = time.perf_counter()
+        shape = (self.frame_size[1], self.frame_size[0], 3)
+        try:
+            while self._running:
+                if interval:
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_time += interval
+
+                if not capture.grab():
+                    if self.is_file and self.loop and self.frames_grabbed:
+                        capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    if not self.is_file:
+                        logger.error("Capture device %r stopped delivering frames", self.device)
+                    break
+                # The frame is complete once grab() returns it
+                capture_time = time.monotonic()
+                self.frames_grabbed += 1
+
+                if self.lazy and not self._waiting:
+                    self.frames_skipped += 1
+                    continue
+                start = time.monotonic()
+                dst = self.buffer_pool.lease(shape) if self.buffer_pool is not None and all(shape) else None
+                ok, frame = capture.retrieve(dst)
+                if not ok or frame is None:
+                    continue
+                self.frames_retrieved += 1
+                self._publish_frame(frame, capture_time, {'decode': time.monotonic() - start})
+        finally:
+            self.finished.set()
@@ -0,0 +1,258 @@
+"""JPEG decoding backends with reduced-resolution and grayscale decode."""
+
+import inspect
+import io
+import math
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple, Type, Union
+
+import cv2
+import numpy as np
+
+from handful.utils.bufferpool import BufferPool
+
+# Output size denominators every backend supports. libjpeg scales the inverse
+# DCT itself, so a reduced decode skips work instead of adding a resize.
+SCALES = (1, 2, 4, 8)
+
+# Markers without a length field: TEM and the restart markers
+_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+# Start-of-frame markers, i.e. 0xC0-0xCF except DHT, JPG and DAC
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+JPEGData = Union[bytes, bytearray, memoryview]
+
+
+def jpeg_size(data: JPEGData) -> Optional[Tuple[int, int]]:
+    """Read the size of a JPEG from its frame header, without decoding it.
+    :param data: JPEG bytes
+    :return (width, height), or None if no frame header was found
+    """
+    view = memoryview(data)
+    i = 2
+    while i + 4 <= len(view):
+        if view[i] != 0xFF:
+            return None
+        marker = view[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+        elif marker in _STANDALONE_MARKERS:
+            i += 2
+        elif marker in _SOF_MARKERS:
+            if i + 9 > len(view):
+                return None
+            height = view[i + 5] << 8 | view[i + 6]
+            width = view[i + 7] << 8 | view[i + 8]
+            return width, height
+        else:
+            i += 2 + (view[i + 2] << 8 | view[i + 3])
+    return None
+
+
+def choose_scale(size: Tuple[int, int], target_size: Tuple[int, int]) -> int:
+    """Largest decode scale whose output still covers the target size.
+    :param size: (width, height) of the JPEG
+    :param target_size: (width, height) the frame will be resized to
+    :return Denominator from SCALES, 1 if even half size would be too small
+    """
+    width, height = size
+    for scale in reversed(SCALES):
+        if math.ceil(width / scale) >= target_size[0] and math.ceil(height / scale) >= target_size[1]:
+            return scale
+    return 1
+
+
+def scaled_shape(size: Tuple[int, int], scale: int, grayscale: bool = False) -> Tuple[int, ...]:
+    """Shape of the array a JPEG of the given size decodes to at a scale (libjpeg rounds up)."""
+    width, height = size
+    shape = (math.ceil(height / scale), math.ceil(width / scale))
+    return shape if grayscale else shape + (3,)
+
+
+class JPEGDecoder(ABC):
+    """Decodes JPEG payloads to BGR or grayscale arrays, at full size or 1/2, 1/4 or 1/8."""
+
+    name = ""
+    # Whether decode() writes into a given ``dst`` rather than allocating its output
+    writes_dst = False
+
+    @abstractmethod
+    def decode(
+        self,
+        data: JPEGData,
+        scale: int = 1,
+        grayscale: bool = False,
+        dst: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        """Decode one JPEG.
+        :param data: JPEG bytes
+        :param scale: Denominator of the output size, one of SCALES
+        :param grayscale: Whether to decode only the luma channel, to a 2D array
+        :param dst: Array of the output shape (see scaled_shape) to decode into;
+            ignored by backends whose ``writes_dst`` is False
+        :return The image, which is ``dst`` when it was written into, or None if the data
+            could not be decoded
+        """
+        pass
+
+
+def _check_scale(scale: int) -> None:
+    if scale not in SCALES:
+        raise ValueError(f"Unsupported decode scale 1/{scale}, expected one of {SCALES}")
+
+
+class OpenCVDecoder(JPEGDecoder):
+    """``cv2.imdecode``, using its IMREAD_REDUCED_* modes for reduced sizes."""
+
+    name = "opencv"
+
+    _FLAGS = {
+        (1, False): cv2.IMREAD_COLOR,
+        (2, False): cv2.IMREAD_REDUCED_COLOR_2,
+        (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+        (8, False): cv2.IMREAD_REDUCED_COLOR_8,
+        (1, True): cv2.IMREAD_GRAYSCALE,
+        (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+        (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+        (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    }
+
+    def decode(self, data, scale=1, grayscale=False, dst=None):
+        _check_scale(scale)
+        # cv2.imdecode has no dst argument
+        return cv2.imdecode(np.frombuffer(data, np.uint8), self._FLAGS[scale, grayscale])
+
+
+class TurboJPEGDecoder(JPEGDecoder):
+    """libjpeg-turbo through the optional PyTurboJPEG binding (``pip install PyTurboJPEG``)."""
+
+    name = "turbojpeg"
+
+    def __init__(self, lib_path: Optional[str] = None):
+        """Load libjpeg-turbo.
+        :param lib_path: Path of the libturbojpeg shared library, if not in a default location
+        """
+        from turbojpeg import TJPF_BGR, TJPF_GRAY, TurboJPEG
+
+        self._jpeg = TurboJPEG(lib_path)
+        self._pixel_formats = {False: TJPF_BGR, True: TJPF_GRAY}
+        # Only recent versions of the binding can decode into an existing array
+        self.writes_dst = 'dst' in inspect.signature(self._jpeg.decode).parameters
+
+    def decode(self, data, scale=1, grayscale=False, dst=None):
+        _check_scale(scale)
+        kwargs = {'pixel_format': self._pixel_formats[grayscale]}
+        if scale > 1:
+            kwargs['scaling_factor'] = (1, scale)
+        if dst is not None and self.writes_dst:
+            kwargs['dst'] = dst
+        try:
+            frame = self._jpeg.decode(data, **kwargs)
+        except OSError:
+            return None
+        # Grayscale comes back with a channel axis of one
+        return frame[:, :, 0] if grayscale and frame.ndim == 3 else frame
+
+
+class PillowDecoder(JPEGDecoder):
+    """Pillow, whose ``draft`` mode makes libjpeg decode at a reduced size.
+
+    Pillow decodes to RGB; the conversion to BGR writes into ``dst``.
+    """
+
+    name = "pillow"
+    writes_dst = True
+
+    def __init__(self):
+        from PIL import Image
+
+        self._open = Image.open
+
+    def decode(self, data, scale=1, grayscale=False, dst=None):
+        _check_scale(scale)
+        mode = "L" if grayscale else "RGB"
+        try:
+            image = self._open(io.BytesIO(data))
+            # draft sets the decoder's output mode, and picks the largest reduction
+            # that keeps at least the requested size
+            image.draft(mode, (image.width // scale, image.height // scale))
+            if image.mode != mode:
+                # e.g. CMYK or grayscale JPEGs that draft cannot convert while decoding
+                image = image.convert(mode)
+            image.load()
+        except (OSError, SyntaxError):
+            return None
+
+        pixels = np.asarray(image)
+        if not grayscale:
+            return cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR, dst=dst)
+        if dst is None or dst.shape != pixels.shape:
+            # Pillow's array is read-only
+            return pixels.copy()
+        np.copyto(dst, pixels)
+        return dst
+
+
+DECODERS: Dict[str, Type[JPEGDecoder]] = {
+    decoder.name: decoder for decoder in (OpenCVDecoder, TurboJPEGDecoder, PillowDecoder)
+}
+
+
+def create_decoder(backend: str = "opencv") -> JPEGDecoder:
+    """Create a decoder by backend name.
+    :param backend: One of DECODERS
+    :return The decoder
+    :raises ImportError: If the backend's library is not installed
+    """
+    if backend not in DECODERS:
+        raise ValueError(f"Unknown JPEG decoder {backend!r}, expected one of {sorted(DECODERS)}")
+    try:
+        return DECODERS[backend]()
+    except (ImportError, RuntimeError, OSError) as e:
+        # PyTurboJPEG raises RuntimeError when the shared library is missing
+        raise ImportError(f"JPEG decoder {backend!r} is not available: {e}") from e
+
+
+class FrameDecoder:
+    """Decodes stream frames at the smallest DCT scale that still covers a target size.
+
+    The scale is chosen per frame from the JPEG header, so a camera that changes
+    resolution is handled. The frame then only needs a cheap resize from at most
+    twice the target size, instead of a full-size decode followed by a large
+    downscale. With a buffer pool, backends that can decode into a given array
+    do so into leased buffers.
+    """
+
+    def __init__(
+        self,
+        decoder: Union[str, JPEGDecoder] = "opencv",
+        target_size: Optional[Tuple[int, int]] = None,
+        grayscale: bool = False,
+        buffer_pool: Optional[BufferPool] = None
+    ):
+        """Initialize the frame decoder.
+        :param decoder: Backend name or decoder instance
+        :param target_size: (width, height) frames are resized to after decoding; None
+            decodes at full size
+        :param grayscale: Whether to decode only the luma channel
+        :param buffer_pool: Optional pool of output buffers
+        """
+        self.decoder = create_decoder(decoder) if isinstance(decoder, str) else decoder
+        self.target_size = target_size
+        self.grayscale = grayscale
+        self.buffer_pool = buffer_pool
+        # Scale of the last decoded frame
+        self.scale = 1
+
+    def decode(self, data: JPEGData) -> Optional[np.ndarray]:
+        """Decode one frame.
+        :param data: JPEG bytes
+        :return The frame, or None if it could not be decoded
+        """
+        use_pool = self.buffer_pool is not None and self.decoder.writes_dst
+        size = jpeg_size(data) if self.target_size is not None or use_pool else None
+        scale = choose_scale(size, self.target_size) if size and self.target_size is not None else 1
+        dst = self.buffer_pool.lease(scaled_shape(size, scale, self.grayscale)) if use_pool and size else None
+        self.scale = scale
+        return self.decoder.decode(data, scale, self.grayscale, dst)
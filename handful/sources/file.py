@@ -0,0 +1,213 @@
+"""Replay of recorded MJPEG captures and video files."""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from handful.sources.base import BaseFrameSource
+from handful.sources.decoders import FrameDecoder
+from handful.sources.mjpeg_parser import MJPEGParser
+from handful.utils.bufferpool import BufferPool
+
+logger = logging.getLogger(__name__)
+
+JPEG_SOI = b"\xff\xd8"
+
+
+def is_mjpeg_capture(path: Union[str, os.PathLike]) -> bool:
+    """Whether a file holds raw multipart MJPEG stream bytes rather than a video container."""
+    with open(path, "rb") as f:
+        return f.read(2) == b"--"
+
+
+def iter_mjpeg_file(
+    path: Union[str, os.PathLike],
+    boundary: bytes = b"mjpegstream",
+    chunk_size: int = 1 << 16
+) -> Iterator[memoryview]:
+    """Yield the JPEG payloads of a recorded multipart MJPEG capture.
+    :param path: Capture file, e.g. saved from a live stream with ``requests``
+    :param boundary: Multipart boundary of the stream
+    :param chunk_size: Bytes read at a time when a part's length is unknown
+    :return Iterator of payloads, borrowed from the parser's buffer until the next one
+    """
+    parser = MJPEGParser(boundary)
+    with open(path, "rb") as f:
+        while True:
+            size = parser.read_size_hint(chunk_size)
+            received = f.readinto(parser.writable(size)[:size])
+            if not received:
+                return
+            parser.commit(received)
+            while (frame_data := parser.next_frame()) is not None:
+                yield frame_data
+
+
+class FileFrameSource(BaseFrameSource):
+    """Plays a recorded MJPEG capture or a video file as if it were a camera.
+
+    ``speed`` selects the playback rate: ``"native"`` uses the file's own frame
+    rate (MJPEG captures carry no timing, so ``fps`` stands in for it), a number
+    plays at that many frames per second, and ``"max"`` publishes frames as fast
+    as they decode. With ``lossless`` every frame waits until a consumer has taken
+    the previous one, so nothing is skipped, e.g. when benchmarking.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        speed: Union[str, float] = "native",
+        fps: float = 30.0,
+        loop: bool = False,
+        lossless: bool = False,
+        boundary: str = "mjpegstream",
+        buffer_pool: Optional[BufferPool] = None,
+        decoder: Optional[FrameDecoder] = None
+    ):
+        """Initialize the replay source.
+        :param path: MJPEG capture or any video file OpenCV can read
+        :param speed: "native", "max", or a frame rate in frames per second
+        :param fps: Native frame rate of MJPEG captures, and of videos that do not report one
+        :param loop: Whether to restart from the beginning at the end of the file
+        :param lossless: Whether to wait for each frame to be consumed before publishing the next
+        :param boundary: Multipart boundary of MJPEG captures
+        :param buffer_pool: Optional pool that video files are decoded into
+        :param decoder: JPEG decoder for MJPEG captures (full-size OpenCV by default)
+        """
+        super().__init__()
+        if speed not in ("native", "max") and not (isinstance(speed, (int, float)) and speed > 0):
+            raise ValueError(f"Unknown replay speed {speed!r}")
+        self.path = os.fspath(path)
+        self.speed = speed
+        self.fps = fps
+        self.loop = loop
+        self.lossless = lossless
+        self.boundary = boundary.encode()
+        self.mjpeg = is_mjpeg_capture(self.path)
+        self.buffer_pool = buffer_pool
+        self.decoder = decoder or FrameDecoder(buffer_pool=buffer_pool)
+        self.finished = threading.Event()
+        self.frames_read = 0
+        self._taken = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start replaying in a separate thread."""
+        if self._running:
+            return
+        self._running = True
+        self.finished.clear()
+        self._thread = threading.Thread(target=self._replay, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop replaying."""
+        with self._frame_condition:
+            self._running = False
+            self._frame_condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wait_for_frame(
+        self,
+        last_sequence: int,
+        timeout: Optional[float] = None
+    ) -> Optional[Tuple[int, np.ndarray]]:
+        """Block until a frame newer than ``last_sequence`` is available, and mark it taken."""
+        new_frame = super().wait_for_frame(last_sequence, timeout)
+        if new_frame is not None and self.lossless:
+            with self._frame_condition:
+                self._taken = max(self._taken, new_frame[0])
+                self._frame_condition.notify_all()
+        return new_frame
+
+    def _replay(self):
+        try:
+            while self._running:
+                frames, native_fps = self._open()
+                interval = self._interval(native_fps)
+                next_time = time.perf_counter()
+                for frame, timings in frames:
+                    if not self._running:
+                        break
+                    if interval:
+                        delay = next_time - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                        next_time += interval
+                    if not self._wait_until_taken():
+                        break
+                    self.frames_read += 1
+                    # A replayed frame is captured when it is due, not when it was read
+                    self._publish_frame(frame, timings=timings)
+                else:
+                    if self.loop and self.frames_read:
+                        continue
+                break
+        finally:
+            self.finished.set()
+
+    def _interval(self, native_fps: Optional[float]) -> float:
+        """Seconds between frames, or 0 to publish as fast as possible."""
+        if self.speed == "max":
+            return 0.0
+        if self.speed == "native":
+            return 1.0 / (native_fps or self.fps)
+        return 1.0 / self.speed
+
+    def _wait_until_taken(self) -> bool:
+        """In lossless mode, wait until the latest frame has been consumed."""
+        if not self.lossless:
+            return self._running
+        with self._frame_condition:
+            self._frame_condition.wait_for(
+                lambda: not self._running or self._taken >= self._frame_sequence
+            )
+            return self._running
+
+    def _open(self) -> Tuple[Iterator[Tuple[np.ndarray, Dict[str, float]]], Optional[float]]:
+        """Open the file.
+        :return Iterator of (frame, decode timing) pairs, and the native frame rate (None if unknown)
+        """
+        if self.mjpeg:
+            return self._mjpeg_frames(), None
+
+        capture = cv2.VideoCapture(self.path)
+        if not capture.isOpened():
+            raise IOError(f"Cannot open video file {self.path}")
+        return self._video_frames(capture), capture.get(cv2.CAP_PROP_FPS) or None
+
+    def _mjpeg_frames(self) -> Iterator[Tuple[np.ndarray, Dict[str, float]]]:
+        for frame_data in iter_mjpeg_file(self.path, self.boundary):
+            if frame_data[:2] != JPEG_SOI:
+                logger.warning("Invalid frame data in capture. Skipping.")
+                continue
+            start = time.monotonic()
+            frame = self.decoder.decode(frame_data)
+            if frame is not None:
+                yield frame, {'decode': time.monotonic() - start}
+
+    def _video_frames(self, capture: cv2.VideoCapture) -> Iterator[Tuple[np.ndarray, Dict[str, float]]]:
+        shape = (
+            int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            3
+        )
+        try:
+            while True:
+                start = time.monotonic()
+                # cv2.imdecode cannot write into a buffer, but VideoCapture.read can
+                dst = self.buffer_pool.lease(shape) if self.buffer_pool is not None and all(shape) else None
+                ok, frame = capture.read(dst)
+                if not ok:
+                    return
+                yield frame, {'decode': time.monotonic() - start}
+        finally:
+            capture.release()
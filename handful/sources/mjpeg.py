@@ -1,23 +1,38 @@
-import cv2
-import numpy as np
+import time
+from typing import Optional
+
 import requests
 from threading import Thread
 
 from handful.sources.base import BaseFrameSource
+from handful.sources.decoders import FrameDecoder
+from handful.sources.mjpeg_parser import MJPEGParser
+
+JPEG_SOI = b"\xff\xd8"
 
 
 class MJPEGStreamClient(BaseFrameSource):
 
-    def __init__(self, url: str, boundary: str ="mjpegstream"):
+    def __init__(
+        self,
+        url: str,
+        boundary: str = "mjpegstream",
+        chunk_size: int = 4096,
+        decoder: Optional[FrameDecoder] = None
+    ):
         """
         Initializes the MJPEG stream client.
         :param url: The URL of the MJPEG stream.
         :param boundary: The boundary string used to separate frames in the stream.
+        :param chunk_size: Number of bytes to read at a time when the part length is unknown.
+        :param decoder: JPEG decoder, e.g. one that decodes at a reduced size (full-size OpenCV by default).
         """
+        super().__init__()
         self.url = url
         self.boundary = boundary.encode()  # Ensure the boundary is in bytes
+        self.chunk_size = chunk_size
+        self.decoder = decoder or FrameDecoder()
         self.running = False
-        self.frame = None  # Holds the latest frame
         self.thread = None
 
     def start(self):
@@ -46,51 +61,36 @@ class MJPEGStreamClient(BaseFrameSource):
                 self.running = False
                 return
 
-            buffer = b""  # Buffer to hold data between boundaries
-            for chunk in response.iter_content(chunk_size=4096):
-                if not self.running:
+            parser = MJPEGParser(self.boundary)
+            stream = response.raw
+            while self.running:
+                # Read straight into the parser's buffer, exactly up to the end of the
+                # current part when its Content-Length is known
+                size = parser.read_size_hint(self.chunk_size)
+                received = stream.readinto(parser.writable(size)[:size])
+                if not received:
                     break
+                parser.commit(received)
+                # A frame counts as captured when its last bytes arrive
+                arrival = time.monotonic()
 
-                buffer += chunk
-                while True:
-                    # Find the start of the next frame
-                    start = buffer.find(b"--" + self.boundary)
-                    if start == -1:
-                        break
-
-                    # Find the end of the frame
-                    end = buffer.find(b"--" + self.boundary, start + len(self.boundary) + 2)
-                    if end == -1:
-                        break
-
-                    # Extract frame data (with headers)
-                    frame_block = buffer[start + len(self.boundary) + 2: end]
-                    buffer = buffer[end:]  # Update the buffer
+                while (frame_data := parser.next_frame()) is not None:
+                    self._decode_frame(frame_data, arrival)
 
-                    # Strip headers from the frame data
-                    header_end = frame_block.find(b"\n\r\n")
-                    if header_end != -1:
-                        frame_data = frame_block[header_end + 4:-2]  # Skip the header and trailing /r/n
-
-                        # HACK: Try to correct the byte ordering to convince opencv to read it
-                        frame_data = bytearray(frame_data)
-                        open_cv_jpeg_soi = b'\xff\xd8\xff\x00'
-                        if frame_data[:4] == b'\xd8\xff\xe0\x00':
-                            frame_data[:4] = open_cv_jpeg_soi
-
-                        if frame_data.startswith(open_cv_jpeg_soi):
-                            try:
-                                frame = cv2.imdecode(np.frombuffer(frame_data, np.uint8), cv2.IMREAD_COLOR)
-                                if frame is not None:
-                                    self.frame = frame
-                            except Exception as e:
-                                print(f"Frame decoding error: {e}")
-                        else:
-                            print("Invalid frame data detected. Skipping.")
-
-    def get_frame(self):
+    def _decode_frame(self, frame_data: memoryview, arrival: float):
         """
-        Retrieves the latest frame from the stream.
-        @return: numpy.ndarray: The latest frame, or None if no frame is available.
+        Decodes a single JPEG payload and publishes it as the latest frame.
+        :param frame_data: JPEG bytes, borrowed from the parser's buffer.
+        :param arrival: time.monotonic() at which the payload's last bytes were read.
         """
-        return self.frame
+        if frame_data[:2] != JPEG_SOI:
+            print("Invalid frame data detected. Skipping.")
+            return
+
+        try:
+            start = time.monotonic()
+            frame = self.decoder.decode(frame_data)
+            if frame is not None:
+                self._publish_frame(frame, arrival, {'decode': time.monotonic() - start})
+        except Exception as e:
+            print(f"Frame decoding error: {e}")
@@ -0,0 +1,193 @@
+"""Incremental parser for multipart MJPEG streams."""
+
+from typing import Optional
+
+_HEADER_END = b"\r\n\r\n"
+_CONTENT_LENGTH = b"content-length"
+# Larger Content-Length values are treated as corrupt and ignored, so a bad
+# header cannot make the parser grow its buffer without bound
+MAX_CONTENT_LENGTH = 64 << 20
+
+
+class MJPEGParser:
+    """Zero-copy parser for ``multipart/x-mixed-replace`` MJPEG streams.
+
+    Stream bytes are written into a single preallocated buffer which is compacted
+    (and grown when a part does not fit) instead of being re-concatenated on every
+    chunk. Scanning resumes where the previous call left off, and when a part
+    carries a ``Content-Length`` header the body is sliced out by length without
+    searching for the next boundary at all.
+
+    Frames are returned as ``memoryview`` slices of the internal buffer. A view is
+    only valid until the next call to :meth:`writable` or :meth:`feed`, so callers
+    must decode (or copy) it before handing more data to the parser.
+    """
+
+    _STATE_HEADERS = 0
+    _STATE_BODY = 1
+
+    def __init__(
+        self,
+        boundary: bytes = b"mjpegstream",
+        initial_size: int = 1 << 20,
+        max_content_length: int = MAX_CONTENT_LENGTH
+    ):
+        """Initialize the parser.
+        :param boundary: Multipart boundary, without the leading ``--``
+        :param initial_size: Initial buffer capacity in bytes (grows on demand)
+        :param max_content_length: Content-Length values above this (or negative ones)
+            are ignored and the part is delimited by scanning for the boundary instead
+        """
+        self.max_content_length = max_content_length
+        self.delimiter = b"--" + boundary
+        self._buffer = bytearray(initial_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # First unconsumed byte
+        self._end = 0  # One past the last written byte
+        self._scan = 0  # Where the next boundary/header search resumes
+        self._state = self._STATE_HEADERS
+        self._body_start = 0
+        self._content_length: Optional[int] = None
+
+        self.frames_parsed = 0
+        self.bytes_received = 0
+        self.buffer_grows = 0
+
+    @property
+    def capacity(self) -> int:
+        """Current size of the internal buffer in bytes."""
+        return len(self._buffer)
+
+    @property
+    def buffered(self) -> int:
+        """Number of bytes received but not yet consumed."""
+        return self._end - self._start
+
+    def read_size_hint(self, default: int = 4096) -> int:
+        """Suggest how many bytes to read next.
+
+        While inside a body with a known ``Content-Length`` this is exactly the
+        number of bytes still missing from the frame, so a blocking reader never
+        waits on bytes that belong to the following part.
+        :param default: Size to use when the remaining length is unknown
+        :return Number of bytes to request from the underlying stream
+        """
+        if self._state == self._STATE_BODY and self._content_length is not None:
+            missing = self._body_start + self._content_length - self._end
+            if missing > 0:
+                return missing
+        return default
+
+    def writable(self, size: int) -> memoryview:
+        """Return a writable view of at least ``size`` free bytes at the buffer tail.
+
+        Call :meth:`commit` with the number of bytes actually written.
+        :param size: Minimum number of free bytes required
+        :return memoryview over the free region of the buffer
+        """
+        if self._start == self._end:
+            self._rebase(self._start)
+        if len(self._buffer) - self._end < size:
+            self._compact(size)
+        return self._view[self._end:]
+
+    def commit(self, size: int) -> None:
+        """Mark ``size`` bytes of the last :meth:`writable` view as filled.
+        :param size: Number of bytes written
+        """
+        self._end += size
+        self.bytes_received += size
+
+    def feed(self, data) -> None:
+        """Copy a chunk of stream data into the buffer.
+        :param data: Any bytes-like object
+        """
+        size = len(data)
+        self.writable(size)[:size] = data
+        self.commit(size)
+
+    def next_frame(self) -> Optional[memoryview]:
+        """Extract the next complete JPEG payload from the buffered data.
+        :return memoryview of the JPEG bytes, or None if no complete frame is buffered
+        """
+        buffer = self._buffer
+        while True:
+            if self._state == self._STATE_HEADERS:
+                part_start = buffer.find(self.delimiter, max(self._scan, self._start), self._end)
+                if part_start == -1:
+                    # Keep a partial delimiter at the tail so it can be completed next time
+                    self._start = max(self._start, self._end - len(self.delimiter) + 1)
+                    self._scan = self._start
+                    return None
+
+                self._start = part_start
+                header_end = buffer.find(_HEADER_END, part_start + len(self.delimiter), self._end)
+                if header_end == -1:
+                    self._scan = part_start
+                    return None
+
+                self._content_length = self._parse_content_length(
+                    part_start + len(self.delimiter), header_end
+                )
+                self._body_start = header_end + len(_HEADER_END)
+                self._scan = self._body_start
+                self._state = self._STATE_BODY
+
+            if self._content_length is not None:
+                body_end = self._body_start + self._content_length
+                if body_end > self._end:
+                    return None
+                next_start = body_end
+            else:
+                body_end = buffer.find(self.delimiter, self._scan, self._end)
+                if body_end == -1:
+                    self._scan = max(self._body_start, self._end - len(self.delimiter) + 1)
+                    return None
+                next_start = body_end
+                # The delimiter is preceded by the part's trailing CRLF
+                if buffer[body_end - 2:body_end] == b"\r\n":
+                    body_end -= 2
+
+            frame = self._view[self._body_start:body_end]
+            self._start = self._scan = next_start
+            self._state = self._STATE_HEADERS
+            self.frames_parsed += 1
+            return frame
+
+    def _parse_content_length(self, start: int, end: int) -> Optional[int]:
+        """Read the Content-Length header from the part headers, if present."""
+        for line in bytes(self._view[start:end]).split(b"\r\n"):
+            name, sep, value = line.partition(b":")
+            if sep and name.strip().lower() == _CONTENT_LENGTH:
+                try:
+                    length = int(value.strip())
+                except ValueError:
+                    return None
+                if 0 <= length <= self.max_content_length:
+                    return length
+                return None
+        return None
+
+    def _rebase(self, offset: int) -> None:
+        """Shift all buffer positions down by ``offset``."""
+        self._start -= offset
+        self._end -= offset
+        self._scan -= offset
+        self._body_start -= offset
+
+    def _compact(self, size: int) -> None:
+        """Move unconsumed bytes to the front, growing the buffer if still too small."""
+        pending = self._end - self._start
+        if pending + size > len(self._buffer):
+            capacity = len(self._buffer)
+            while capacity < pending + size:
+                capacity *= 2
+            buffer = bytearray(capacity)
+            buffer[:pending] = self._view[self._start:self._end]
+            # Earlier frame views keep the old buffer alive until they are released
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+            self.buffer_grows += 1
+        elif self._start:
+            self._view[:pending] = self._view[self._start:self._end]
+        self._rebase(self._start)
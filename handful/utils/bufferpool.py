@@ -0,0 +1,93 @@
+"""Pool of reusable frame-sized arrays."""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# References to a pooled array held by the pool's list, the loop variable and
+# sys.getrefcount's own argument while the pool scans for a free array
+_POOL_REFERENCES = 3
+
+
+class BufferPool:
+    """Hands out preallocated arrays keyed by shape and dtype.
+
+    Use leased arrays as OpenCV ``dst=`` outputs so that steady-state frame
+    processing allocates nothing. A leased array becomes available again when
+    it is handed back with :meth:`release`, or, for arrays that travel down the
+    pipeline with no single owner (e.g. a flipped frame held by viewers), as
+    soon as nothing outside the pool references it any more. An array is never
+    handed out while something else still references it, unless it was
+    explicitly released.
+    """
+
+    def __init__(self, max_buffers: int = 8, max_shapes: int = 8):
+        """Initialize the pool.
+        :param max_buffers: Most arrays kept per shape and dtype; leases beyond that
+            are allocated normally and not pooled
+        :param max_shapes: Most distinct shapes kept; the least recently used shape's
+            arrays are dropped when a new one is needed
+        """
+        self.max_buffers = max_buffers
+        self.max_shapes = max_shapes
+        self._buffers: "OrderedDict[Tuple, List[np.ndarray]]" = OrderedDict()
+        self._released: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+        self.leases = 0
+        self.hits = 0
+        self.allocations = 0
+
+    def lease(self, shape: Sequence[int], dtype: Any = np.uint8) -> np.ndarray:
+        """Get an array of the given shape and dtype with undefined contents.
+        :param shape: Array shape
+        :param dtype: Array dtype
+        :return A pooled array, or a new one if every pooled array is in use
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            self.leases += 1
+            buffers = self._buffers.get(key)
+            if buffers is None:
+                buffers = self._buffers[key] = []
+                while len(self._buffers) > self.max_shapes:
+                    _, evicted = self._buffers.popitem(last=False)
+                    for buffer in evicted:
+                        self._released.pop(id(buffer), None)
+            else:
+                self._buffers.move_to_end(key)
+
+            for buffer in buffers:
+                if self._released.pop(id(buffer), None) is not None \
+                        or sys.getrefcount(buffer) <= _POOL_REFERENCES:
+                    self.hits += 1
+                    return buffer
+
+            self.allocations += 1
+            buffer = np.empty(key[0], key[1])
+            if len(buffers) < self.max_buffers:
+                buffers.append(buffer)
+            return buffer
+
+    def release(self, buffer: np.ndarray) -> None:
+        """Hand a leased array back for immediate reuse; the caller must not use it again."""
+        with self._lock:
+            key = (buffer.shape, buffer.dtype.str)
+            if any(pooled is buffer for pooled in self._buffers.get(key, ())):
+                self._released[id(buffer)] = buffer
+
+    def stats(self) -> Dict[str, Any]:
+        """Return lease accounting and the memory held by the pool."""
+        with self._lock:
+            pooled = [buffer for buffers in self._buffers.values() for buffer in buffers]
+            return {
+                'leases': self.leases,
+                'hits': self.hits,
+                'allocations': self.allocations,
+                'hit_rate': self.hits / self.leases if self.leases else 0.0,
+                'buffers': len(pooled),
+                'bytes': sum(buffer.nbytes for buffer in pooled),
+            }
@@ -0,0 +1,291 @@
+"""Fixed-size frame ring buffer in ``multiprocessing.shared_memory``."""
+
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from handful.core.types import HANDEDNESS, NUM_LANDMARKS, HandLandmarks
+
+RING_MAGIC = 0x48464452  # "HFDR"
+RING_VERSION = 2
+NUM_FINGERS = 5
+_HANDEDNESS_CODES = {label: code for code, label in enumerate(HANDEDNESS)}
+
+_HEADER_DTYPE = np.dtype([
+    ('magic', '<u4'),
+    ('version', '<u4'),
+    ('slots', '<u4'),
+    ('max_hands', '<u4'),
+    ('height', '<u4'),
+    ('width', '<u4'),
+    ('channels', '<u4'),
+    ('_pad', '<u4'),
+    ('latest', '<u8'),
+], align=True)
+
+_ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _slot_dtype(max_hands: int) -> np.dtype:
+    return np.dtype([
+        ('lock', '<u8'),  # Seqlock counter: odd while the slot is being written
+        ('sequence', '<u8'),
+        ('timestamp', '<f8'),
+        ('height', '<u4'),
+        ('width', '<u4'),
+        ('channels', '<u4'),
+        ('num_hands', '<u4'),
+        ('handedness', 'u1', (max_hands,)),  # Index into HANDEDNESS
+        ('scores', '<f4', (max_hands,)),
+        ('track_ids', '<u4', (max_hands,)),
+        ('fingers', '?', (max_hands, NUM_FINGERS)),
+        ('coordinates', '<f4', (max_hands, 3, NUM_LANDMARKS, 3)),
+    ], align=True)
+
+
+class RingSlot:
+    """Data read from one ring slot.
+
+    When read with ``copy=False`` the arrays are views into shared memory and stay
+    valid only until the writer wraps around to the slot again; check
+    :meth:`SharedFrameRing.is_current` before trusting them.
+    """
+
+    __slots__ = (
+        'index', 'lock', 'sequence', 'timestamp', 'frame',
+        'handedness', 'scores', 'track_ids', 'fingers', 'coordinates'
+    )
+
+    def __init__(
+        self, index, lock, sequence, timestamp, frame, handedness, scores, track_ids, fingers,
+        coordinates
+    ):
+        self.index = index
+        self.lock = lock
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.frame = frame
+        self.handedness = handedness
+        self.scores = scores
+        self.track_ids = track_ids
+        self.fingers = fingers
+        self.coordinates = coordinates
+
+    def hand_data(self) -> Optional[List[HandLandmarks]]:
+        """Rebuild the slot's hands (sharing its arrays), or None if there are none."""
+        if not len(self.fingers):
+            return None
+        return [
+            HandLandmarks(
+                self.coordinates[i],
+                self.fingers[i],
+                HANDEDNESS[self.handedness[i]],
+                float(self.scores[i]),
+                int(self.track_ids[i])
+            )
+            for i in range(len(self.fingers))
+        ]
+
+
+class SharedFrameRing:
+    """Single-writer, multi-reader ring of frames and landmark arrays.
+
+    Each slot is guarded by a seqlock, so the writer never blocks and readers
+    detect (and retry) reads that raced with a write instead of taking a lock.
+    The header's ``latest`` field holds the sequence number of the newest
+    complete slot.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """Wrap an existing shared memory block; use :meth:`create` or :meth:`attach`."""
+        self.shm = shm
+        self.owner = owner
+        self._header = np.ndarray((), _HEADER_DTYPE, buffer=shm.buf)
+        if int(self._header['magic']) != RING_MAGIC:
+            raise ValueError(f"Shared memory block {shm.name!r} is not a frame ring")
+        if int(self._header['version']) != RING_VERSION:
+            raise ValueError(f"Unsupported frame ring version {int(self._header['version'])}")
+
+        self.slots = int(self._header['slots'])
+        self.max_hands = int(self._header['max_hands'])
+        self.frame_shape = (
+            int(self._header['height']),
+            int(self._header['width']),
+            int(self._header['channels'])
+        )
+        slot_dtype = _slot_dtype(self.max_hands)
+        meta_offset = _align(_HEADER_DTYPE.itemsize)
+        frames_offset = _align(meta_offset + slot_dtype.itemsize * self.slots)
+        self._meta = np.ndarray((self.slots,), slot_dtype, buffer=shm.buf, offset=meta_offset)
+        self._frames = np.ndarray(
+            (self.slots, int(np.prod(self.frame_shape))),
+            np.uint8,
+            buffer=shm.buf,
+            offset=frames_offset
+        )
+
+    @staticmethod
+    def required_size(frame_shape: Tuple[int, int, int], slots: int, max_hands: int) -> int:
+        """Size in bytes of a ring with the given geometry."""
+        meta_offset = _align(_HEADER_DTYPE.itemsize)
+        frames_offset = _align(meta_offset + _slot_dtype(max_hands).itemsize * slots)
+        return frames_offset + slots * int(np.prod(frame_shape))
+
+    @classmethod
+    def create(
+        cls,
+        frame_shape: Tuple[int, int, int] = (1080, 1920, 3),
+        slots: int = 4,
+        max_hands: int = 2,
+        name: Optional[str] = None
+    ) -> "SharedFrameRing":
+        """Allocate a new ring.
+        :param frame_shape: Largest (height, width, channels) frame the ring can hold
+        :param slots: Number of frames kept before the writer wraps around
+        :param max_hands: Maximum number of hands stored per frame
+        :param name: Shared memory block name (random if None)
+        :return Ring owning the new block; call :meth:`unlink` when done
+        """
+        size = cls.required_size(frame_shape, slots, max_hands)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((), _HEADER_DTYPE, buffer=shm.buf)
+        header[()] = (RING_MAGIC, RING_VERSION, slots, max_hands, *frame_shape, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, track: bool = True) -> "SharedFrameRing":
+        """Attach to a ring created by another process.
+        :param name: Shared memory block name
+        :param track: Register the block with this process's resource tracker. Pass
+            False from processes that are not children of the creator, otherwise the
+            block is unlinked when they exit.
+        :return Ring view of the existing block
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        if not track:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def latest(self) -> int:
+        """Sequence number of the newest complete frame (0 if none)."""
+        return int(self._header['latest'])
+
+    def write(
+        self,
+        sequence: int,
+        timestamp: float,
+        frame: np.ndarray,
+        hand_data: Optional[List[HandLandmarks]] = None
+    ) -> None:
+        """Publish a frame and its hand data. Only one process may write.
+        :param sequence: Frame sequence number, strictly increasing and non-zero
+        :param timestamp: Frame timestamp in seconds
+        :param frame: uint8 frame no larger than the ring's frame shape
+        :param hand_data: Hands tracked in the frame (extra hands beyond max_hands are dropped)
+        """
+        if frame.ndim == 2:
+            frame = frame[:, :, None]
+        height, width, channels = frame.shape
+        max_height, max_width, max_channels = self.frame_shape
+        if height > max_height or width > max_width or channels > max_channels:
+            raise ValueError(f"Frame shape {frame.shape} exceeds ring frame shape {self.frame_shape}")
+
+        hand_data = (hand_data or [])[:self.max_hands]
+        index = sequence % self.slots
+        meta = self._meta[index]
+
+        meta['lock'] += 1
+        meta['sequence'] = sequence
+        meta['timestamp'] = timestamp
+        meta['height'], meta['width'], meta['channels'] = height, width, channels
+        meta['num_hands'] = len(hand_data)
+        for i, hand in enumerate(hand_data):
+            meta['handedness'][i] = _HANDEDNESS_CODES.get(hand.handedness, 0)
+            meta['scores'][i] = hand.score
+            meta['track_ids'][i] = hand.track_id
+            meta['fingers'][i] = hand.fingers
+            meta['coordinates'][i] = hand.coordinates
+        size = height * width * channels
+        self._frames[index, :size].reshape(frame.shape)[...] = frame
+        meta['lock'] += 1
+
+        self._header['latest'] = sequence
+
+    def read(self, sequence: Optional[int] = None, copy: bool = True) -> Optional[RingSlot]:
+        """Read a frame from the ring.
+        :param sequence: Sequence number to read (the latest frame if None)
+        :param copy: Copy data out of shared memory; with False the slot holds views
+        :return The slot contents, or None if the frame is not (or no longer) in the ring
+        """
+        if sequence is None:
+            sequence = self.latest
+        if not sequence:
+            return None
+
+        index = sequence % self.slots
+        meta = self._meta[index]
+        while True:
+            lock = int(meta['lock'])
+            if lock & 1:
+                time.sleep(0)  # Writer is mid-update
+                continue
+            if int(meta['sequence']) != sequence:
+                return None
+
+            height, width = int(meta['height']), int(meta['width'])
+            channels, num_hands = int(meta['channels']), int(meta['num_hands'])
+            frame = self._frames[index, :height * width * channels].reshape(height, width, channels)
+            arrays = [
+                frame,
+                meta['handedness'][:num_hands],
+                meta['scores'][:num_hands],
+                meta['track_ids'][:num_hands],
+                meta['fingers'][:num_hands],
+                meta['coordinates'][:num_hands],
+            ]
+            timestamp = float(meta['timestamp'])
+            if copy:
+                arrays = [array.copy() for array in arrays]
+
+            if int(meta['lock']) == lock:
+                return RingSlot(index, lock, sequence, timestamp, *arrays)
+
+    def is_current(self, slot: RingSlot) -> bool:
+        """Whether a zero-copy slot read has not been overwritten since."""
+        return int(self._meta[slot.index]['lock']) == slot.lock
+
+    def recover(self) -> int:
+        """Release slots left half-written by a writer that died mid-update.
+
+        Must only be called while no writer is attached, e.g. before restarting a
+        crashed worker. Released slots are marked empty so readers skip them.
+        :return Number of slots released
+        """
+        released = 0
+        for meta in self._meta:
+            if int(meta['lock']) & 1:
+                meta['sequence'] = 0
+                meta['lock'] += 1
+                released += 1
+        return released
+
+    def close(self) -> None:
+        """Release this process's mapping of the ring."""
+        # Drop array views first, otherwise the mapping cannot be closed
+        self._header = self._meta = self._frames = None
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Destroy the shared memory block (creator only)."""
+        self.shm.unlink()
@@ -1,10 +1,9 @@
 import argparse
-import cv2
+import os
 
-from handful.core.processor import StreamProcessor
-from handful.core.tracker import HandTracker
-from handful.server.app import StreamServer
-from handful.sources.mjpeg import MJPEGStreamClient
+# Only what argument parsing needs is imported up front, so --help and argument
+# errors come back at once; OpenCV, MediaPipe and Flask load when they are used
+from handful.core.pipeline import QueuePolicy
 
 
 def main():
@@ -13,8 +12,42 @@ def main():
     parser.add_argument(
         "--stream_url",
         type=str,
+        nargs="+",
         required=True,
-        help="URL of the MJPEG stream (e.g., 'http://192.168.0.117:8080/stream')."
+        help="URL of the MJPEG stream (e.g., 'http://192.168.0.117:8080/stream'), a local camera "
+             "index or device (e.g. '0' or '/dev/video0'), or a recorded MJPEG capture or video file "
+             "to replay. Pass several URLs to track each camera in its own worker process."
+    )
+    parser.add_argument(
+        "--replay_speed",
+        type=str,
+        default="native",
+        help="Playback rate when --stream_url is a file: 'native', 'max', or frames per second."
+    )
+    parser.add_argument(
+        "--capture_width",
+        type=int,
+        default=None,
+        help="Width requested from a local camera (the driver picks the nearest mode)."
+    )
+    parser.add_argument(
+        "--capture_height",
+        type=int,
+        default=None,
+        help="Height requested from a local camera."
+    )
+    parser.add_argument(
+        "--capture_fps",
+        type=float,
+        default=None,
+        help="Frame rate requested from a local camera."
+    )
+    parser.add_argument(
+        "--capture_format",
+        choices=["MJPG", "YUYV"],
+        default=None,
+        help="Pixel format requested from a local camera: MJPG reaches higher resolutions and frame "
+             "rates over USB 2, YUYV needs no JPEG decoding."
     )
     parser.add_argument(
         "--resize_width",
@@ -28,50 +61,411 @@ def main():
         default=None,
         help="Height to resize the frame for preprocessing (optional)."
     )
+    parser.add_argument(
+        "--jpeg_decoder",
+        choices=["opencv", "turbojpeg", "pillow"],
+        default="opencv",
+        help="JPEG decoder for MJPEG streams and captures. With --resize_width/--resize_height, frames are "
+             "decoded at the smallest of 1/2, 1/4 or 1/8 size that still covers the resize target."
+    )
+    parser.add_argument(
+        "--ingest",
+        choices=["thread", "asyncio"],
+        default="thread",
+        help="How MJPEG streams are read: 'thread' uses a blocking reader thread per stream, 'asyncio' "
+             "reads them on an event loop that reconnects with backoff when a stream fails or stalls."
+    )
     parser.add_argument(
         "--debug_visualization",
         action="store_true",
         default=True,
         help="Enable debug visualization for tracked hands."
     )
+    parser.add_argument(
+        "--output_width",
+        type=int,
+        default=None,
+        help="Width of the re-streamed video (optional). The overlay is drawn at this size."
+    )
+    parser.add_argument(
+        "--output_height",
+        type=int,
+        default=None,
+        help="Height of the re-streamed video (optional)."
+    )
     parser.add_argument(
         "--restream_port",
         type=int,
         default=5000,
         help="Port to use to re-stream the input video with debug visualizations (if enabled)"
     )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        default=False,
+        help="Run preprocessing, tracking, annotation and encoding on separate threads."
+    )
+    parser.add_argument(
+        "--queue_size",
+        type=int,
+        default=2,
+        help="Capacity of each stage queue in pipelined mode. Pipelining only pays off when "
+             "preprocessing, annotation or encoding take a noticeable share of the frame time; "
+             "see benchmarks/bench_pipeline.py."
+    )
+    parser.add_argument(
+        "--queue_policy",
+        type=str,
+        choices=[policy.value for policy in QueuePolicy],
+        default=None,
+        help="What a full stage queue does with a new frame in pipelined mode. By default the "
+             "first queue keeps only the latest frame and the others drop their oldest frame; "
+             "'latest' holds a single frame per queue, so --queue_size has no effect with it."
+    )
+    parser.add_argument(
+        "--latency_budget_ms",
+        type=float,
+        default=None,
+        help="Keep per-frame processing time within this many milliseconds by lowering the "
+             "inference resolution, skipping frames and lowering the JPEG quality when the host "
+             "cannot keep up, and restoring them when it can. With several streams each worker "
+             "adapts its own tracking, and JPEG quality stays fixed."
+    )
+    parser.add_argument(
+        "--motion_gate",
+        action="store_true",
+        help="Skip hand tracking on frames that have not changed since the last tracked one, "
+             "reusing its hands. Cuts CPU use while the scene is static."
+    )
+    parser.add_argument(
+        "--motion_min_rate",
+        type=float,
+        default=2.0,
+        help="With --motion_gate, track at least this many frames per second of a static scene."
+    )
+    parser.add_argument(
+        "--roi_tracking",
+        action="store_true",
+        default=False,
+        help="Track hands on a crop around their previous position instead of the full frame. "
+             "This gives small, distant hands more model resolution; it does not make tracking "
+             "faster (see benchmarks/bench_roi.py)."
+    )
+    parser.add_argument(
+        "--roi_redetect_interval",
+        type=int,
+        default=30,
+        help="Run full-frame detection at least every N frames in ROI tracking mode."
+    )
+    parser.add_argument(
+        "--server_backend",
+        type=str,
+        choices=["flask", "asyncio"],
+        default="flask",
+        help="Serve viewers from Flask threads (one per connection) or a single asyncio event loop, "
+             "which scales to hundreds of concurrent viewers."
+    )
+    parser.add_argument(
+        "--landmark_filter",
+        action="store_true",
+        default=False,
+        help="Smooth landmarks over time with a One-Euro filter and keep hand identities."
+    )
+    parser.add_argument(
+        "--filter_min_cutoff",
+        type=float,
+        default=1.0,
+        help="Landmark filter cutoff frequency (Hz) at rest; lower removes more jitter."
+    )
+    parser.add_argument(
+        "--filter_beta",
+        type=float,
+        default=20.0,
+        help="Landmark filter speed coefficient; higher reduces lag during fast motion."
+    )
+    parser.add_argument(
+        "--predict_ms",
+        type=str,
+        default="0",
+        help="Extrapolate filtered landmarks forward by this many milliseconds, or 'auto' "
+             "to compensate the measured pipeline latency."
+    )
+    parser.add_argument(
+        "--udp_target",
+        type=str,
+        default=None,
+        help="Send hand data to this HOST:PORT as UDP datagrams (fed from the first stream)."
+    )
+    parser.add_argument(
+        "--serial_device",
+        type=str,
+        default=None,
+        help="Send hand data to this serial device, e.g. /dev/ttyUSB0 (fed from the first stream)."
+    )
+    parser.add_argument(
+        "--serial_baudrate",
+        type=int,
+        default=115200,
+        help="Serial line speed."
+    )
+    parser.add_argument(
+        "--sink_rate",
+        type=float,
+        default=50.0,
+        help="Updates per second sent to the UDP and serial outputs."
+    )
+    parser.add_argument(
+        "--sink_deadline_ms",
+        type=float,
+        default=100.0,
+        help="Drop output updates older than this instead of sending stale hand data."
+    )
+    parser.add_argument(
+        "--record_landmarks",
+        type=str,
+        default=None,
+        help="Append every tracked frame's hands to this binary log (fed from the first stream); "
+             "read it back with handful.sinks.recorder.LandmarkLog."
+    )
+    parser.add_argument(
+        "--shm_name",
+        type=str,
+        default=None,
+        help="Publish every tracked frame and its hands (from the first stream) to shared memory "
+             "under this name, for local processes reading with handful.sinks.shm.SharedMemoryReader."
+    )
     args = parser.parse_args()
 
+    sinks = create_sinks(args, parser)
+
+    if len(args.stream_url) > 1:
+        run_multi_stream(args, parser, sinks)
+        return
+
+    import cv2
+
+    from handful.core.processor import StreamProcessor
+    from handful.core.tracker import HandTracker
+    from handful.utils.bufferpool import BufferPool
+
     # Create source and tracker
-    source = MJPEGStreamClient(args.stream_url)
-    tracker = HandTracker()
+    # Frame-sized buffers shared by the source, preprocessing, tracker and overlay
+    buffer_pool = BufferPool()
+    source = create_source(args.stream_url[0], args, parser, buffer_pool)
+    tracker = HandTracker(
+        roi_tracking=args.roi_tracking,
+        roi_redetect_interval=args.roi_redetect_interval,
+        buffer_pool=buffer_pool
+    )
 
     # Define optional preprocessing and postprocessing functions
     preprocessing_fn = None
     if args.resize_width and args.resize_height:
-        preprocessing_fn = lambda frame: cv2.resize(frame, (args.resize_width, args.resize_height))
-
-    postprocessing_fn = None
-    if args.debug_visualization:
-        postprocessing_fn = lambda proc: tracker.create_debug_visualization(
-            proc.frame,
-            proc.hand_data
+        resized_shape = (args.resize_height, args.resize_width, 3)
+        preprocessing_fn = lambda frame: cv2.resize(
+            frame,
+            (args.resize_width, args.resize_height),
+            dst=buffer_pool.lease(resized_shape)
         )
+        tracker.warmup(resized_shape)
+    else:
+        # The stream's frame size is not known yet; this still initializes the models
+        tracker.warmup()
 
-    # Create processor with optional pre/post-processing
+    # Create processor with optional preprocessing; the server draws the overlay
     processor = StreamProcessor(
         frame_source=source,
         tracker=tracker,
         preprocessing_fn=preprocessing_fn,
-        postprocessing_fn=postprocessing_fn
+        pipelined=args.pipelined,
+        queue_size=args.queue_size,
+        queue_policy=QueuePolicy(args.queue_policy) if args.queue_policy else None,
+        landmark_filter=create_landmark_filter(args, parser),
+        buffer_pool=buffer_pool,
+        adaptive=create_adaptive_controller(args),
+        motion_gate=create_motion_gate(args)
     )
 
+    for sink in sinks:
+        sink.attach(processor)
+        sink.start()
+
     # Create and start server
-    server = StreamServer(processor, port=args.restream_port)
+    server = create_server(args.server_backend, processor, args.restream_port, create_overlay(args, buffer_pool))
+    try:
+        server.start()
+    except KeyboardInterrupt:
+        server.stop()
+    finally:
+        for sink in sinks:
+            sink.stop()
+
+
+def create_source(url, args, parser, buffer_pool=None):
+    """Create a live stream client, or a replay source for a file path."""
+    from handful.sources.async_mjpeg import AsyncMJPEGSource
+    from handful.sources.capture import CaptureFrameSource, is_capture_device
+    from handful.sources.file import FileFrameSource
+    from handful.sources.mjpeg import MJPEGStreamClient
+
+    if is_capture_device(url):
+        return CaptureFrameSource(
+            url,
+            width=args.capture_width,
+            height=args.capture_height,
+            fps=args.capture_fps,
+            fourcc=args.capture_format,
+            buffer_pool=buffer_pool
+        )
+    decoder = create_frame_decoder(args, parser, buffer_pool)
+    if not os.path.isfile(url):
+        if args.ingest == "asyncio":
+            return AsyncMJPEGSource(url, decoder=decoder)
+        return MJPEGStreamClient(url, decoder=decoder)
+    speed = args.replay_speed
+    if speed not in ("native", "max"):
+        try:
+            speed = float(speed)
+        except ValueError:
+            parser.error("--replay_speed must be 'native', 'max' or a number")
+    return FileFrameSource(url, speed=speed, loop=True, buffer_pool=buffer_pool, decoder=decoder)
+
+
+def create_frame_decoder(args, parser, buffer_pool=None):
+    """Create the JPEG decoder, decoding at a reduced size when frames are resized anyway."""
+    from handful.sources.decoders import FrameDecoder
+
+    target_size = None
+    if args.resize_width and args.resize_height:
+        target_size = (args.resize_width, args.resize_height)
+    try:
+        return FrameDecoder(args.jpeg_decoder, target_size=target_size, buffer_pool=buffer_pool)
+    except ImportError as e:
+        parser.error(str(e))
+
+
+def create_landmark_filter(args, parser):
+    """Create the landmark filter requested on the command line, if any."""
+    if not args.landmark_filter:
+        return None
+    from handful.core.filtering import LandmarkFilter
+
+    prediction = None
+    if args.predict_ms != "auto":
+        try:
+            prediction = float(args.predict_ms) / 1000
+        except ValueError:
+            parser.error("--predict_ms must be a number of milliseconds or 'auto'")
+    return LandmarkFilter(args.filter_min_cutoff, args.filter_beta, prediction=prediction)
+
+
+def create_adaptive_controller(args):
+    """Create the latency budget controller, or None without --latency_budget_ms."""
+    if args.latency_budget_ms is None:
+        return None
+    from handful.core.adaptive import AdaptiveController
+
+    return AdaptiveController(args.latency_budget_ms / 1000)
+
+
+def create_motion_gate(args):
+    """Create the static scene detector, or None without --motion_gate."""
+    if not args.motion_gate:
+        return None
+    from handful.core.motion import MotionGate
+
+    return MotionGate(min_rate=args.motion_min_rate)
+
+
+def create_sinks(args, parser):
+    """Create the actuator output sinks and the landmark recorder requested on the command line."""
+    from handful.sinks.recorder import LandmarkRecorder
+    from handful.sinks.serial_port import SerialSink
+    from handful.sinks.shm import SharedMemoryPublisher
+    from handful.sinks.udp import UDPSink
+
+    options = {'rate_hz': args.sink_rate, 'deadline': args.sink_deadline_ms / 1000}
+    sinks = []
+    if args.udp_target:
+        host, _, port = args.udp_target.rpartition(":")
+        if not host or not port.isdigit():
+            parser.error("--udp_target must be HOST:PORT")
+        sinks.append(UDPSink(host, int(port), **options))
+    if args.serial_device:
+        try:
+            sinks.append(SerialSink(args.serial_device, args.serial_baudrate, **options))
+        except ValueError as e:
+            parser.error(str(e))
+    if args.record_landmarks:
+        sinks.append(LandmarkRecorder(args.record_landmarks))
+    if args.shm_name:
+        sinks.append(SharedMemoryPublisher(args.shm_name))
+    return sinks
+
+
+def create_overlay(args, buffer_pool=None):
+    """Create the renderer annotating re-streamed video, or None without debug visualization."""
+    if not args.debug_visualization:
+        return None
+    from handful.core.overlay import OverlayRenderer
+
+    output_size = None
+    if args.output_width and args.output_height:
+        output_size = (args.output_width, args.output_height)
+    return OverlayRenderer(output_size=output_size, buffer_pool=buffer_pool)
+
+
+def create_server(backend, processor, port, overlay=None):
+    """Create the HTTP server for the selected backend."""
+    if backend == "asyncio":
+        from handful.server.async_app import AsyncStreamServer
+
+        return AsyncStreamServer(processor, port=port, overlay=overlay)
+    from handful.server.app import StreamServer
+
+    return StreamServer(processor, port=port, overlay=overlay)
+
+
+def run_multi_stream(args, parser, sinks):
+    """Track several cameras in worker processes and serve them all from one server."""
+    from handful.core.multistream import MultiStreamSupervisor
+
+    resize = None
+    if args.resize_width and args.resize_height:
+        resize = (args.resize_width, args.resize_height)
+
+    supervisor = MultiStreamSupervisor(
+        {f"cam{i}": url for i, url in enumerate(args.stream_url)},
+        tracker_kwargs={
+            'roi_tracking': args.roi_tracking,
+            'roi_redetect_interval': args.roi_redetect_interval,
+        },
+        processor_kwargs={
+            'pipelined': args.pipelined,
+            'queue_size': args.queue_size,
+            'queue_policy': QueuePolicy(args.queue_policy) if args.queue_policy else None,
+            'landmark_filter': create_landmark_filter(args, parser),
+            'adaptive': create_adaptive_controller(args),
+            'motion_gate': create_motion_gate(args),
+        },
+        resize=resize,
+        decoder=args.jpeg_decoder,
+        ingest=args.ingest
+    )
+    processors = supervisor.start()
+    for sink in sinks:
+        sink.attach(next(iter(processors.values())))
+        sink.start()
+    # Workers only track; the overlay is drawn here, and only for streams being watched
+    server = create_server(args.server_backend, processors, args.restream_port, create_overlay(args))
     try:
         server.start()
     except KeyboardInterrupt:
         server.stop()
+    finally:
+        for sink in sinks:
+            sink.stop()
+        supervisor.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+import sys
+
+import numpy as np
+import pytest
+
+from handful.sources.base import BaseFrameSource
+from handful.utils.shared_ring import SharedFrameRing
+
+
+class ManualSource(BaseFrameSource):
+    """Frame source driven directly by the test."""
+
+    def __init__(self, frames=()):
+        super().__init__()
+        self.frames = list(frames)
+        self.started = False
+
+    def start(self):
+        self.started = True
+        for frame in self.frames:
+            self._publish_frame(frame)
+
+    def stop(self):
+        self.started = False
+
+    def publish(self, frame):
+        return self._publish_frame(frame)
+
+
+class StubTracker:
+    """Stands in for HandTracker without loading MediaPipe."""
+
+    def __init__(self):
+        self.frames_seen = []
+
+    def process_frame(self, frame, draw_landmarks=True, flip_horizontal=True):
+        self.frames_seen.append(frame)
+        return frame, None
+
+
+def stub_camera_worker(url, ring_name, new_frame, stop_event, sequence_offset, options):
+    """Stands in for the camera worker process: publishes one frame, then waits to be stopped.
+
+    A worker for the URL "crash" exits with an error on its first run instead of waiting.
+    """
+    ring = SharedFrameRing.attach(ring_name)
+    sequence = sequence_offset + 1
+    ring.write(sequence, 0.0, np.full((2, 2, 3), sequence, np.uint8))
+    with new_frame:
+        new_frame.notify_all()
+    ring.close()
+    if url == "crash" and not sequence_offset:
+        sys.exit(3)
+    stop_event.wait()
+
+
+@pytest.fixture
+def manual_source():
+    return ManualSource()
+
+
+@pytest.fixture
+def stub_tracker():
+    return StubTracker()
@@ -0,0 +1,273 @@
+import json
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from handful.core.adaptive import AdaptiveController, QualityLevel
+from handful.core.overlay import OverlayRenderer
+from handful.core.packing import pack_frame, unpack_frame
+from handful.core.processor import StreamProcessor
+from handful.core.types import HandLandmarks, ProcessedFrame
+from handful.server.app import StreamServer
+from handful.server.async_app import AsyncStreamServer
+from handful.server.broadcast import BroadcastHub
+
+
+def make_server(manual_source, stub_tracker, names=("default",)):
+    processors = {name: StreamProcessor(manual_source, stub_tracker) for name in names}
+    return StreamServer(processors if len(names) > 1 else processors[names[0]])
+
+
+def test_server_wires_encoder_into_processor(manual_source, stub_tracker):
+    server = make_server(manual_source, stub_tracker)
+
+    assert server.processor.encode_fn is not None
+
+
+def test_multi_stream_routes(manual_source, stub_tracker):
+    server = make_server(manual_source, stub_tracker, names=("cam0", "cam1"))
+    client = server.app.test_client()
+
+    page = client.get("/").data
+    assert b"/video_feed/cam0" in page and b"/video_feed/cam1" in page
+    assert client.get("/video_feed/missing").status_code == 404
+
+    stats = client.get("/stats").get_json()
+    assert set(stats["streams"]) == {"cam0", "cam1"}
+
+
+def test_broadcast_hub_encodes_once_for_all_viewers():
+    encoded = []
+    hub = BroadcastHub(lambda item: encoded.append(item) or f"jpeg{item}".encode())
+    first, second = hub.subscribe(), hub.subscribe()
+
+    hub.publish(1)
+    assert first.next(timeout=0) == second.next(timeout=0) == b"jpeg1"
+    assert encoded == [1]
+
+    # A slow viewer skips straight to the newest item
+    hub.publish(2)
+    hub.publish(3)
+    assert first.next(timeout=0) == b"jpeg3"
+    assert first.next(timeout=0) is None
+    assert (first.items_received, first.items_skipped) == (2, 1)
+    assert encoded == [1, 3]
+
+    first.close()
+    second.close()
+    assert hub.viewers == 0
+
+
+def test_broadcast_hub_skips_encoding_without_viewers():
+    hub = BroadcastHub(lambda item: b"jpeg", wrap_fn=lambda jpeg: b"[" + jpeg + b"]")
+
+    assert hub.encode_if_watched(1) is None
+    hub.publish(1)
+    with hub.subscribe() as subscription:
+        assert hub.encode_if_watched(2) == b"jpeg"
+        hub.publish(2, encoded=b"pre-encoded")
+        assert subscription.next(timeout=0) == b"[pre-encoded]"
+    assert hub.stats() == {'viewers': 0, 'items_published': 2, 'items_encoded': 1}
+
+
+def test_video_feed_streams_published_frames(manual_source, stub_tracker):
+    server = make_server(manual_source, stub_tracker)
+    server._running = True
+    # Bound the stream so the generator cannot block the test forever
+    timer = threading.Timer(5.0, setattr, args=(server, "_running", False))
+    timer.start()
+    try:
+        server.broadcaster.publish(np.zeros((8, 8, 3), np.uint8))
+        frames = server._generate_frames(server.broadcaster)
+        part = next(frames)
+        assert server.broadcaster.viewers == 1
+        frames.close()
+    finally:
+        timer.cancel()
+
+    assert part.startswith(b"--frame\r\nContent-Type: image/jpeg\r\n\r\n\xff\xd8")
+    assert server.broadcaster.viewers == 0
+
+
+def make_result(sequence=7):
+    coordinates = np.random.default_rng(sequence).random((3, 21, 3), dtype=np.float32)
+    coordinates[1] = coordinates[0] * (640, 480, 640)
+    hand = HandLandmarks(coordinates, np.array([True, False, True, True, False]), "Right", 0.75)
+    return ProcessedFrame(np.zeros((480, 640, 3), np.uint8), [hand], timestamp=12.5, sequence=sequence)
+
+
+def test_pack_frame_round_trip():
+    result = make_result()
+    packet = pack_frame(result)
+    header, (hand,) = unpack_frame(packet)
+    (expected,) = result.hand_data
+
+    assert len(packet) == 36 + 8 + 2 * 21 * 3 * 4
+    assert (header['sequence'], header['timestamp'], header['width'], header['height']) == (7, 12.5, 640, 480)
+    assert (hand.handedness, hand.score, hand.fingers_up) == ("Right", 0.75, expected.fingers_up)
+    np.testing.assert_array_equal(hand.normalized, expected.normalized)
+    np.testing.assert_array_equal(hand.world, expected.world)
+    np.testing.assert_allclose(hand.pixels, expected.pixels, rtol=1e-6)
+    with pytest.raises(ValueError):
+        unpack_frame(packet[:-1])
+
+
+def test_landmarks_are_published_before_video_encoding(manual_source, stub_tracker):
+    server = make_server(manual_source, stub_tracker)
+    hub = server.landmark_hubs["default"]["binary"]
+    packets = []
+    with hub.subscribe() as subscription:
+        server.processor.encode_fn = lambda frame: packets.append(subscription.next(timeout=0)) or b"jpeg"
+        results = server.processor.process_frames()
+        manual_source.publish(np.zeros((8, 8, 3), np.uint8))
+        next(results)
+        results.close()
+
+    (packet,) = packets
+    assert struct.unpack_from("<I", packet)[0] == len(packet) - 4
+    header, hand_data = unpack_frame(packet[4:])
+    assert (header['sequence'], hand_data) == (1, [])
+
+
+def test_landmarks_route_formats(manual_source, stub_tracker):
+    client = make_server(manual_source, stub_tracker).app.test_client()
+
+    assert client.get("/landmarks?format=xml").status_code == 404
+    assert client.get("/landmarks/missing").status_code == 404
+
+
+def test_overlay_is_drawn_only_while_watched(manual_source, stub_tracker):
+    class CountingRenderer(OverlayRenderer):
+        calls = 0
+
+        def render(self, frame, hand_data, dst=None):
+            CountingRenderer.calls += 1
+            return super().render(frame, hand_data, dst)
+
+    server = StreamServer(StreamProcessor(manual_source, stub_tracker), overlay=CountingRenderer())
+    results = server.processor.process_frames()
+    manual_source.publish(np.zeros((8, 8, 3), np.uint8))
+    next(results)
+    assert CountingRenderer.calls == 0
+
+    with server.broadcaster.subscribe():
+        manual_source.publish(np.zeros((8, 8, 3), np.uint8))
+        next(results)
+    results.close()
+    assert CountingRenderer.calls == 1
+
+
+def test_metrics_route_exposes_stage_histograms(manual_source, stub_tracker):
+    server = make_server(manual_source, stub_tracker)
+    results = server.processor.process_frames()
+    manual_source.publish(np.zeros((8, 8, 3), np.uint8))
+    next(results)
+    results.close()
+
+    response = server.app.test_client().get("/metrics")
+    text = response.get_data(as_text=True)
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert 'handful_frames_processed_total{stream="default"} 1' in text
+    assert 'handful_stage_latency_seconds_count{stream="default",stage="track"} 1' in text
+    assert 'handful_end_to_end_latency_seconds_bucket{stream="default",le="+Inf"} 1' in text
+    assert "end_to_end" in server.app.test_client().get("/stats").get_json()["latency_ms"]
+
+
+def test_adaptive_jpeg_quality_and_decisions_are_served(manual_source, stub_tracker):
+    levels = (QualityLevel(1.0, 0, 95), QualityLevel(1.0, 0, 20))
+    adaptive = AdaptiveController(budget=1e-9, levels=levels, settle_frames=1)
+    server = StreamServer(StreamProcessor(manual_source, stub_tracker, adaptive=adaptive))
+    frame = np.random.default_rng(0).integers(0, 255, (64, 64, 3), np.uint8)
+    encode = server.broadcaster.encode_fn
+    full = encode(frame)
+
+    results = server.processor.process_frames()
+    manual_source.publish(frame)
+    next(results)
+    results.close()
+
+    assert len(encode(frame)) < len(full)
+    client = server.app.test_client()
+    stats = client.get("/stats").get_json()
+    assert stats["adaptive"]["jpeg_quality"] == 20
+    assert stats["adaptive"]["decisions"][0]["to_level"] == 1
+    assert 'handful_adaptive_level{stream="default"} 1' in client.get("/metrics").get_data(as_text=True)
+
+
+def http_get(port, path, read_until=None):
+    """Send a GET request and read the response until ``read_until`` or EOF."""
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as conn:
+        conn.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        data = b""
+        while read_until is None or read_until not in data:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+
+def test_async_server_streams_to_many_viewers(manual_source, stub_tracker):
+    server = AsyncStreamServer(StreamProcessor(manual_source, stub_tracker, frame_timeout=0.01), port=0)
+    thread = threading.Thread(target=server.start, daemon=True)
+    thread.start()
+    try:
+        assert server.started.wait(5)
+        stats = json.loads(http_get(server.port, "/stats").split(b"\r\n\r\n", 1)[1])
+        assert stats["is_running"] and stats["viewers"] == 0
+        assert http_get(server.port, "/video_feed/missing").startswith(b"HTTP/1.1 404")
+
+        # Viewers wait on the event loop, not on threads of their own
+        threads_before = threading.active_count()
+        with ThreadPoolExecutor(8) as pool:
+            responses = [pool.submit(http_get, server.port, "/video_feed", b"\xff\xd9\r\n") for _ in range(8)]
+            deadline = time.monotonic() + 5
+            while server.broadcaster.viewers < 8:
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+            assert threading.active_count() <= threads_before + 8
+            manual_source.publish(np.zeros((8, 8, 3), np.uint8))
+            for response in responses:
+                head, part = response.result(timeout=5).split(b"\r\n\r\n", 1)
+                assert b"multipart/x-mixed-replace; boundary=frame" in head
+                assert part.startswith(b"--frame\r\nContent-Type: image/jpeg\r\n\r\n\xff\xd8")
+        # One frame encoded once, shared by all eight viewers
+        assert server.broadcaster.items_encoded == 1
+    finally:
+        server.stop()
+        thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_async_server_streams_landmarks_as_json_events(manual_source, stub_tracker):
+    server = AsyncStreamServer(StreamProcessor(manual_source, stub_tracker, frame_timeout=0.01), port=0)
+    thread = threading.Thread(target=server.start, daemon=True)
+    thread.start()
+    try:
+        assert server.started.wait(5)
+        hub = server.landmark_hubs["default"]["json"]
+        with ThreadPoolExecutor(1) as pool:
+            response = pool.submit(http_get, server.port, "/landmarks?format=json", b"\n\n")
+            deadline = time.monotonic() + 5
+            while hub.viewers < 1:
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+            manual_source.publish(np.zeros((8, 8, 3), np.uint8))
+            head, body = response.result(timeout=5).split(b"\r\n\r\n", 1)
+
+        assert b"Content-Type: text/event-stream" in head
+        assert body.startswith(b"data: ")
+        event = json.loads(body[len(b"data: "):])
+        assert (event['sequence'], event['width'], event['hands']) == (1, 8, [])
+
+        metrics = http_get(server.port, "/metrics")
+        assert b"Content-Type: text/plain; version=0.0.4" in metrics
+        assert b'handful_viewers{stream="default"}' in metrics
+    finally:
+        server.stop()
+        thread.join(5)
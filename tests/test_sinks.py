@@ -0,0 +1,280 @@
+import os
+import socket
+import struct
+import time
+
+import numpy as np
+import pytest
+
+from handful.core.packing import unpack_frame
+from handful.core.processor import StreamProcessor
+from handful.core.types import HandLandmarks, ProcessedFrame
+from handful.sinks.base import OutputSink
+from handful.sinks.recorder import INDEX_SUFFIX, LandmarkLog, LandmarkRecorder
+from handful.sinks.serial_port import SYNC, SerialSink
+from handful.sinks.shm import SharedMemoryPublisher, SharedMemoryReader
+from handful.sinks.udp import UDPSink
+
+
+def make_result(sequence):
+    return ProcessedFrame(np.zeros((4, 4, 3), np.uint8), None, timestamp=0.0, sequence=sequence)
+
+
+class RecordingSink(OutputSink):
+    """Sink that records what it would send."""
+
+    def __init__(self, **kwargs):
+        super().__init__(encode_fn=lambda result: result.sequence, **kwargs)
+        self.sent = []
+
+    def _open(self):
+        pass
+
+    def _send(self, data):
+        self.sent.append((time.monotonic(), data))
+
+    def _close(self):
+        pass
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_sink_coalesces_to_newest_update_at_fixed_rate():
+    sink = RecordingSink(rate_hz=20)
+    sink.start()
+    try:
+        sink.submit(make_result(1))
+        wait_until(lambda: len(sink.sent) == 1)
+        # Several updates within one period: only the newest goes out, on the next tick
+        for sequence in (2, 3, 4):
+            sink.submit(make_result(sequence))
+        wait_until(lambda: len(sink.sent) == 2)
+    finally:
+        sink.stop()
+
+    (first_time, first), (second_time, second) = sink.sent
+    assert (first, second) == (1, 4)
+    assert second_time - first_time == pytest.approx(0.05, abs=0.02)
+    stats = sink.stats()
+    assert (stats['updates_sent'], stats['updates_coalesced']) == (2, 2)
+    assert stats['jitter_ms']['max'] < 20
+
+
+def test_sink_drops_updates_that_miss_their_deadline():
+    sink = RecordingSink(rate_hz=5, deadline=0.05)
+    sink.start()
+    try:
+        sink.submit(make_result(1))
+        wait_until(lambda: len(sink.sent) == 1)
+        # The next tick is 200 ms away, well past the 50 ms deadline
+        sink.submit(make_result(2))
+        wait_until(lambda: sink.updates_stale == 1)
+    finally:
+        sink.stop()
+
+    assert [data for _, data in sink.sent] == [1]
+
+
+def test_udp_sink_sends_packed_frames_to_listener(manual_source, stub_tracker):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.settimeout(5)
+    sink = UDPSink("127.0.0.1", listener.getsockname()[1], rate_hz=100)
+    processor = StreamProcessor(manual_source, stub_tracker, frame_timeout=0.01)
+    sink.attach(processor)
+    sink.start()
+    try:
+        results = processor.process_frames()
+        manual_source.publish(np.zeros((8, 8, 3), np.uint8))
+        next(results)
+        results.close()
+        header, hand_data = unpack_frame(listener.recv(65536))
+    finally:
+        sink.stop()
+        listener.close()
+
+    assert (header['sequence'], header['width'], hand_data) == (1, 8, [])
+
+
+def test_serial_sink_writes_framed_updates_to_pty():
+    master, slave = os.openpty()
+    sink = SerialSink(os.ttyname(slave), baudrate=115200, encode_fn=lambda result: b"seq%d" % result.sequence)
+    sink.start()
+    try:
+        sink.submit(make_result(7))
+        data = b""
+        deadline = time.monotonic() + 5
+        while len(data) < 8 and time.monotonic() < deadline:
+            data += os.read(master, 64)
+    finally:
+        sink.stop()
+        os.close(master)
+        os.close(slave)
+
+    assert data == SYNC + struct.pack("<H", 4) + b"seq7"
+
+
+def test_serial_sink_rejects_unknown_baudrate():
+    with pytest.raises(ValueError):
+        SerialSink("/dev/null", baudrate=12345)
+
+
+def make_tracked_result(sequence, num_hands):
+    rng = np.random.default_rng(sequence)
+    hand_data = []
+    for i in range(num_hands):
+        coordinates = rng.random((3, 21, 3)).astype(np.float32)
+        coordinates[1] = coordinates[0] * (640, 480, 640)
+        fingers = np.array([True, False, True, False, bool(i)])
+        hand_data.append(HandLandmarks(coordinates, fingers, ("Left", "Right")[i % 2], 0.9, track_id=i + 1))
+    return ProcessedFrame(
+        np.zeros((480, 640, 3), np.uint8), hand_data or None, timestamp=0.0, sequence=sequence,
+        capture_time=100.0 + sequence / 60
+    )
+
+
+def test_recorder_round_trips_through_memory_mapped_log(tmp_path):
+    path = tmp_path / "hands.rec"
+    recorder = LandmarkRecorder(path, max_hands=2, index_interval=16, flush_interval=0.01)
+    recorder.start()
+    results = [make_tracked_result(sequence, sequence % 4) for sequence in range(1, 101)]
+    for result in results:
+        recorder.submit(result)
+    recorder.stop()
+
+    log = LandmarkLog(path)
+    assert len(log) == 100 and isinstance(log.records, np.memmap)
+    assert len(log.index) == 7
+    assert log.records['sequence'].tolist() == list(range(1, 101))
+    # Three hands do not fit the two hand slots
+    assert recorder.stats()['hands_truncated'] == 25
+    assert log.records['num_hands'][:4].tolist() == [1, 2, 2, 0]
+
+    hands = log.hand_landmarks(log.records[1])
+    expected = results[1].hand_data
+    assert [(h.handedness, h.track_id, h.fingers_up) for h in hands] == [
+        (h.handedness, h.track_id, h.fingers_up) for h in expected
+    ]
+    np.testing.assert_allclose(hands[1].coordinates, expected[1].coordinates, rtol=1e-5)
+
+    # Time ranges come back as views of the mapped file, found through the index
+    start = log.timestamps[40]
+    window = log.between(start, start + 10.5 / 60)
+    assert window['sequence'].tolist() == list(range(41, 52))
+    assert np.shares_memory(window, log.records)
+    assert log.search(log.timestamps[-1] + 1) == 100
+
+
+def test_recorder_appends_and_recovers_from_truncated_log(tmp_path):
+    path = tmp_path / "hands.rec"
+    recorder = LandmarkRecorder(path, index_interval=4, flush_interval=0.01)
+    recorder.start()
+    for sequence in range(1, 11):
+        recorder.submit(make_tracked_result(sequence, 1))
+    recorder.stop()
+
+    # A crash cuts the last record short and loses the index
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 100)
+    os.remove(str(path) + INDEX_SUFFIX)
+
+    recorder = LandmarkRecorder(path, index_interval=4, flush_interval=0.01)
+    recorder.start()
+    for sequence in range(11, 16):
+        recorder.submit(make_tracked_result(sequence, 1))
+    recorder.stop()
+
+    log = LandmarkLog(path)
+    assert log.records['sequence'].tolist() == list(range(1, 10)) + list(range(11, 16))
+    assert log.index['record'].tolist() == [0, 4, 8, 12]
+    assert log.index['timestamp'].tolist() == log.timestamps[::4].tolist()
+    with pytest.raises(ValueError):
+        LandmarkRecorder(path, max_hands=3).start()
+
+
+def test_recorder_records_every_tracked_frame(tmp_path, manual_source, stub_tracker):
+    processor = StreamProcessor(manual_source, stub_tracker, frame_timeout=0.01)
+    recorder = LandmarkRecorder(tmp_path / "hands.rec", flush_interval=0.01)
+    recorder.attach(processor)
+    recorder.start()
+    results = processor.process_frames()
+    for _ in range(3):
+        manual_source.publish(np.zeros((4, 4, 3), np.uint8))
+        next(results)
+    results.close()
+    recorder.stop()
+
+    log = LandmarkLog(tmp_path / "hands.rec")
+    assert log.records['sequence'].tolist() == [1, 2, 3]
+    assert (log.records['width'] == 4).all() and not log.records['num_hands'].any()
+
+
+def test_shared_memory_reader_sees_published_frames_in_place():
+    name = f"handful_test_{os.getpid()}"
+    publisher = SharedMemoryPublisher(name, slots=3)
+    publisher.start()
+    try:
+        result = make_tracked_result(1, 2)
+        result.frame[:] = 7
+        publisher.submit(result)
+        with SharedMemoryReader(name) as reader:
+            slot = reader.wait_for_frame(0, timeout=1.0)
+            assert slot.sequence == 1 and slot.timestamp == result.capture_time
+            assert slot.frame.shape == (480, 640, 3) and (slot.frame == 7).all()
+            hands = slot.hand_data()
+            assert [hand.handedness for hand in hands] == ["Left", "Right"]
+            np.testing.assert_array_equal(hands[1].coordinates, result.hand_data[1].coordinates)
+            # Zero-copy: the slot is a view that the publisher overwrites after wrapping around
+            assert not slot.frame.flags.owndata
+            for sequence in range(2, 5):
+                publisher.submit(make_tracked_result(sequence, 0))
+            assert not reader.is_current(slot)
+            assert reader.read(1) is None and reader.latest == 4
+            assert reader.wait_for_frame(4, timeout=0.01) is None
+            del slot, hands
+
+        publisher.submit(make_tracked_result(5, 0))
+        larger = make_tracked_result(6, 0)
+        larger.frame = np.zeros((720, 1280, 3), np.uint8)
+        publisher.submit(larger)
+        assert publisher.stats()['frames_published'] == 5 and publisher.stats()['frames_rejected'] == 1
+    finally:
+        publisher.stop()
+    with pytest.raises(FileNotFoundError):
+        SharedMemoryReader(name)
+
+
+def test_shared_memory_reader_in_another_process(manual_source, stub_tracker):
+    import subprocess
+    import sys
+
+    name = f"handful_test_{os.getpid()}"
+    processor = StreamProcessor(manual_source, stub_tracker, frame_timeout=0.01)
+    publisher = SharedMemoryPublisher(name, frame_shape=(4, 4, 3))
+    publisher.attach(processor)
+    publisher.start()
+    script = (
+        "import sys\n"
+        "from handful.sinks.shm import SharedMemoryReader\n"
+        f"reader = SharedMemoryReader({name!r})\n"
+        "print('attached', flush=True)\n"
+        "slot = reader.wait_for_frame(0, timeout=10)\n"
+        "print(slot.sequence, int(slot.frame.sum()), flush=True)\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    reader = subprocess.Popen([sys.executable, "-c", script], cwd=root, stdout=subprocess.PIPE, text=True)
+    try:
+        assert reader.stdout.readline().strip() == "attached"
+        results = processor.process_frames()
+        manual_source.publish(np.ones((4, 4, 3), np.uint8))
+        next(results)
+        results.close()
+        assert reader.stdout.readline().split() == ["1", "48"]
+    finally:
+        reader.wait(timeout=10)
+        publisher.stop()
@@ -0,0 +1,415 @@
+import socketserver
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from handful.sources.async_mjpeg import AsyncMJPEGSource, MJPEGIngest
+from handful.sources.capture import CaptureFrameSource, is_capture_device
+from handful.sources.decoders import DECODERS, FrameDecoder, choose_scale, create_decoder, jpeg_size
+from handful.sources.file import FileFrameSource
+from handful.sources.mjpeg_parser import MJPEGParser
+
+
+JPEGS = [b"\xff\xd8" + bytes([i]) * (1000 + i * 37) + b"\xff\xd9" for i in range(5)]
+
+
+def make_stream(content_length: bool) -> bytes:
+    parts = []
+    for jpeg in JPEGS:
+        headers = b"Content-Type: image/jpeg\r\n"
+        if content_length:
+            headers += b"Content-Length: %d\r\n" % len(jpeg)
+        parts.append(b"--mjpegstream\r\n" + headers + b"\r\n" + jpeg + b"\r\n")
+    # A trailing boundary terminates the last part when there is no Content-Length
+    return b"".join(parts) + b"--mjpegstream\r\n"
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 1 << 20])
+def test_parser_splits_frames_across_chunks(content_length, chunk_size):
+    stream = make_stream(content_length)
+    parser = MJPEGParser(initial_size=256)
+    frames = []
+    for i in range(0, len(stream), chunk_size):
+        parser.feed(stream[i:i + chunk_size])
+        while (frame := parser.next_frame()) is not None:
+            frames.append(bytes(frame))
+
+    assert frames == JPEGS
+    assert parser.frames_parsed == len(JPEGS)
+
+
+def test_parser_returns_views_into_its_buffer():
+    parser = MJPEGParser()
+    parser.feed(make_stream(content_length=True))
+    frame = parser.next_frame()
+
+    assert isinstance(frame, memoryview)
+    assert frame.obj is parser._buffer
+
+
+def test_read_size_hint_matches_missing_body_bytes():
+    jpeg = JPEGS[0]
+    header = b"--mjpegstream\r\nContent-Length: %d\r\n\r\n" % len(jpeg)
+    parser = MJPEGParser()
+    parser.feed(header + jpeg[:100])
+
+    assert parser.next_frame() is None
+    assert parser.read_size_hint() == len(jpeg) - 100
+
+    parser.feed(jpeg[100:])
+    assert bytes(parser.next_frame()) == jpeg
+    assert parser.read_size_hint(4096) == 4096
+
+
+def test_parser_skips_garbage_before_first_boundary():
+    parser = MJPEGParser()
+    parser.feed(b"HTTP garbage\r\n" + make_stream(content_length=True))
+
+    assert bytes(parser.next_frame()) == JPEGS[0]
+
+
+@pytest.mark.parametrize("length", [b"-5", b"99999999999"])
+def test_parser_ignores_invalid_content_length(length):
+    jpeg = JPEGS[0]
+    stream = b"--mjpegstream\r\nContent-Length: " + length + b"\r\n\r\n" + jpeg + b"\r\n--mjpegstream\r\n"
+    parser = MJPEGParser(initial_size=256, max_content_length=1 << 16)
+    parser.feed(stream)
+
+    assert bytes(parser.next_frame()) == jpeg
+    assert parser.capacity < 1 << 16
+
+
+def test_wait_for_frame_times_out_without_new_frame(manual_source):
+    source = manual_source
+    assert source.wait_for_frame(0, timeout=0.01) is None
+
+    source.publish(np.zeros(1))
+    assert source.wait_for_frame(1, timeout=0.01) is None
+
+
+def test_wait_for_frame_returns_only_newer_frames(manual_source):
+    source = manual_source
+    first, second = np.zeros(1), np.ones(1)
+    source.publish(first)
+    source.publish(second)
+
+    sequence, frame = source.wait_for_frame(0, timeout=0)
+    assert sequence == 2
+    assert frame is second
+    assert source.get_frame() is second
+
+
+def test_wait_for_frame_wakes_on_publish(manual_source):
+    source = manual_source
+    timer = threading.Timer(0.05, source.publish, args=(np.zeros(1),))
+    timer.start()
+
+    assert source.wait_for_frame(0, timeout=5)[0] == 1
+    timer.join()
+
+
+
+def write_capture(path, num_frames=5):
+    """Write an MJPEG capture whose frames are filled with their index."""
+    parts = []
+    for i in range(num_frames):
+        jpeg = cv2.imencode(".jpg", np.full((16, 16, 3), i * 40, np.uint8))[1].tobytes()
+        parts.append(
+            b"--mjpegstream\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(jpeg)
+            + jpeg + b"\r\n"
+        )
+    path.write_bytes(b"".join(parts))
+    return path
+
+
+def read_all(source, timeout=5.0):
+    """Take frames from a source until it has finished and nothing new arrives."""
+    frames, last_sequence = [], 0
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        new_frame = source.wait_for_frame(last_sequence, timeout=0.2)
+        if new_frame is None:
+            if source.finished.is_set():
+                break
+            continue
+        last_sequence, frame = new_frame
+        frames.append(frame)
+    return frames
+
+
+@pytest.mark.parametrize("suffix", [".mjpeg", ".avi"])
+def test_file_source_replays_every_frame_losslessly(tmp_path, suffix):
+    if suffix == ".mjpeg":
+        path = write_capture(tmp_path / "capture.mjpeg")
+    else:
+        path = tmp_path / "clip.avi"
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30, (16, 16))
+        if not writer.isOpened():
+            pytest.skip("OpenCV cannot write MJPG video here")
+        for i in range(5):
+            writer.write(np.full((16, 16, 3), i * 40, np.uint8))
+        writer.release()
+
+    source = FileFrameSource(path, speed="max", lossless=True)
+    source.start()
+    try:
+        frames = read_all(source)
+    finally:
+        source.stop()
+
+    assert [int(round(frame.mean() / 40)) for frame in frames] == [0, 1, 2, 3, 4]
+
+
+def test_file_source_plays_at_fixed_speed_and_loops(tmp_path):
+    source = FileFrameSource(write_capture(tmp_path / "capture.mjpeg"), speed=50, loop=True)
+    source.start()
+    try:
+        assert source.wait_for_frame(0, timeout=5) is not None
+        start = time.monotonic()
+        assert source.wait_for_frame(11, timeout=5) is not None
+        elapsed = time.monotonic() - start
+    finally:
+        source.stop()
+
+    # Eleven 20 ms intervals, wrapping around the five-frame capture twice
+    assert elapsed == pytest.approx(0.22, abs=0.08)
+    assert source.frames_read >= 12
+
+
+def test_file_source_rejects_unknown_speed(tmp_path):
+    with pytest.raises(ValueError):
+        FileFrameSource(write_capture(tmp_path / "capture.mjpeg"), speed="fast")
+
+
+def available_decoders():
+    decoders = []
+    for name in DECODERS:
+        try:
+            decoders.append(create_decoder(name))
+        except ImportError:
+            pass
+    return decoders
+
+
+@pytest.mark.parametrize("decoder", available_decoders(), ids=lambda decoder: decoder.name)
+def test_decoders_agree_on_reduced_and_grayscale_output(decoder):
+    frame = cv2.resize(np.random.default_rng(0).integers(0, 255, (3, 4, 3), np.uint8), (101, 67))
+    data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()
+    assert jpeg_size(data) == (101, 67)
+
+    for scale, shape in ((1, (67, 101)), (2, (34, 51)), (4, (17, 26)), (8, (9, 13))):
+        color = decoder.decode(data, scale)
+        assert color.shape == shape + (3,)
+        gray = decoder.decode(data, scale, grayscale=True)
+        assert gray.shape == shape
+        # The luma channel is what a color decode converts to gray, give or take rounding
+        assert np.abs(cv2.cvtColor(color, cv2.COLOR_BGR2GRAY).astype(int) - gray).max() <= 2
+        expected = cv2.resize(frame, shape[::-1], interpolation=cv2.INTER_AREA)
+        assert np.abs(color.astype(int) - expected).mean() < 12
+
+    if decoder.writes_dst:
+        dst = np.empty((17, 26, 3), np.uint8)
+        assert decoder.decode(data, 4, dst=dst) is dst
+    assert decoder.decode(b"\xff\xd8not a jpeg") is None
+    with pytest.raises(ValueError):
+        decoder.decode(data, 3)
+
+
+def test_frame_decoder_picks_smallest_scale_covering_target():
+    assert choose_scale((1920, 1080), (640, 360)) == 2
+    assert choose_scale((1920, 1080), (480, 270)) == 4
+    assert choose_scale((1920, 1080), (1280, 720)) == 1
+    assert choose_scale((1280, 720), (160, 90)) == 8
+
+    data = cv2.imencode(".jpg", np.full((720, 1280, 3), 128, np.uint8))[1].tobytes()
+    decoder = FrameDecoder(target_size=(300, 200))
+    # A quarter would be 320x180, too short for the target
+    assert decoder.decode(data).shape == (360, 640, 3) and decoder.scale == 2
+    assert FrameDecoder().decode(data).shape == (720, 1280, 3)
+
+
+def test_file_source_decodes_captures_at_reduced_size(tmp_path):
+    decoder = FrameDecoder(target_size=(8, 8))
+    source = FileFrameSource(write_capture(tmp_path / "capture.mjpeg"), speed="max", lossless=True, decoder=decoder)
+    source.start()
+    try:
+        frames = read_all(source)
+    finally:
+        source.stop()
+
+    assert [frame.shape for frame in frames] == [(8, 8, 3)] * 5
+    assert [int(round(frame.mean() / 40)) for frame in frames] == [0, 1, 2, 3, 4]
+
+
+def write_video(path, num_frames=60, fps=100):
+    """Write an MJPG video whose frames are filled with their index times four."""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (32, 24))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPG video here")
+    for i in range(num_frames):
+        writer.write(np.full((24, 32, 3), i * 4, np.uint8))
+    writer.release()
+    return path
+
+
+def test_capture_source_hands_out_newest_frame_and_retrieves_lazily(tmp_path):
+    source = CaptureFrameSource(str(write_video(tmp_path / "clip.avi")))
+    source.start()
+    try:
+        assert source.frame_size == (32, 24) and source.capture_fps == 100
+        sequence, frame = source.wait_for_frame(0, timeout=2.0)
+        first_index = int(round(frame.mean() / 4))
+        # A slow consumer: frames grabbed meanwhile are not decoded, and the next
+        # frame it gets is the newest one rather than the one after its last
+        time.sleep(0.1)
+        grabbed = source.frames_grabbed
+        sequence, frame = source.wait_for_frame(sequence, timeout=2.0)
+        assert int(round(frame.mean() / 4)) >= first_index + 8
+        assert source.frames_retrieved == 2
+        assert source.frames_skipped >= grabbed - 1 >= 8
+    finally:
+        source.stop()
+
+
+def test_capture_source_can_retrieve_every_frame_and_loop(tmp_path):
+    source = CaptureFrameSource(str(write_video(tmp_path / "clip.avi", num_frames=5)), lazy=False, loop=True)
+    source.start()
+    try:
+        deadline = time.monotonic() + 5.0
+        while source.frames_retrieved < 12 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        source.stop()
+    # Twelve frames out of a five-frame file: it looped
+    assert source.frames_retrieved >= 12 and source.frames_skipped == 0
+
+
+def test_capture_source_rejects_unknown_device_and_format(tmp_path):
+    assert is_capture_device("0") and is_capture_device("/dev/video2")
+    assert not is_capture_device("http://camera/stream") and not is_capture_device("capture.mjpeg")
+    with pytest.raises(ValueError):
+        CaptureFrameSource(0, fourcc="H264")
+    with pytest.raises(IOError):
+        CaptureFrameSource(str(tmp_path / "missing.avi")).start()
+
+
+class StandInMJPEGServer(socketserver.ThreadingTCPServer):
+    """Local MJPEG server that answers successive requests according to a script.
+
+    Script entries: ("error", None) answers 503 and keeps the connection,
+    ("stream", n) streams n frames then closes it (None streams until the
+    client leaves), ("stall", None) sends one frame and then nothing.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, script):
+        super().__init__(("127.0.0.1", 0), StandInMJPEGHandler)
+        self.script = list(script)
+        self.connections = 0
+        self.jpeg = cv2.imencode(".jpg", np.full((24, 32, 3), 128, np.uint8))[1].tobytes()
+        self.closed = threading.Event()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/stream"
+
+    def close(self):
+        self.closed.set()
+        self.shutdown()
+        self.server_close()
+
+
+class StandInMJPEGHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        while self.rfile.readline().startswith(b"GET"):
+            while self.rfile.readline() not in (b"\r\n", b""):
+                pass
+            action, count = server.script.pop(0) if len(server.script) > 1 else server.script[0]
+            if action == "error":
+                self.wfile.write(b"HTTP/1.1 503 Unavailable\r\nContent-Length: 4\r\n\r\nbusy")
+                continue
+            self.wfile.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary=frame\r\n\r\n"
+            )
+            sent = 0
+            try:
+                while count is None or sent < count:
+                    self.wfile.write(
+                        b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(server.jpeg)
+                        + server.jpeg + b"\r\n"
+                    )
+                    sent += 1
+                    if action == "stall" or server.closed.wait(0.005):
+                        server.closed.wait(10.0)
+                        return
+            except OSError:
+                pass
+            return
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_async_ingest_reads_many_streams_on_one_loop():
+    server = StandInMJPEGServer([("stream", None)])
+    ingest = MJPEGIngest(decode_workers=2)
+    sources = [ingest.source(server.url) for _ in range(4)]
+    try:
+        for source in sources:
+            source.start()
+        for source in sources:
+            sequence, frame = source.wait_for_frame(0, timeout=5.0)
+            assert frame.shape == (24, 32, 3)
+        # One event loop thread and the decode pool, whatever the number of streams
+        ingest_threads = [thread.name for thread in threading.enumerate() if thread.name.startswith("mjpeg-")]
+        assert ingest_threads.count("mjpeg-ingest") == 1 and len(ingest_threads) <= 3
+        assert all(stats['connected'] and stats['connects'] == 1 for stats in ingest.stats())
+    finally:
+        for source in sources:
+            source.stop()
+        server.close()
+    # The last stream stopped the loop
+    assert not ingest.running
+
+
+def test_async_source_retries_errors_and_reconnects_after_drops():
+    server = StandInMJPEGServer([("error", None), ("stream", 3), ("stream", None)])
+    source = AsyncMJPEGSource(server.url, ingest=MJPEGIngest(backoff_initial=0.01))
+    try:
+        source.start()
+        assert wait_until(lambda: source.frames_decoded > 5)
+    finally:
+        source.stop()
+        server.close()
+    assert source.http_errors == 1 and source.retries == 2
+    # The 503 left the connection open, so only the dropped stream needed a new one
+    assert source.connects == server.connections == 2
+
+
+def test_async_source_times_out_stalled_stream():
+    server = StandInMJPEGServer([("stall", None), ("stream", None)])
+    source = AsyncMJPEGSource(server.url, ingest=MJPEGIngest(read_timeout=0.2, backoff_initial=0.01))
+    try:
+        source.start()
+        sequence, _ = source.wait_for_frame(0, timeout=5.0)
+        assert source.wait_for_frame(sequence, timeout=5.0) is not None
+    finally:
+        source.stop()
+        server.close()
+    assert source.timeouts == 1 and source.connects == 2
+    with pytest.raises(ValueError):
+        AsyncMJPEGSource("rtsp://camera/stream")
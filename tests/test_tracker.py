@@ -0,0 +1,785 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from handful.core.adaptive import AdaptiveController, QualityLevel
+from handful.core.batch import BatchRunner, load_results
+from handful.core.filtering import LandmarkFilter
+from handful.core.kinematics import compute_kinematics
+from handful.core.metrics import Histogram, MetricsExposition
+from handful.core.motion import MotionGate
+from handful.core.overlay import OverlayRenderer
+from handful.core.multistream import MultiStreamSupervisor, SharedStreamProcessor, _fit_frame
+from handful.core.pipeline import QueueClosed, QueuePolicy, StageQueue
+from handful.core.processor import StreamProcessor
+from handful.core.tracker import HandTracker, compute_fingers_up
+from handful.core.types import HandLandmarks
+from handful.utils.bufferpool import BufferPool
+from handful.utils.shared_ring import SharedFrameRing
+
+from tests.conftest import stub_camera_worker
+
+MEDIA = Path(__file__).resolve().parent.parent / "media"
+
+
+def test_processor_tracks_only_new_frames_and_counts_drops(manual_source, stub_tracker):
+    frames = [np.full((4, 4, 3), i, np.uint8) for i in range(3)]
+    processor = StreamProcessor(manual_source, stub_tracker, frame_timeout=0.01)
+    results = processor.process_frames()
+
+    manual_source.publish(frames[0])
+    first = next(results)
+    # Two frames arrive before the processor asks again; only the newest is tracked
+    manual_source.publish(frames[1])
+    manual_source.publish(frames[2])
+    second = next(results)
+    results.close()
+
+    assert [r.sequence for r in (first, second)] == [1, 3]
+    assert len(stub_tracker.frames_seen) == 2
+    assert processor.stats() == {'frames_processed': 2, 'frames_dropped': 1}
+
+
+def test_processor_records_capture_time_and_stage_timings(manual_source, stub_tracker):
+    processor = StreamProcessor(
+        manual_source, stub_tracker, frame_timeout=0.01, encode_fn=lambda frame: b"jpeg"
+    )
+    results = processor.process_frames()
+    captured = time.monotonic() - 0.05
+    manual_source._publish_frame(np.zeros((4, 4, 3), np.uint8), captured, {'decode': 0.01})
+    result = next(results)
+    results.close()
+
+    assert result.capture_time == captured
+    assert {'decode', 'wait', 'track', 'encode'} <= set(result.timings)
+    assert result.timings['wait'] == pytest.approx(0.04, abs=0.02)
+    histograms = processor.latency.histograms
+    assert histograms['end_to_end'].snapshot()[2] == 1
+    assert histograms['end_to_end'].quantile(0.5) >= 0.05
+
+
+ADAPTIVE_LEVELS = (QualityLevel(1.0, 0, 90), QualityLevel(0.5, 0, 70), QualityLevel(0.5, 1, 50))
+
+
+def test_adaptive_controller_steps_with_hysteresis():
+    controller = AdaptiveController(
+        budget=0.05, levels=ADAPTIVE_LEVELS, settle_frames=3, recover_frames=5, max_recover_frames=20
+    )
+
+    def run(seconds, frames):
+        return [d for d in (controller.update(seconds) for _ in range(frames)) if d is not None]
+
+    # Over budget: one step down per settling period, never past the last level
+    assert [d['to_level'] for d in run(0.08, 9)] == [1, 2]
+    assert controller.level == ADAPTIVE_LEVELS[2]
+    # Between the thresholds nothing changes
+    assert run(0.04, 30) == []
+    # Well under budget: one step up after the recovery hold
+    decisions = run(0.01, 5)
+    assert [(d['to_level'], d['reason']) for d in decisions] == [(1, "under budget")]
+    # The upgrade could not hold the budget: back down, and a longer hold next time
+    assert [d['to_level'] for d in run(0.08, 3)] == [2]
+    assert controller.stats()['recover_frames'] == 10
+    assert run(0.01, 9) == []
+    assert len(run(0.01, 1)) == 1
+
+    stats = controller.stats()
+    assert (stats['level'], stats['inference_scale'], stats['budget_ms']) == (1, 0.5, 50.0)
+    assert [d['to_level'] for d in stats['decisions']] == [1, 2, 1, 2, 1]
+
+
+def test_processor_applies_adaptive_level(manual_source, stub_tracker):
+    controller = AdaptiveController(budget=1e-9, levels=ADAPTIVE_LEVELS[::2], settle_frames=2)
+    processor = StreamProcessor(manual_source, stub_tracker, frame_timeout=0.01, adaptive=controller)
+    results = processor.process_frames()
+    for i in range(2):
+        manual_source.publish(np.full((4, 4, 3), i, np.uint8))
+        next(results)
+    assert stub_tracker.inference_scale == 1.0
+
+    # Over budget after two frames: from now on every other frame is skipped
+    manual_source.publish(np.zeros((4, 4, 3), np.uint8))
+    assert next(results).sequence == 3
+    manual_source.publish(np.zeros((4, 4, 3), np.uint8))
+    later = threading.Timer(0.05, manual_source.publish, (np.zeros((4, 4, 3), np.uint8),))
+    later.start()
+    result = next(results)
+    later.join()
+    results.close()
+
+    assert result.sequence == 5
+    assert stub_tracker.inference_scale == 0.5
+    stats = processor.stats()
+    assert (stats['frames_skipped'], stats['frames_dropped']) == (1, 0)
+    assert stats['adaptive']['level'] == 1
+    assert stats['adaptive']['decisions'][0]['reason'] == "over budget"
+
+
+def scene(shape=(240, 320, 3), hand_offset=0):
+    """Textured static background with a small bright square standing in for a finger."""
+    frame = cv2.resize(np.random.default_rng(0).integers(0, 255, (12, 16, 3), np.uint8), shape[1::-1])
+    frame[100:106, 150 + hand_offset:156 + hand_offset] = 255
+    return frame
+
+
+def test_motion_gate_reuses_static_frames_and_forces_minimum_rate():
+    gate = MotionGate(min_rate=2.0)
+    noise = np.random.default_rng(1)
+    assert gate.should_track(scene(), 0.0)
+    gate.tracked(scene(), None, 0.0)
+
+    # Sensor noise alone does not count as change
+    for t in (0.1, 0.2, 0.3):
+        noisy = np.clip(scene() + noise.integers(-6, 7, (240, 320, 3)), 0, 255).astype(np.uint8)
+        assert not gate.should_track(noisy, t)
+    # The minimum rate forces a tracking half a second after the last one
+    assert gate.should_track(scene(), 0.5)
+    gate.tracked(scene(), None, 0.5)
+
+    moved = scene()
+    moved[:120] = 0
+    assert gate.should_track(moved, 0.6)
+    assert gate.stats() == {
+        'frames_tracked': 3, 'frames_reused': 3, 'frames_forced': 1, 'last_change': gate.last_change
+    }
+
+
+def test_motion_gate_roi_check_sees_small_moves_of_a_tracked_hand():
+    coordinates = np.zeros((3, 21, 3), np.float32)
+    coordinates[1, :, 0] = np.linspace(140, 170, 21)
+    coordinates[1, :, 1] = np.linspace(90, 115, 21)
+    hands = [HandLandmarks(coordinates, np.zeros(5, bool))]
+
+    for roi_check, tracked in ((False, False), (True, True)):
+        gate = MotionGate(roi_check=roi_check)
+        gate.should_track(scene(), 0.0)
+        gate.tracked(scene(), hands, 0.0)
+        assert gate.should_track(scene(hand_offset=4), 0.1) == tracked
+
+
+def test_processor_with_motion_gate_reuses_hands_of_static_frames(manual_source):
+    hands = [HandLandmarks(np.zeros((3, 21, 3), np.float32), np.zeros(5, bool))]
+
+    class CountingTracker:
+        def __init__(self):
+            self.frames = []
+
+        def process_frame(self, frame, draw_landmarks=False, flip_horizontal=True):
+            assert not flip_horizontal
+            self.frames.append(frame.copy())
+            return frame, hands
+
+    tracker = CountingTracker()
+    processor = StreamProcessor(
+        manual_source, tracker, frame_timeout=0.01, motion_gate=MotionGate(min_rate=0)
+    )
+    results = processor.process_frames()
+    outputs = []
+    for frame in (scene(), scene(), scene(), np.zeros((240, 320, 3), np.uint8)):
+        manual_source.publish(frame)
+        outputs.append(next(results))
+    results.close()
+
+    assert len(tracker.frames) == 2
+    # The gate sees the flipped frame the tracker would have flipped itself
+    np.testing.assert_array_equal(tracker.frames[0], scene()[:, ::-1])
+    assert all(result.hand_data is hands for result in outputs)
+    np.testing.assert_array_equal(outputs[1].frame, scene()[:, ::-1])
+    assert processor.stats()['motion']['frames_reused'] == 2
+
+
+def test_tracker_runs_model_at_inference_scale():
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    # FakeHands reports these points in the half-size image the model is given
+    points = [(300 + i * 3, 150 + i * 2) for i in range(21)]
+    tracker = HandTracker(inference_scale=0.5, buffer_pool=BufferPool())
+    tracker.hands = FakeHands((360, 640, 3), points)
+
+    _, hand_data = tracker.process_frame(frame, flip_horizontal=False)
+
+    assert tracker.hands.input_shapes == [(360, 640, 3)]
+    np.testing.assert_allclose(hand_data[0].pixels[:, :2], np.array(points) * 2 + 1, atol=1e-3)
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    cumulative, total, count = histogram.snapshot()
+    assert cumulative == [1, 3, 4, 5]
+    assert (total, count) == (pytest.approx(5.605), 5)
+    # The median falls halfway into the (0.01, 0.1] bucket
+    assert histogram.quantile(0.5) == pytest.approx(0.0775)
+    assert Histogram().quantile(0.5) is None
+
+
+def test_metrics_exposition_groups_samples_per_metric():
+    exposition = MetricsExposition()
+    histogram = Histogram(buckets=(0.1,))
+    histogram.observe(0.05)
+    exposition.add('frames_total', 'counter', 'Frames.', 1, {'stream': 'a'})
+    exposition.add_histogram('latency_seconds', 'Latency.', histogram, {'stream': 'a'})
+    exposition.add('frames_total', 'counter', 'Frames.', 2, {'stream': 'b"'})
+
+    assert exposition.render().splitlines() == [
+        '# HELP handful_frames_total Frames.',
+        '# TYPE handful_frames_total counter',
+        'handful_frames_total{stream="a"} 1',
+        'handful_frames_total{stream="b\\""} 2',
+        '# HELP handful_latency_seconds Latency.',
+        '# TYPE handful_latency_seconds histogram',
+        'handful_latency_seconds_bucket{stream="a",le="0.1"} 1',
+        'handful_latency_seconds_bucket{stream="a",le="+Inf"} 1',
+        'handful_latency_seconds_sum{stream="a"} 0.05',
+        'handful_latency_seconds_count{stream="a"} 1',
+    ]
+
+
+@pytest.mark.parametrize("policy", list(QueuePolicy))
+def test_pipelined_processor_yields_frames_in_order(manual_source, stub_tracker, policy):
+    processor = StreamProcessor(
+        manual_source,
+        stub_tracker,
+        preprocessing_fn=lambda frame: frame + 1,
+        encode_fn=lambda frame: frame.tobytes(),
+        frame_timeout=0.01,
+        pipelined=True,
+        queue_policy=policy
+    )
+    results = processor.process_frames()
+    sequences = []
+    for i in range(20):
+        manual_source.publish(np.full((2, 2), i, np.uint8))
+        if i % 5 == 4:
+            result = next(results)
+            sequences.append(result.sequence)
+            assert result.encoded == result.frame.tobytes()
+            assert result.frame[0, 0] == result.sequence
+    results.close()
+
+    assert sequences == sorted(sequences)
+    stats = processor.stats()
+    assert stats['frames_processed'] == len(sequences)
+    assert set(stats['queues']) == {'preprocess', 'track', 'annotate', 'encode', 'output'}
+
+
+def test_stage_queue_policies():
+    latest = StageQueue(3, QueuePolicy.LATEST)
+    oldest = StageQueue(3, QueuePolicy.DROP_OLDEST)
+    for i in range(5):
+        latest.put(i)
+        oldest.put(i)
+
+    assert (latest.get(0), latest.dropped) == (4, 4)
+    assert [oldest.get(0) for _ in range(3)] == [2, 3, 4]
+    assert oldest.dropped == 2
+
+    blocking = StageQueue(1, QueuePolicy.BLOCK)
+    blocking.put(0)
+    threading.Timer(0.05, blocking.close).start()
+    assert blocking.put(1) is False
+    assert blocking.get(0) == 0
+    with pytest.raises(QueueClosed):
+        blocking.get(0)
+
+
+class FakeHands:
+    """Reports one hand at fixed full-frame pixel positions, whatever region it is given."""
+
+    def __init__(self, frame_shape, points, score=0.95):
+        self.frame_shape = frame_shape
+        self.points = points
+        self.score = score
+        self.input_shapes = []
+        self.offset = (0, 0)
+
+    def process(self, image):
+        from mediapipe.framework.formats import classification_pb2, landmark_pb2
+
+        self.input_shapes.append(image.shape)
+        height, width = image.shape[:2]
+        x0, y0 = self.offset if image.shape != self.frame_shape else (0, 0)
+        landmarks = landmark_pb2.NormalizedLandmarkList()
+        for x, y in self.points:
+            landmarks.landmark.add(x=(x + 0.5 - x0) / width, y=(y + 0.5 - y0) / height, z=0.0)
+        handedness = classification_pb2.ClassificationList()
+        handedness.classification.add(score=self.score, label="Right")
+        return SimpleNamespace(multi_hand_landmarks=[landmarks], multi_handedness=[handedness])
+
+
+def test_roi_tracking_crops_and_maps_landmarks_back():
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    points = [(600 + i * 3, 300 + i * 2) for i in range(21)]
+    tracker = HandTracker(roi_tracking=True, roi_redetect_interval=3)
+    tracker.hands = tracker.roi_hands = FakeHands(frame.shape, points)
+
+    outputs = []
+    for _ in range(5):
+        tracker.hands.offset = tracker._roi[:2] if tracker._roi else (0, 0)
+        _, hand_data = tracker.process_frame(frame, draw_landmarks=False, flip_horizontal=False)
+        outputs.append(hand_data[0].landmark_points)
+
+    assert all(output == points for output in outputs)
+    # Full frame, three ROI frames, then the periodic full-frame re-detection
+    assert [shape[:2] == (720, 1280) for shape in tracker.hands.input_shapes] == [
+        True, False, False, False, True
+    ]
+    assert (tracker.full_frame_detections, tracker.roi_detections) == (2, 3)
+
+
+def test_roi_tracking_falls_back_to_full_frame_on_low_confidence():
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    tracker = HandTracker(roi_tracking=True)
+    tracker.hands = tracker.roi_hands = FakeHands(frame.shape, [(600, 300)] * 20 + [(700, 400)])
+    tracker.process_frame(frame, draw_landmarks=False, flip_horizontal=False)
+
+    tracker.hands.score = 0.5
+    tracker.process_frame(frame, draw_landmarks=False, flip_horizontal=False)
+
+    assert len(tracker.hands.input_shapes) == 3
+    assert tracker.hands.input_shapes[-1][:2] == (720, 1280)
+    assert tracker.roi_detections == 0
+
+
+def test_roi_tracking_runs_crops_on_separate_model():
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    points = [(600 + i * 3, 300 + i * 2) for i in range(21)]
+    tracker = HandTracker(roi_tracking=True)
+    tracker.hands, tracker.roi_hands = FakeHands(frame.shape, points), FakeHands(frame.shape, points)
+
+    tracker.process_frame(frame, draw_landmarks=False, flip_horizontal=False)
+    tracker.roi_hands.offset = tracker._roi[:2]
+    _, hand_data = tracker.process_frame(frame, draw_landmarks=False, flip_horizontal=False)
+
+    assert [shape[:2] for shape in tracker.hands.input_shapes] == [(720, 1280)]
+    assert len(tracker.roi_hands.input_shapes) == 1
+    assert hand_data[0].landmark_points == points
+
+
+def test_roi_tracking_matches_full_frame_on_real_model():
+    frame = cv2.imread(str(MEDIA / "tracked.png"))
+    if frame is None:
+        pytest.skip("media/tracked.png is not available (git lfs pull)")
+    frame = cv2.resize(frame, (1280, 720))
+
+    full = HandTracker(static_image_mode=True)
+    _, expected = full.process_frame(frame, draw_landmarks=False)
+    if not expected:
+        pytest.skip("no hand detected in media/tracked.png")
+
+    tracker = HandTracker(roi_tracking=True)
+    for _ in range(3):
+        _, hand_data = tracker.process_frame(frame, draw_landmarks=False)
+
+    assert tracker.roi_detections == 2
+    assert len(hand_data) == len(expected)
+    # Hands may come back in a different order; compare each with its nearest match
+    for hand in hand_data:
+        error = min(np.abs(hand.pixels[:, :2] - other.pixels[:, :2]).max() for other in expected)
+        size = np.ptp(hand.pixels[:, :2], axis=0).max()
+        assert error < 0.1 * size
+
+
+def test_tracker_neither_copies_nor_draws_by_default():
+    frame = np.zeros((120, 160, 3), np.uint8)
+    tracker = HandTracker()
+    tracker.hands = FakeHands(frame.shape, [(40 + i * 3, 30 + i * 2) for i in range(21)])
+
+    output, hand_data = tracker.process_frame(frame, flip_horizontal=False)
+    assert output is frame and not frame.any()
+    assert hand_data is not None
+
+    output, _ = tracker.process_frame(frame, draw_landmarks=True, flip_horizontal=False)
+    assert output is not frame and output.any() and not frame.any()
+
+
+def test_buffer_pool_reuses_only_unreferenced_or_released_buffers():
+    pool = BufferPool(max_buffers=2)
+    first = pool.lease((4, 4, 3))
+    view = first[1:]
+    second = pool.lease((4, 4, 3))
+    assert second is not first
+
+    # A view still references the first buffer, so it is not handed out again
+    del first
+    third = pool.lease((4, 4, 3))
+    assert third is not view.base and third is not second
+
+    pool.release(second)
+    assert pool.lease((4, 4, 3)) is second
+    del view
+    assert pool.lease((4, 4, 3)).shape == (4, 4, 3)
+    assert pool.lease((2, 2), np.float32).dtype == np.float32
+
+    stats = pool.stats()
+    assert (stats['leases'], stats['hits'], stats['allocations']) == (6, 2, 4)
+    assert stats['buffers'] == 3
+
+
+def test_tracker_writes_into_pooled_buffers():
+    frame = np.zeros((120, 160, 3), np.uint8)
+    pool = BufferPool()
+    tracker = HandTracker(buffer_pool=pool)
+    tracker.hands = FakeHands(frame.shape, [(40 + i * 3, 30 + i * 2) for i in range(21)])
+
+    for _ in range(10):
+        output, _ = tracker.process_frame(frame)
+        del output
+
+    stats = pool.stats()
+    # One flipped frame and one RGB model input, reused for every later frame
+    assert stats['allocations'] == 2
+    assert stats['hits'] == 18
+
+
+def test_overlay_draws_in_place_or_at_output_size():
+    hand = make_hand((0.5, 0.5))
+    frame = np.zeros((480, 640, 3), np.uint8)
+    renderer = OverlayRenderer(show_finger_count=False)
+
+    assert renderer.render(frame, None) is frame and not frame.any()
+    assert renderer.render(frame, [hand]) is frame
+    x, y = np.rint(hand.pixels[0, :2]).astype(int)
+    assert frame[y, x].any()
+
+    small = np.zeros((240, 320, 3), np.uint8)
+    scaled = OverlayRenderer(show_finger_count=False, output_size=(320, 240))
+    assert scaled.render(np.zeros((480, 640, 3), np.uint8), [hand], dst=small) is small
+    assert small[y // 2, x // 2].any()
+
+
+def test_compute_fingers_up_matches_per_finger_rules():
+    pixels = np.zeros((2, 21, 3), np.float32)
+    # First hand: everything up (tips above/left of their reference joints)
+    pixels[0, [4, 8, 12, 16, 20], :2] = 0
+    pixels[0, [5, 6, 10, 14, 18], :2] = 10
+    # Second hand: only the index finger up; the pinky tip is level with its joint
+    pixels[1, :, :2] = 10
+    pixels[1, 4, 0] = 20
+    pixels[1, 8, 1] = 0
+    pixels[1, [12, 16], 1] = 20
+
+    assert compute_fingers_up(pixels).tolist() == [
+        [True, True, True, True, True],
+        [False, True, False, False, False],
+    ]
+
+
+def test_hand_landmarks_views_share_one_array():
+    coordinates = np.arange(3 * 21 * 3, dtype=np.float32).reshape(3, 21, 3)
+    hand = HandLandmarks(coordinates, np.array([True, True, False, False, False]))
+
+    assert np.shares_memory(hand.pixels, coordinates)
+    assert hand.landmark_points[0] == (63, 64)
+    assert (hand.fingers_up, hand.num_fingers_up) == ([True, True, False, False, False], 2)
+
+
+# Knuckles of a right hand seen palm-on in image axes: fingers point towards -y,
+# the index is on the +x side and the palm faces the camera (-z)
+_KNUCKLES = np.array([[0.03, -0.03, 0], [0.025, -0.09, 0], [0, -0.095, 0], [-0.02, -0.09, 0], [-0.04, -0.08, 0]])
+_PALM_NORMAL = np.array([0.0, 0.0, -1.0])
+
+
+def make_posed_coordinates(flexion, rotation=np.eye(3)):
+    """(3, 21, 3) coordinates of a hand whose joints are bent by ``flexion`` (5, 3) radians
+    towards the palm, turned by ``rotation``; world coordinates only."""
+    world = np.zeros((21, 3))
+    for finger, knuckle in enumerate(_KNUCKLES):
+        world[1 + 4 * finger] = knuckle
+        forward, bend = knuckle / np.linalg.norm(knuckle), 0.0
+        for joint in range(3):
+            bend += flexion[finger][joint]
+            bone = np.cos(bend) * forward + np.sin(bend) * _PALM_NORMAL
+            world[2 + 4 * finger + joint] = world[1 + 4 * finger + joint] + 0.03 * bone
+    coordinates = np.zeros((3, 21, 3), np.float32)
+    coordinates[2] = world @ rotation.T
+    return coordinates
+
+
+def test_kinematics_measures_flexion_and_curl_however_the_hand_is_turned():
+    flexion = np.zeros((5, 3))
+    flexion[2, 1] = np.pi / 2  # Middle finger bent at its PIP joint
+    flexion[3:] = np.radians(85)  # Ring and pinky fully curled
+    coordinates = make_posed_coordinates(flexion)
+    # Upside down and turned away: image-axis rules no longer apply
+    rotation = cv2.Rodrigues(np.array([2.5, 0.4, -1.0]))[0]
+    batch = np.stack([coordinates, make_posed_coordinates(flexion, rotation) * 3.0])
+
+    upright, turned = compute_kinematics(batch, ["Left", "Left"])
+    for kinematics in (upright, turned):
+        np.testing.assert_allclose(kinematics.joint_angles, flexion, atol=1e-4)
+        np.testing.assert_allclose(kinematics.curl[[0, 1, 3, 4]], [0, 0, 1, 1], atol=1e-4)
+        assert 0.2 < kinematics.curl[2] < 0.5
+        assert kinematics.extended.tolist() == [True, True, True, False, False]
+    np.testing.assert_allclose(upright.palm_direction, [0, -1, 0], atol=1e-6)
+    np.testing.assert_allclose(turned.palm_rotation, rotation @ upright.palm_rotation, atol=1e-5)
+
+
+def test_kinematics_palm_normal_follows_handedness_and_falls_back_to_pixels():
+    coordinates = make_posed_coordinates(np.zeros((5, 3)))
+    left, right = compute_kinematics(np.stack([coordinates, coordinates]), ["Left", "Right"])
+    # MediaPipe's "Left" is this hand's chirality in image coordinates
+    np.testing.assert_allclose(left.palm_normal, _PALM_NORMAL, atol=1e-6)
+    np.testing.assert_allclose(right.palm_normal, -_PALM_NORMAL, atol=1e-6)
+    np.testing.assert_allclose(np.linalg.det(left.palm_rotation), 1.0, atol=1e-6)
+
+    # Without world landmarks the pixel coordinates are used, computed lazily per hand
+    pixels = coordinates.copy()
+    pixels[1], pixels[2] = coordinates[2] * 1000, 0
+    hand = HandLandmarks(pixels, np.ones(5, bool), "Left", 0.9)
+    assert hand.curl == [0.0] * 5 and hand.kinematics is hand.kinematics
+    np.testing.assert_allclose(hand.kinematics.palm_rotation, left.palm_rotation, atol=1e-5)
+
+
+def test_shared_frame_ring_round_trip():
+    ring = SharedFrameRing.create((8, 8, 3), slots=2, max_hands=2)
+    reader = SharedFrameRing.attach(ring.name)
+    try:
+        for sequence in range(1, 4):
+            ring.write(
+                sequence,
+                sequence / 10,
+                np.full((4, 6, 3), sequence, np.uint8),
+                [HandLandmarks(
+                    np.full((3, 21, 3), sequence, np.float32),
+                    np.array([True, False, True, False, True]),
+                    "Left",
+                    0.9
+                )]
+            )
+
+        slot = reader.read()
+        assert (slot.sequence, slot.timestamp, slot.frame.shape) == (3, 0.3, (4, 6, 3))
+        assert slot.frame[0, 0, 0] == 3
+        (hand,) = slot.hand_data()
+        assert (hand.handedness, hand.num_fingers_up) == ("Left", 3)
+        assert hand.world.shape == (21, 3) and hand.world[0, 0] == 3
+        # Sequence 1 has been overwritten by sequence 3 in a two-slot ring
+        assert reader.read(1) is None
+
+        view = reader.read(copy=False)
+        assert reader.is_current(view)
+        ring.write(5, 0.5, np.zeros((2, 2, 3), np.uint8))
+        assert not reader.is_current(view)
+        del view
+    finally:
+        reader.close()
+        ring.close()
+        ring.unlink()
+
+
+def test_shared_frame_ring_recovers_slots_of_dead_writer():
+    ring = SharedFrameRing.create((2, 2, 3), slots=2, max_hands=1)
+    try:
+        ring.write(1, 0.1, np.zeros((2, 2, 3), np.uint8))
+        ring._meta[0]['lock'] += 1  # Writer died halfway through writing sequence 2
+
+        assert ring.recover() == 1
+        assert ring.read(2) is None
+        assert ring.read(1).sequence == 1
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_fit_frame_rescales_pixel_landmarks():
+    coordinates = np.zeros((3, 21, 3), np.float32)
+    coordinates[:, 0] = (100.0, 50.0, 10.0)
+    hand = HandLandmarks(coordinates, np.zeros(5, bool), "Left", 0.9)
+
+    frame, (fitted,) = _fit_frame(np.zeros((200, 400, 3), np.uint8), [hand], (100, 100, 3))
+
+    assert frame.shape == (50, 100, 3)
+    assert fitted.pixels[0].tolist() == [25.0, 12.5, 2.5]
+    # Normalized and world coordinates do not depend on the frame size
+    assert fitted.normalized[0].tolist() == [100.0, 50.0, 10.0]
+    assert hand.pixels[0, 0] == 100.0
+
+
+def test_shared_stream_processor_counts_frames_overwritten_in_ring():
+    ring = SharedFrameRing.create((2, 2, 3), slots=4, max_hands=1)
+    processor = SharedStreamProcessor("cam", ring, threading.Condition(), frame_timeout=0.01)
+    results = processor.process_frames()
+    try:
+        ring.write(1, 0.1, np.zeros((2, 2, 3), np.uint8))
+        first = next(results)
+        for sequence in range(2, 5):
+            ring.write(sequence, sequence / 10, np.full((2, 2, 3), sequence, np.uint8))
+        second = next(results)
+        results.close()
+
+        assert [first.sequence, second.sequence] == [1, 4]
+        assert second.frame[0, 0, 0] == 4
+        assert processor.stats() == {'frames_processed': 2, 'frames_dropped': 2}
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_supervisor_restarts_dead_workers_and_stops_them():
+    supervisor = MultiStreamSupervisor(
+        {"ok": "ok", "crash": "crash"},
+        max_frame_shape=(2, 2, 3),
+        restart_backoff=0.0,
+        monitor_interval=0.05,
+        worker_fn=stub_camera_worker
+    )
+    processors = supervisor.start()
+    try:
+        deadline = time.monotonic() + 60
+        while processors["crash"].ring.latest < 2 or processors["ok"].ring.latest < 1:
+            assert time.monotonic() < deadline, supervisor.stats()
+            time.sleep(0.05)
+
+        stats = supervisor.stats()
+        assert stats["ok"]["alive"] and stats["ok"]["restarts"] == 0
+        assert stats["crash"]["restarts"] == 1
+        # The restarted worker continues the sequence instead of starting over
+        assert processors["crash"].ring.read().frame[0, 0, 0] == 2
+        assert processors["crash"].stats()["worker"]["restarts"] == 1
+        workers = [worker.process for worker in supervisor._workers.values()]
+    finally:
+        supervisor.stop()
+
+    assert not any(process.is_alive() for process in workers)
+    assert supervisor.processors == {}
+
+
+def make_hand(center, rng=None, noise=0.0):
+    coordinates = np.zeros((3, 21, 3), np.float32)
+    coordinates[0, :, :2] = np.asarray(center) + np.linspace(-0.05, 0.05, 21)[:, None]
+    if rng is not None:
+        coordinates[0] += rng.normal(0, noise, (21, 3))
+    coordinates[1] = coordinates[0] * (640, 480, 640)
+    coordinates[2] = coordinates[0] * 0.2
+    return HandLandmarks(coordinates, np.zeros(5, bool), "Left", 0.9)
+
+
+def test_landmark_filter_keeps_hand_identity():
+    landmark_filter = LandmarkFilter()
+    first = landmark_filter.apply([make_hand((0.2, 0.5)), make_hand((0.8, 0.5))], 0.0, (480, 640, 3))
+    # Hands come back in the opposite order, slightly moved
+    second = landmark_filter.apply([make_hand((0.79, 0.5)), make_hand((0.21, 0.5))], 1 / 30, (480, 640, 3))
+
+    assert [hand.track_id for hand in first] == [1, 2]
+    assert [hand.track_id for hand in second] == [2, 1]
+
+    # A hand reappearing far away after its track expired gets a new identity
+    for i in range(4):
+        landmark_filter.apply(None, (i + 2) / 30, (480, 640, 3))
+    (third,) = landmark_filter.apply([make_hand((0.5, 0.1))], 0.5, (480, 640, 3))
+    assert third.track_id == 3
+
+
+def test_landmark_filter_reduces_jitter_of_static_hand():
+    rng = np.random.default_rng(0)
+    landmark_filter = LandmarkFilter(min_cutoff=1.0, beta=0.0)
+    raw, filtered = [], []
+    for i in range(90):
+        hand = make_hand((0.5, 0.5), rng, noise=0.005)
+        raw.append(hand.normalized.copy())
+        (smoothed,) = landmark_filter.apply([hand], i / 30, (480, 640, 3))
+        filtered.append(smoothed.normalized)
+
+    assert np.std(filtered[30:], axis=0).mean() < 0.3 * np.std(raw[30:], axis=0).mean()
+    # Pixel coordinates stay consistent with the normalized ones
+    np.testing.assert_allclose(smoothed.pixels, smoothed.normalized * (640, 480, 640), rtol=1e-5)
+
+
+def test_landmark_filter_predicts_constant_motion():
+    lead = 0.1
+    lagging, predicting = LandmarkFilter(), LandmarkFilter(prediction=None)
+    for i in range(60):
+        t = i / 30
+        hand = make_hand((0.2 + 0.3 * t, 0.5))
+        (lagged,) = lagging.apply([hand], t, (480, 640, 3))
+        (predicted,) = predicting.apply([hand], t, (480, 640, 3), latency=lead)
+
+    future = make_hand((0.2 + 0.3 * (t + lead), 0.5)).normalized
+    # Extrapolation removes most of the distance travelled during the latency
+    assert np.abs(predicted.normalized - future).max() < 0.01
+    assert np.abs(lagged.normalized - future).max() > 0.03
+
+
+def test_landmark_filter_runs_well_under_a_millisecond():
+    landmark_filter = LandmarkFilter(prediction=0.05)
+    hands = [make_hand((0.3, 0.5)), make_hand((0.7, 0.5))]
+    times = []
+    for i in range(200):
+        start = time.perf_counter()
+        landmark_filter.apply(hands, i / 30, (480, 640, 3))
+        times.append(time.perf_counter() - start)
+
+    assert np.median(times) < 1e-3
+
+
+def test_batch_tracks_videos_and_image_directories_and_resumes(tmp_path):
+    from click.testing import CliRunner
+
+    from handful.cli.main import cli
+
+    footage = tmp_path / "footage"
+    (footage / "stills").mkdir(parents=True)
+    video = footage / "clip.avi"
+    writer = cv2.VideoWriter(str(video), cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPG video here")
+    for i in range(12):
+        writer.write(np.full((48, 64, 3), i * 20, np.uint8))
+    writer.release()
+    for i in range(3):
+        cv2.imwrite(str(footage / "stills" / f"{i}.png"), np.zeros((32, 40, 3), np.uint8))
+    (footage / "stills" / "3.png").write_bytes(b"not an image")
+
+    output = tmp_path / "out"
+    args = ["batch", str(footage), "-o", str(output), "--workers", "2", "--chunk-frames", "5"]
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert "Tracked 15 frames (0 with hands, 1 unreadable)" in result.output
+
+    runner = BatchRunner([str(footage)], str(output), chunk_frames=5)
+    assert len(runner.tasks) == 4 and not runner.pending
+    names = {task.path: task.name for task in runner.tasks}
+    clip = load_results(str(output), names[str(video)])
+    assert clip['frame'].tolist() == list(range(12))
+    assert clip['landmarks'].shape == (12, 2, 2, 21, 3) and not clip['num_hands'].any()
+    stills = load_results(str(output), names[str(footage / "stills")])
+    assert stills['image'].tolist() == ["0.png", "1.png", "2.png"]
+    assert stills['width'].tolist() == [40] * 3 and stills['height'].tolist() == [32] * 3
+
+    # Resuming redoes only the missing chunk; other settings need another directory
+    (output / runner.tasks[1].chunk).unlink()
+    result = CliRunner().invoke(cli, args)
+    assert "4 chunks, 3 already done" in result.output
+    assert "Tracked 5 frames" in result.output
+    result = CliRunner().invoke(cli, args[:-1] + ["7"])
+    assert result.exit_code != 0 and "use another output directory" in result.output
+
+
+def test_entry_points_do_not_import_mediapipe_or_flask():
+    import subprocess
+    import sys
+
+    root = Path(__file__).resolve().parent.parent
+    script = (
+        "import sys, main, handful.cli.main, handful.server.app, handful.core.tracker\n"
+        "print(sorted(m for m in ('mediapipe', 'flask') if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+
+def test_tracker_warmup_leaves_no_state_behind():
+    tracker = HandTracker(roi_tracking=True)
+    assert tracker.warmup((48, 64, 3), frames=1) > 0
+    assert tracker.full_frame_detections == 0 and tracker.timings == {}
+
+    _, hand_data = tracker.process_frame(np.zeros((48, 64, 3), np.uint8))
+    assert not hand_data and tracker.full_frame_detections == 1